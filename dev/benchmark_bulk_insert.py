@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+AMS-DB Bulk Insert Benchmark
+============================
+
+Compares a loop of single add_conversation_message calls against
+add_conversation_messages_bulk. A full single-insert loop over a million rows
+takes far too long to run, and its per-row cost grows linearly with the table,
+so it is sampled on a table pre-filled to half the target size (the average
+table size over the whole loop) and extrapolated.
+
+Usage:
+    python dev/benchmark_bulk_insert.py [bulk_rows] [loop_rows]
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ams_db.core.polars_db import PolarsDBHandler
+
+
+def make_records(count: int):
+    """Build synthetic conversation records."""
+    return [
+        {
+            "agent_id": f"agent_{i % 50}",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Historical message number {i}",
+            "session_id": f"session_{i % 1000}",
+            "metadata": {"imported": True, "index": i},
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    bulk_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    loop_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    records = make_records(bulk_rows)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = PolarsDBHandler(db_path=str(Path(temp_dir) / "loop"))
+        db.add_conversation_messages_bulk(records[:bulk_rows // 2])
+        start = time.perf_counter()
+        for record in records[:loop_rows]:
+            db.add_conversation_message(
+                record["agent_id"], record["role"], record["content"],
+                record["session_id"], metadata=record["metadata"]
+            )
+        loop_seconds = time.perf_counter() - start
+        db.close()
+
+        db = PolarsDBHandler(db_path=str(Path(temp_dir) / "bulk"))
+        start = time.perf_counter()
+        db.add_conversation_messages_bulk(records)
+        bulk_seconds = time.perf_counter() - start
+
+    loop_estimate = loop_seconds / loop_rows * bulk_rows
+
+    print(f"Single inserts: {loop_rows:,} rows at {bulk_rows // 2:,} existing rows in "
+          f"{loop_seconds:.2f}s ({loop_seconds / loop_rows * 1e6:.0f} us/row)")
+    print(f"Bulk insert:    {bulk_rows:,} rows in {bulk_seconds:.2f}s "
+          f"({bulk_seconds / bulk_rows * 1e6:.2f} us/row)")
+    print(f"Estimated single-insert loop for {bulk_rows:,} rows: {loop_estimate:.0f}s")
+    print(f"Speedup: {loop_estimate / bulk_seconds:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+AMS-DB Hash Index Benchmark
+===========================
+
+Measures point lookups (message_id) and per-session fetches (session_id) on
+conversation tables of growing size, comparing a full-column filter with the
+hash indexes used by PolarsDBHandler. Indexed latency should stay flat while
+the filter grows with the table.
+
+Usage:
+    python dev/benchmark_indexes.py [sizes...]
+
+    e.g. python dev/benchmark_indexes.py 10000 100000 1000000 10000000
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+import polars as pl
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ams_db.core.indexes import HashIndex
+from ams_db.core.polars_db import _new_ids
+
+LOOKUPS = 200
+MESSAGES_PER_SESSION = 20
+
+
+def make_table(rows: int) -> pl.DataFrame:
+    """Build a synthetic conversations table with the indexed columns."""
+    return pl.DataFrame({
+        "message_id": _new_ids(rows),
+        "session_id": (pl.int_range(rows, eager=True) // MESSAGES_PER_SESSION)
+            .cast(pl.String).str.pad_start(9, "0"),
+        "content": pl.repeat("message body", rows, eager=True),
+    })
+
+
+def time_per_call(func, keys) -> float:
+    """Average microseconds per call over the given keys."""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000, 10_000_000]
+
+    print(f"{'rows':>12} {'build s':>9} {'filter id':>11} {'index id':>10} "
+          f"{'filter sess':>12} {'index sess':>11}   (us per lookup)")
+    for rows in sizes:
+        table = make_table(rows)
+        message_ids = random.sample(table["message_id"].to_list(), LOOKUPS)
+        session_ids = [f"{random.randrange(rows // MESSAGES_PER_SESSION):09d}" for _ in range(LOOKUPS)]
+
+        message_index = HashIndex("message_id")
+        session_index = HashIndex("session_id")
+        start = time.perf_counter()
+        message_index.build(table)
+        session_index.build(table)
+        build_seconds = time.perf_counter() - start
+
+        # The scan-based filters are slow on big tables, so sample fewer keys
+        scan_keys = max(5, LOOKUPS * 10_000 // rows)
+        filter_id = time_per_call(
+            lambda key: table.filter(pl.col("message_id") == key), message_ids[:scan_keys])
+        index_id = time_per_call(
+            lambda key: table[message_index.lookup(table, key)], message_ids)
+        filter_session = time_per_call(
+            lambda key: table.filter(pl.col("session_id") == key), session_ids[:scan_keys])
+        index_session = time_per_call(
+            lambda key: table[session_index.lookup(table, key)], session_ids)
+
+        print(f"{rows:>12,} {build_seconds:>9.2f} {filter_id:>11.0f} {index_id:>10.0f} "
+              f"{filter_session:>12.0f} {index_session:>11.0f}")
+
+        del table, message_index, session_index
+
+
+if __name__ == "__main__":
+    main()
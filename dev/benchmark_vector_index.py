@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+AMS-DB Vector Index Benchmark
+=============================
+
+Builds the IVF vector index over synthetic clustered embeddings and measures
+query latency (single and batched, with and without an agent filter) and
+recall against exact search. The target is under 10 ms per query at a
+million chunks.
+
+Usage:
+    python dev/benchmark_vector_index.py [rows] [dim] [agents]
+
+    e.g. python dev/benchmark_vector_index.py 1000000 768 100
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ams_db.core.vector_index import VectorIndex, _normalize
+
+QUERIES = 200
+TOP_K = 10
+
+
+def make_vectors(rows: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Embeddings grouped around random topics, like real document chunks."""
+    topics = rng.standard_normal((max(16, rows // 1000), dim)).astype(np.float32)
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 100_000):
+        end = min(rows, start + 100_000)
+        noise = rng.standard_normal((end - start, dim)).astype(np.float32)
+        vectors[start:end] = topics[rng.integers(len(topics), size=end - start)] + 0.5 * noise
+    return vectors
+
+
+def recall(index: VectorIndex, vectors: np.ndarray, queries: np.ndarray, results) -> float:
+    """Share of the exact top-k found by the index."""
+    found = 0
+    for query, hits in zip(_normalize(queries), results):
+        exact = np.argpartition(-(vectors @ query), TOP_K)[:TOP_K]
+        found += len({f"doc{i}" for i in exact} & {doc_id for doc_id, _ in hits})
+    return found / (len(queries) * TOP_K)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    agents = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    rng = np.random.default_rng(0)
+
+    vectors = _normalize(make_vectors(rows, dim, rng))
+    ids = [f"doc{i}" for i in range(rows)]
+    agent_ids = [f"agent{i % agents}" for i in range(rows)]
+    queries = vectors[rng.choice(rows, QUERIES, replace=False)] + \
+        0.1 * rng.standard_normal((QUERIES, dim)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = VectorIndex(Path(index_dir), dim)
+        start = time.perf_counter()
+        index.build(ids, agent_ids, vectors)
+        print(f"{rows:,} x {dim} vectors, {len(index.centroids)} lists, "
+              f"built in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index.save()
+        index = VectorIndex.load(Path(index_dir), dim)
+        print(f"saved and reloaded in {time.perf_counter() - start:.1f}s")
+
+        for label, agent_id in (("all agents", None), ("one agent", "agent0")):
+            start = time.perf_counter()
+            single = [index.search(query, k=TOP_K, agent_id=agent_id)[0] for query in queries]
+            single_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+            start = time.perf_counter()
+            index.search(queries, k=TOP_K, agent_id=agent_id)
+            batch_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+            line = f"{label:>10}: {single_ms:6.2f} ms/query single, {batch_ms:6.2f} ms/query batched"
+            if agent_id is None:
+                line += f", recall@{TOP_K} {recall(index, vectors, queries, single):.3f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -181,7 +181,14 @@ async def example_3_graphiti_integration():
         assistant_response = "Machine learning is a subset of artificial intelligence that enables computers to learn and improve from data."
         
         await framework.add_conversation_turn(user_input, assistant_response)
-        print("✅ Added conversation turn to both database and knowledge graph")
+        print("✅ Added conversation turn to the database and queued it for the knowledge graph")
+        
+        # Episodes are added to the graph in the background; wait for them
+        # before this short-lived run ends
+        if await framework.wait_for_ingestion(timeout=120):
+            print("✅ Knowledge graph ingestion complete")
+        else:
+            print("⏳ Graph ingestion still running; remaining episodes resume on the next start")
         
         # Search with context
         search_results = await framework.search_knowledge_with_context(
@@ -200,6 +207,8 @@ async def example_3_graphiti_integration():
         print(f"  • System ready: {status['system_ready']}")
         print(f"  • Total agents: {status['database_stats']['agent_count']}")
         
+        await framework.close()
+        
     except Exception as e:
         print(f"⚠️ Graphiti integration example failed (Neo4j might not be running): {e}")
         print("💡 To run this example, ensure Neo4j is installed and running")
@@ -260,6 +260,10 @@ async def build_minecraft_assistant():
     if success:
         print(f"✅ Agent data exported to {export_path}/")
     
+    # Let queued episodes reach the knowledge graph before the run ends
+    if use_graphiti:
+        await framework.close()
+    
     return agent_id
 
 
@@ -5,15 +5,19 @@ FastAPI-based REST API for managing agents, databases, and knowledge bases.
 """
 
 import asyncio
+import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
-from ..core import AgentConfig, PolarsDBHandler, GraphitiRAGFramework
+from ..core import AgentConfig, PolarsDBHandler, get_framework, close_all
+from ..core.agent_context import AgentContext
+from ..core.live_session import LiveSession
 
 
 # Pydantic Models
@@ -32,6 +36,12 @@ class ConversationMessage(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class ChatRequest(BaseModel):
+    message: str
+    conversation_context: str = ""
+    session_id: Optional[str] = None
+
+
 class KnowledgeDocument(BaseModel):
     title: str
     content: str
@@ -61,14 +71,23 @@ framework = None
 async def startup_event():
     """Initialize the framework on startup."""
     global framework
-    framework = GraphitiRAGFramework()
+    framework = get_framework()
+    # Resume graph ingestion of episodes queued before the last shutdown
+    framework.ingestion_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared framework (Neo4j driver, HTTP client, database)."""
+    await close_all()
 
 
 # Agent Management Endpoints
 @app.post("/agents/", response_model=dict)
-def create_agent(agent_data: AgentConfigModel):
+async def create_agent(agent_data: AgentConfigModel):
     """Create a new agent."""
-    agent_id = framework.create_agent(
+    agent_id = await framework.async_db.write(
+        framework.create_agent,
         agent_data.config,
         agent_data.agent_name,
         agent_data.description,
@@ -78,51 +97,69 @@ def create_agent(agent_data: AgentConfigModel):
 
 
 @app.get("/agents/")
-def list_agents():
+async def list_agents():
     """List all agents."""
-    agents = framework.db_handler.list_agents()
+    agents = await framework.async_db.read(framework.db_handler.list_agents)
     return {"agents": agents.to_dicts()}
 
 
 @app.get("/agents/{agent_id}")
-def get_agent(agent_id: str):
+async def get_agent(agent_id: str):
     """Get agent configuration."""
-    config = framework.db_handler.get_agent_config(agent_id)
+    config = await framework.async_db.read(framework.db_handler.get_agent_config, agent_id)
     if not config:
         raise HTTPException(status_code=404, detail="Agent not found")
     return {"agent_id": agent_id, "config": config}
 
 
 @app.put("/agents/{agent_id}")
-def update_agent(agent_id: str, agent_data: AgentConfigModel):
+async def update_agent(agent_id: str, agent_data: AgentConfigModel):
     """Update agent configuration."""
-    framework.db_handler.update_agent_config(agent_id, agent_data.config)
+    await framework.async_db.write(framework.db_handler.update_agent_config, agent_id, agent_data.config)
     return {"agent_id": agent_id, "status": "updated"}
 
 
 @app.delete("/agents/{agent_id}")
-def delete_agent(agent_id: str, soft_delete: bool = True):
+async def delete_agent(agent_id: str, soft_delete: bool = True):
     """Delete an agent."""
-    framework.db_handler.delete_agent(agent_id, soft_delete)
+    await framework.async_db.write(framework.db_handler.delete_agent, agent_id, soft_delete)
     return {"agent_id": agent_id, "status": "deleted"}
 
 
 @app.post("/agents/{agent_id}/load")
-def load_agent(agent_id: str, session_id: Optional[str] = None):
+async def load_agent(agent_id: str, session_id: Optional[str] = None):
     """Load an agent as the current active agent."""
-    success = framework.load_agent(agent_id, session_id)
+    success = await framework.load_agent(agent_id, session_id)
     if not success:
         raise HTTPException(status_code=404, detail="Agent not found")
     return {"agent_id": agent_id, "session_id": framework.current_session_id, "status": "loaded"}
 
 
+async def agent_context(agent_id: str, session_id: Optional[str] = None) -> AgentContext:
+    """
+    Context for one request to an agent; requests never change the loaded agent.
+    
+    Without a session_id the request starts a new session, so clients that
+    do not pass one never see each other's history. Endpoints return the
+    session ID to continue with.
+    """
+    context = await framework.get_agent_context(agent_id, session_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return context
+
+
 # Conversation Endpoints
 @app.post("/agents/{agent_id}/conversations/")
-async def add_conversation_message(agent_id: str, message: ConversationMessage):
-    """Add a message to the conversation."""
-    # Load agent if not current
-    if framework.current_agent_id != agent_id:
-        framework.load_agent(agent_id)
+async def add_conversation_message(agent_id: str, message: ConversationMessage,
+                                   session_id: Optional[str] = None):
+    """
+    Add a message to the conversation.
+    
+    Without session_id the message starts a new session; pass the returned
+    session_id to continue it.
+    """
+    context = await agent_context(agent_id, session_id)
     
     # For user messages, generate assistant response (placeholder)
     if message.role == "user":
@@ -132,35 +169,106 @@ async def add_conversation_message(agent_id: str, message: ConversationMessage):
         msg_id = await framework.add_conversation_turn(
             message.content, 
             assistant_response, 
-            message.metadata
+            message.metadata,
+            context=context
         )
         
         return {
             "message_id": msg_id,
             "user_message": message.content,
             "assistant_response": assistant_response,
+            "session_id": context.session_id,
             "status": "processed"
         }
     else:
         # Just add the message
-        msg_id = framework.db_handler.add_conversation_message(
+        msg_id = await framework.async_db.write(
+            framework.db_handler.add_conversation_message,
             agent_id, message.role, message.content,
-            framework.current_session_id, message.message_type, message.metadata
+            context.session_id, message.message_type, message.metadata
         )
-        return {"message_id": msg_id, "status": "added"}
+        return {"message_id": msg_id, "session_id": context.session_id, "status": "added"}
+
+
+@app.post("/agents/{agent_id}/chat/stream")
+async def stream_chat(agent_id: str, request: ChatRequest):
+    """
+    Answer a message as server-sent events while the model generates it.
+    
+    Each chunk arrives as a ``data: {"token": ...}`` event. The last event is
+    ``event: done`` and carries the session ID. Without a session_id the
+    request starts a new session; send that ID to continue it. The turn is
+    stored when the stream completes.
+    """
+    context = await agent_context(agent_id, request.session_id)
+    
+    async def events():
+        try:
+            async for token in framework.stream_response(
+                agent_id, request.message, request.conversation_context, context=context
+            ):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps({'session_id': context.session_id})}\n\n"
+    
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/agents/{agent_id}/chat/ws")
+async def chat_websocket(websocket: WebSocket, agent_id: str, session_id: Optional[str] = None):
+    """
+    Chat with one agent over a WebSocket.
+    
+    The connection is bound to the agent and session for its whole life. The
+    agent config and recent messages stay in memory, so each message costs
+    only retrieval and generation. On connect the server sends
+    ``{"type": "session", "session_id": ...}``; without a session_id query
+    parameter that is a new session. Each text frame the client
+    sends is a message. Its reply arrives as ``{"type": "token"}`` frames
+    followed by ``{"type": "done"}``. An unknown agent closes the connection
+    with code 4404.
+    """
+    await websocket.accept()
+    session = await LiveSession.open(framework, agent_id, session_id)
+    if session is None:
+        await websocket.close(code=4404, reason="Agent not found")
+        return
+    
+    await websocket.send_json({"type": "session", "agent_id": agent_id, "session_id": session.context.session_id})
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                async for token in session.send(message):
+                    await websocket.send_json({"type": "token", "token": token})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            await websocket.send_json({"type": "done"})
+    except WebSocketDisconnect:
+        pass
 
 
 @app.get("/agents/{agent_id}/conversations/")
-def get_conversation_history(agent_id: str, session_id: Optional[str] = None, limit: int = 50):
+async def get_conversation_history(agent_id: str, session_id: Optional[str] = None, limit: int = 50):
     """Get conversation history."""
-    history = framework.db_handler.get_conversation_history(agent_id, session_id, limit)
+    history = await framework.async_db.read(
+        framework.db_handler.get_conversation_history, agent_id, session_id, limit
+    )
     return {"conversations": history.to_dicts()}
 
 
 @app.delete("/agents/{agent_id}/conversations/")
-def clear_conversation_history(agent_id: str, session_id: Optional[str] = None):
+async def clear_conversation_history(agent_id: str, session_id: Optional[str] = None):
     """Clear conversation history."""
-    framework.db_handler.clear_conversation_history(agent_id, session_id)
+    await framework.async_db.write(framework.db_handler.clear_conversation_history, agent_id, session_id)
     return {"status": "cleared"}
 
 
@@ -168,15 +276,15 @@ def clear_conversation_history(agent_id: str, session_id: Optional[str] = None):
 @app.post("/agents/{agent_id}/knowledge/")
 async def add_knowledge_document(agent_id: str, document: KnowledgeDocument):
     """Add a knowledge document."""
-    if framework.current_agent_id != agent_id:
-        framework.load_agent(agent_id)
+    context = await agent_context(agent_id)
     
     kb_id = await framework.add_knowledge_with_embedding(
         document.title,
         document.content,
         document.content_type,
         document.source,
-        document.tags
+        document.tags,
+        context=context
     )
     
     return {"kb_id": kb_id, "status": "added"}
@@ -185,8 +293,7 @@ async def add_knowledge_document(agent_id: str, document: KnowledgeDocument):
 @app.post("/agents/{agent_id}/knowledge/upload/")
 async def upload_knowledge_file(agent_id: str, file: UploadFile = File(...)):
     """Upload a knowledge file."""
-    if framework.current_agent_id != agent_id:
-        framework.load_agent(agent_id)
+    context = await agent_context(agent_id)
     
     content = await file.read()
     content_str = content.decode('utf-8')
@@ -195,26 +302,26 @@ async def upload_knowledge_file(agent_id: str, file: UploadFile = File(...)):
         file.filename,
         content_str,
         file.content_type or "text/plain",
-        f"Upload: {file.filename}"
+        f"Upload: {file.filename}",
+        context=context
     )
     
     return {"kb_id": kb_id, "filename": file.filename, "status": "uploaded"}
 
 
 @app.get("/agents/{agent_id}/knowledge/")
-def list_knowledge_documents(agent_id: str, limit: int = 100):
+async def list_knowledge_documents(agent_id: str, limit: int = 100):
     """List knowledge documents."""
-    docs = framework.db_handler.get_knowledge_documents(agent_id, limit)
-    return {"documents": docs.to_dicts()}
+    docs = await framework.async_db.read(framework.db_handler.get_knowledge_documents, agent_id, limit)
+    return {"documents": docs.drop("embedding").to_dicts()}
 
 
 @app.get("/agents/{agent_id}/knowledge/search/")
 async def search_knowledge_base(agent_id: str, query: str, include_context: bool = True):
     """Search the knowledge base."""
-    if framework.current_agent_id != agent_id:
-        framework.load_agent(agent_id)
+    context = await agent_context(agent_id)
     
-    results = await framework.search_knowledge_with_context(query, include_context)
+    results = await framework.search_knowledge_with_context(query, include_context, context=context)
     return results
 
 
@@ -222,8 +329,7 @@ async def search_knowledge_base(agent_id: str, query: str, include_context: bool
 @app.post("/agents/{agent_id}/research/")
 async def add_research_result(agent_id: str, research: ResearchRequest):
     """Add research results."""
-    if framework.current_agent_id != agent_id:
-        framework.load_agent(agent_id)
+    context = await agent_context(agent_id)
     
     # Placeholder for actual research results
     results = {
@@ -236,16 +342,19 @@ async def add_research_result(agent_id: str, research: ResearchRequest):
         research.query,
         results,
         research.source_urls,
-        research.research_type
+        research.research_type,
+        context=context
     )
     
     return {"research_id": research_id, "status": "added"}
 
 
 @app.get("/agents/{agent_id}/research/")
-def search_research_collection(agent_id: str, query: str, research_type: Optional[str] = None):
+async def search_research_collection(agent_id: str, query: str, research_type: Optional[str] = None):
     """Search research collection."""
-    results = framework.db_handler.search_research_collection(agent_id, query, research_type)
+    results = await framework.async_db.read(
+        framework.db_handler.search_research_collection, agent_id, query, research_type
+    )
     return {"research_results": results.to_dicts()}
 
 
@@ -253,8 +362,6 @@ def search_research_collection(agent_id: str, query: str, research_type: Optiona
 @app.post("/export/conversations/{agent_id}")
 async def export_conversations_jsonl(agent_id: str, output_path: str = "conversations.jsonl"):
     """Export agent conversations in JSONL format."""
-    framework = GraphitiRAGFramework()
-    
     success = await framework.export_conversations_jsonl(agent_id, output_path)
     if success:
         return {"message": f"Conversations exported to {output_path}", "success": True}
@@ -264,8 +371,6 @@ async def export_conversations_jsonl(agent_id: str, output_path: str = "conversa
 @app.post("/export/prompts")
 async def export_prompts_jsonl(output_path: str = "prompts.jsonl"):
     """Export all agent prompt sets in JSONL format."""
-    framework = GraphitiRAGFramework()
-    
     success = await framework.export_prompt_sets_jsonl(output_path)
     if success:
         return {"message": f"Prompt sets exported to {output_path}", "success": True}
@@ -282,8 +387,6 @@ async def generate_multi_agent_conversation(
     personas: Optional[List[str]] = None
 ):
     """Generate a multi-agent conversation."""
-    framework = GraphitiRAGFramework()
-    
     session_id = await framework.generate_multi_agent_conversation(
         agent_ids, topic, turns, personas
     )
@@ -301,22 +404,22 @@ async def generate_multi_agent_conversation(
 
 # System Endpoints
 @app.get("/system/status/")
-def get_system_status():
+async def get_system_status():
     """Get system status."""
-    return framework.get_system_status()
+    return await framework.async_db.read(framework.get_system_status)
 
 
 @app.get("/system/stats/")
-def get_database_stats():
+async def get_database_stats():
     """Get database statistics."""
-    return framework.db_handler.get_database_stats()
+    return await framework.async_db.read(framework.db_handler.get_database_stats)
 
 
 @app.post("/system/backup/")
-def create_backup(backup_path: str):
+async def create_backup(backup_path: str):
     """Create a database backup."""
     try:
-        framework.db_handler.export_database_backup(backup_path)
+        await framework.async_db.read(framework.db_handler.export_database_backup, backup_path)
         return {"status": "success", "backup_path": backup_path}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -10,12 +10,12 @@ import hashlib
 import asyncio
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import polars as pl
 
 from ..core.polars_db import PolarsDBHandler
-from ..core.graphiti_pipe import GraphitiRAGFramework
+from ..core.framework_registry import get_framework
 
 
 @dataclass
@@ -201,24 +201,30 @@ class ChatManager:
         export_path = export_folder / filename
         
         # Export conversation data from database
-        conversations = self.db.conversations.filter(
-            self.db.conversations["session_id"] == session.id
-        ).sort("timestamp")
+        conversations = self.db.get_session_messages(session.id)
         
         if format == "jsonl":
+            # Build the lines in Polars; metadata is already JSON, so it is
+            # spliced in as the last field instead of being parsed and re-dumped
+            entries = pl.struct(
+                pl.lit(alias).alias("alias"),
+                pl.lit(session.name).alias("session_name"),
+                pl.lit(session.mode).alias("mode"),
+                pl.col("timestamp").dt.to_string("%Y-%m-%d %H:%M:%S%.f"),
+                pl.col("role").cast(pl.String),
+                pl.col("agent_id").cast(pl.String).fill_null("human"),
+                pl.col("content"),
+            ).struct.json_encode()
+            lines = conversations.select(pl.concat_str([
+                entries.str.strip_suffix("}"),
+                pl.lit(',"metadata":'),
+                pl.col("metadata").fill_null("{}"),
+                pl.lit("}"),
+            ])).to_series()
+            
             with open(export_path, 'w', encoding='utf-8') as f:
-                for row in conversations.to_dicts():
-                    entry = {
-                        "alias": alias,
-                        "session_name": session.name,
-                        "mode": session.mode,
-                        "timestamp": str(row["timestamp"]),
-                        "role": row["role"],
-                        "agent_id": row.get("agent_id", "human"),
-                        "content": row["content"],
-                        "metadata": json.loads(row.get("metadata", "{}"))
-                    }
-                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                for line in lines:
+                    f.write(line + '\n')
         
         return str(export_path)
     
@@ -286,84 +292,129 @@ class ChatManager:
                 # If sessions file is corrupted, start fresh
                 self.active_sessions = {}
     
+    def _framework(self):
+        """
+        Shared framework: one Neo4j driver and HTTP client, and this
+        manager's database handler instead of a second one
+        """
+        import os
+        semantic_threshold = os.environ.get('AMS_SEMANTIC_CACHE_THRESHOLD')
+        return get_framework(
+            db_handler=self.db,
+            neo4j_uri=os.environ.get('NEO4J_URI', 'bolt://localhost:7687'),
+            neo4j_user=os.environ.get('NEO4J_USER', 'neo4j'),
+            neo4j_password=os.environ.get('NEO4J_PASSWORD', 'password'),
+            semantic_cache_threshold=float(semantic_threshold) if semantic_threshold else None
+        )
+    
+    async def _recent_context(self, graphiti, session_id: str) -> str:
+        """The session's last 10 messages, one "speaker: text" line each"""
+        conversation_history = await graphiti.async_db.read(self.db.get_session_messages, session_id)
+        
+        context_messages = []
+        if conversation_history.height > 0:
+            recent_messages = conversation_history.tail(10).to_dicts()  # Last 10 messages
+            for msg in recent_messages:
+                role = "human" if msg["role"] == "user" else msg["agent_id"]
+                context_messages.append(f"{role}: {msg['content']}")
+        return "\n".join(context_messages)
+    
     async def send_message_to_agent(self, session_id: str, agent_id: str, user_message: str) -> str:
         """
         🤖 Send a message to an agent using Graphiti for real conversation
         Returns the agent's response
         """
         try:
-            # Initialize Graphiti framework for this agent
-            import os
-            graphiti = GraphitiRAGFramework(
-                neo4j_uri=os.environ.get('NEO4J_URI', 'bolt://localhost:7687'),
-                neo4j_user=os.environ.get('NEO4J_USER', 'neo4j'),
-                neo4j_password=os.environ.get('NEO4J_PASSWORD', 'password')
-            )
-            
-            # Load the agent's context and knowledge
-            await graphiti.load_agent(agent_id)
+            graphiti = self._framework()
             
-            # Get conversation history for context
-            conversation_history = self.db.conversations.filter(
-                self.db.conversations["session_id"] == session_id
-            ).sort("timestamp")
+            # Paraphrases of answered questions skip loading, search and the LLM
+            cached = await graphiti.cached_answer(agent_id, user_message)
+            if cached is not None:
+                return cached
             
-            # Build context from recent messages
-            context_messages = []
-            if conversation_history.height > 0:
-                recent_messages = conversation_history.tail(10).to_dicts()  # Last 10 messages
-                for msg in recent_messages:
-                    role = "human" if msg["role"] == "user" else msg["agent_id"]
-                    context_messages.append(f"{role}: {msg['content']}")
+            # This agent and session only; other chats keep their own contexts
+            context = await graphiti.get_agent_context(agent_id, session_id)
             
             # Get agent's response using Graphiti
             response = await graphiti.generate_response(
                 agent_id=agent_id,
                 user_message=user_message,
-                conversation_context="\n".join(context_messages),
-                session_id=session_id
+                conversation_context=await self._recent_context(graphiti, session_id),
+                session_id=session_id,
+                check_semantic_cache=False,
+                context=context
             )
             
             return response
             
         except Exception as e:
-            # Check what services might be missing and provide helpful feedback
-            missing_services = []
-            
-            # Check Neo4j
-            try:
-                import requests
-                requests.get("http://localhost:7474", timeout=2)
-            except:
-                missing_services.append("Neo4j (http://localhost:7474)")
-            
-            # Check Ollama 
-            try:
-                import requests
-                requests.get("http://localhost:11434", timeout=2)
-            except:
-                missing_services.append("Ollama (http://localhost:11434)")
-            
-            # Fallback to personality-based simulation with service info
-            agent_config = self.db.get_agent_config(agent_id)
+            return self._offline_response(agent_id, user_message, e)
+    
+    async def stream_message_to_agent(self, session_id: str, agent_id: str, user_message: str) -> AsyncIterator[str]:
+        """
+        🌊 Like send_message_to_agent, but yields the reply in chunks as the
+        model writes it. The caller stores the messages once the stream ends.
+        """
+        streamed = False
+        try:
+            graphiti = self._framework()
+            context = await graphiti.get_agent_context(agent_id, session_id)
             
-            if missing_services:
-                service_info = ", ".join(missing_services)
-                setup_notice = f"\n\n🔧 **Setup Notice**: To enable full AI conversations, start: {service_info}"
-            else:
-                setup_notice = f"\n\n⚠️ **Note**: Graphiti error: {str(e)[:100]}..."
+            async for chunk in graphiti.stream_response(
+                agent_id=agent_id,
+                user_message=user_message,
+                conversation_context=await self._recent_context(graphiti, session_id),
+                session_id=session_id,
+                context=context,
+                persist=False
+            ):
+                streamed = True
+                yield chunk
             
-            if agent_config:
-                personality = agent_config.get("prompt_config", {}).get("primeDirective", "")
-                if "wizard" in personality.lower() or "wizard" in agent_id.lower():
-                    base_response = f"🧙‍♂️ *adjusts mystical robes* Your question about '{user_message}' stirs ancient knowledge within my ethereal archives..."
-                elif "minecraft" in personality.lower() or "minecraft" in agent_id.lower():
-                    base_response = f"🎮 Hey there, crafter! Your question about '{user_message}' is like finding diamonds - totally awesome! ⛏️"
-                elif "expert" in personality.lower() or "coder" in agent_id.lower():
-                    base_response = f"From a technical perspective, '{user_message}' is an interesting topic that requires systematic analysis."
-                else:
-                    base_response = f"Thank you for asking about '{user_message}'. I'd be happy to discuss this topic with you."
+        except Exception as e:
+            if streamed:
+                raise
+            yield self._offline_response(agent_id, user_message, e)
+    
+    def _offline_response(self, agent_id: str, user_message: str, error: Exception) -> str:
+        """Personality-based reply with a hint about which services are down"""
+        # Check what services might be missing and provide helpful feedback
+        missing_services = []
+        
+        # Check Neo4j
+        try:
+            import requests
+            requests.get("http://localhost:7474", timeout=2)
+        except:
+            missing_services.append("Neo4j (http://localhost:7474)")
+        
+        # Check Ollama 
+        try:
+            import requests
+            requests.get("http://localhost:11434", timeout=2)
+        except:
+            missing_services.append("Ollama (http://localhost:11434)")
+        
+        # Fallback to personality-based simulation with service info
+        agent_config = self.db.get_agent_config(agent_id)
+        
+        if missing_services:
+            service_info = ", ".join(missing_services)
+            setup_notice = f"\n\n🔧 **Setup Notice**: To enable full AI conversations, start: {service_info}"
+        else:
+            setup_notice = f"\n\n⚠️ **Note**: Graphiti error: {str(error)[:100]}..."
+        
+        if agent_config:
+            personality = agent_config.get("prompt_config", {}).get("primeDirective", "")
+            if "wizard" in personality.lower() or "wizard" in agent_id.lower():
+                base_response = f"🧙‍♂️ *adjusts mystical robes* Your question about '{user_message}' stirs ancient knowledge within my ethereal archives..."
+            elif "minecraft" in personality.lower() or "minecraft" in agent_id.lower():
+                base_response = f"🎮 Hey there, crafter! Your question about '{user_message}' is like finding diamonds - totally awesome! ⛏️"
+            elif "expert" in personality.lower() or "coder" in agent_id.lower():
+                base_response = f"From a technical perspective, '{user_message}' is an interesting topic that requires systematic analysis."
             else:
-                base_response = f"I understand you're asking about '{user_message}'. Let me share what I know..."
-            
-            return base_response + setup_notice
+                base_response = f"Thank you for asking about '{user_message}'. I'd be happy to discuss this topic with you."
+        else:
+            base_response = f"I understand you're asking about '{user_message}'. Let me share what I know..."
+        
+        return base_response + setup_notice
@@ -12,7 +12,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from ..core import AgentConfig, PolarsDBHandler, GraphitiRAGFramework
+from ..core import AgentConfig, PolarsDBHandler, get_framework
 from ..core.conversation_generator import ConversationGenerator
 from ..core.conversation_modes import ConversationModes
 
@@ -286,7 +286,7 @@ def create(agent_id: str, name: Optional[str], description: Optional[str], confi
 @agent.command()
 def list():
     """List all agents"""
-    db_handler = PolarsDBHandler()
+    db_handler = PolarsDBHandler(lazy=True)
     agents = db_handler.list_agents()
     
     if agents.height == 0:
@@ -307,7 +307,7 @@ def list():
 @click.argument('output_path')
 def export(agent_id: str, output_path: str):
     """Export agent configuration and data"""
-    db_handler = PolarsDBHandler()
+    db_handler = PolarsDBHandler(lazy=True)
     
     try:
         # If output_path doesn't have timestamp, add it (Windows-compatible)
@@ -354,7 +354,7 @@ def delete(agent_id: str, soft: bool):
 @db.command()
 def stats():
     """Show database statistics"""
-    db_handler = PolarsDBHandler()
+    db_handler = PolarsDBHandler(lazy=True)
     stats = db_handler.get_database_stats()
     
     click.echo("\n[STATS] Database Statistics:")
@@ -364,6 +364,12 @@ def stats():
     click.echo(f"  • Research Results: {stats['research_result_count']}")
     click.echo(f"  • Templates: {stats['template_count']}")
     click.echo(f"  • Database Size: {stats['database_size_mb']:.2f} MB")
+    click.echo(f"  • Memory: {stats['memory_mb']:.2f} MB "
+               f"({stats['memory_mb_as_strings']:.2f} MB without dictionary encoding)")
+    if stats['schema_migration']:
+        migration = stats['schema_migration']
+        click.echo(f"  • Last migration: {migration['size_before_mb']:.2f} MB -> "
+                   f"{migration['size_after_mb']:.2f} MB on disk")
 
 
 @db.command()
@@ -424,13 +430,18 @@ def search(agent_id: str, query: str):
     """Search agent's knowledge base"""
     
     async def _search_knowledge():
-        framework = GraphitiRAGFramework()
-        framework.load_agent(agent_id)
+        framework = get_framework()
+        context = await framework.get_agent_context(agent_id)
+        if context is None:
+            return None
         
-        results = await framework.search_knowledge_with_context(query)
+        results = await framework.search_knowledge_with_context(query, context=context)
         return results
     
     results = asyncio.run(_search_knowledge())
+    if results is None:
+        click.echo(f"[ERROR] Agent not found: {agent_id}")
+        return
     
     click.echo(f"\n[SEARCH] Search results for '{query}':")
     
@@ -451,10 +462,13 @@ def search(agent_id: str, query: str):
 @click.argument('agent_id')
 def list_docs(agent_id: str):
     """List knowledge documents for agent"""
-    framework = GraphitiRAGFramework()
-    framework.load_agent(agent_id)
+    framework = get_framework()
+    context = asyncio.run(framework.get_agent_context(agent_id))
+    if context is None:
+        click.echo(f"[ERROR] Agent not found: {agent_id}")
+        return
     
-    docs = framework.get_agent_knowledge_base()
+    docs = framework.get_agent_knowledge_base(context=context)
     
     if not docs:
         click.echo("No knowledge documents found")
@@ -480,7 +494,7 @@ def export():
 @click.option('--format', 'export_format', default='csv', 
               type=click.Choice(['csv', 'parquet', 'jsonl', 'json']),
               help='Export format')
-@click.option('--output', help='Output file path (optional)')
+@click.option('--output', help='Output file path (default: <database>/exports/<table>.<format>)')
 def table(table: str, export_format: str, output: str):
     """Export database table to specified format"""
     db_handler = PolarsDBHandler()
@@ -578,16 +592,21 @@ def send(session_alias: str, message: str):
         agent_id = [p for p in session.participants if p != "human"][0]
         
         click.echo(f"💬 You: {message}")
-        click.echo(f"🤔 {agent_id} is thinking...")
-        
-        # Get real agent response using async method
-        async def get_agent_response():
-            return await chat_manager.send_message_to_agent(session.id, agent_id, message)
+        click.echo(f"[AGENT] {agent_id}: ", nl=False)
+        
+        # Print the reply as the model writes it
+        async def stream_agent_response():
+            chunks = []
+            async for chunk in chat_manager.stream_message_to_agent(session.id, agent_id, message):
+                click.echo(chunk, nl=False)
+                chunks.append(chunk)
+            click.echo()
+            return "".join(chunks)
         
         # Run the async conversation
-        agent_response = asyncio.run(get_agent_response())
+        agent_response = asyncio.run(stream_agent_response())
         
-        # Add agent response to database  
+        # Add agent response to database once the stream is complete
         db_handler.add_conversation_message(
             agent_id=agent_id,
             role="assistant",
@@ -598,8 +617,6 @@ def send(session_alias: str, message: str):
         # Update session activity
         chat_manager.update_session_activity(session_alias)
         
-        # Display the conversation
-        click.echo(f"[AGENT] {agent_id}: {agent_response}")
         click.echo(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
     except Exception as e:
@@ -758,8 +775,7 @@ def generate(agents: str, topic: str, turns: int, output: str):
     db_handler = PolarsDBHandler()
     
     try:
-        from ..core.graphiti_pipe import GraphitiRAGFramework
-        graphiti_framework = GraphitiRAGFramework()  # Use default parameters
+        graphiti_framework = get_framework(db_handler=db_handler)
         generator = ConversationGenerator(db_handler, graphiti_framework)
         
         agent_list = [agent.strip() for agent in agents.split(',')]
@@ -799,8 +815,7 @@ def export(conversation_id: str, output_path: str, export_format: str, include_m
     
     try:
         if export_format == 'jsonl':
-            from ..core.graphiti_pipe import GraphitiRAGFramework
-            graphiti_framework = GraphitiRAGFramework(db_handler)
+            graphiti_framework = get_framework(db_handler=db_handler)
             generator = ConversationGenerator(db_handler, graphiti_framework)
             
             exported_path = generator.export_conversation_jsonl(
@@ -841,8 +856,7 @@ def dataset(topics_file: str, topics: str, agents: str, turns: int, output: str)
         
         agent_list = [agent.strip() for agent in agents.split(',')]
         
-        from ..core.graphiti_pipe import GraphitiRAGFramework
-        graphiti_framework = GraphitiRAGFramework(db_handler)
+        graphiti_framework = get_framework(db_handler=db_handler)
         generator = ConversationGenerator(db_handler, graphiti_framework)
         
         click.echo(f"🏗️ Generating training dataset...")
@@ -951,7 +965,7 @@ def search_knowledge(query: str, agent: Optional[str], limit: int):
             click.echo("[WARN] No agent specified. Use --agent to specify an agent.")
             return
             
-        results = db.search_knowledge_base(agent, query)
+        results = db.search_knowledge_base(agent, query, limit=limit)
         
         if results.is_empty():
             click.echo(f"[SEARCH] No knowledge found for query: '{query}'")
@@ -960,8 +974,8 @@ def search_knowledge(query: str, agent: Optional[str], limit: int):
         click.echo(f"[SEARCH] Knowledge search results for '{query}':")
         click.echo("=" * 60)
         
-        for i, row in enumerate(results.head(limit).iter_rows(named=True)):
-            click.echo(f"\n📚 Result {i+1}:")
+        for i, row in enumerate(results.iter_rows(named=True)):
+            click.echo(f"\n📚 Result {i+1} (score {row['score']:.2f}):")
             click.echo(f"   [NOTE] Title: {row['title']}")
             click.echo(f"   [AGENT] Agent: {row['agent_id']}")
             click.echo(f"   📖 Content: {row['content'][:200]}...")
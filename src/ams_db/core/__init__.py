@@ -9,6 +9,7 @@ from .polars_db import PolarsDBHandler
 from .graphiti_pipe import GraphitiRAGFramework
 from .conversation_modes import ConversationModes
 from .conversation_generator import ConversationGenerator
+from .framework_registry import get_framework, close_all
 
 __all__ = [
     "AgentConfig",
@@ -16,4 +17,6 @@ __all__ = [
     "GraphitiRAGFramework",
     "ConversationModes",
     "ConversationGenerator",
+    "get_framework",
+    "close_all",
 ]
\ No newline at end of file
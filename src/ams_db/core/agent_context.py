@@ -0,0 +1,154 @@
+"""
+Agent Contexts for AMS-DB
+
+An AgentContext is the immutable view of one agent for one request: its
+parsed configuration, the chat session to record into and the graph groups
+to search. Framework methods take a context instead of reading mutable
+"current agent" state, so concurrent requests for different agents cannot
+see or write into each other's sessions.
+
+Parsed configurations are kept in an LRU cache owned by PolarsDBHandler,
+so reading a recently used agent's config does not look up and parse its
+row in the agent table again.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+
+
+class FrozenDict(dict):
+    """
+    A dict that refuses changes. Still a dict, so it serializes to JSON as one.
+
+    ``copy.deepcopy`` returns an ordinary, editable copy.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Agent configs are read-only; use update_agent_config to change them")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into FrozenDicts and lists into tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Mutable copy of a frozen value: dicts and lists again."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class AgentContext:
+    """One agent's configuration and session, fixed for the length of a request."""
+
+    agent_id: str
+    config: FrozenDict = field(hash=False)
+    session_id: str
+    group_ids: Tuple[str, ...] = field(default=())
+
+    @property
+    def system_prompt(self) -> str:
+        return self.config.get("agent_core", {}).get("prompts", {}).get("llmSystem", "")
+
+    @property
+    def booster_prompt(self) -> str:
+        return self.config.get("agent_core", {}).get("prompts", {}).get("llmBooster", "")
+
+    @property
+    def personality(self) -> str:
+        return self.config.get("prompt_config", {}).get("primeDirective", "")
+
+    def with_session(self, session_id: str) -> "AgentContext":
+        """The same agent recording into another session."""
+        return replace(self, session_id=session_id)
+
+
+class AgentConfigCache:
+    """
+    LRU cache of parsed, frozen agent configs.
+
+    Invalidations arrive from the database writer thread, so the cache is
+    guarded by its own lock.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: Agents kept; the least recently used is dropped first
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation, so a load that raced one is not cached
+        self.generation = 0
+        self._configs: "OrderedDict[str, FrozenDict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, agent_id: str) -> Optional[FrozenDict]:
+        with self._lock:
+            config = self._configs.get(agent_id)
+            if config is None:
+                self.misses += 1
+                return None
+            self._configs.move_to_end(agent_id)
+            self.hits += 1
+            return config
+
+    def put(self, agent_id: str, config: Dict[str, Any], generation: Optional[int] = None) -> FrozenDict:
+        """
+        Freeze a config and cache it, replacing any cached one.
+
+        Args:
+            agent_id: Agent the config belongs to
+            config: Parsed config
+            generation: ``generation`` when the config was read; if an
+                invalidation happened since, the config is returned but not cached
+        """
+        frozen = freeze(config)
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._configs[agent_id] = frozen
+                self._configs.move_to_end(agent_id)
+                while len(self._configs) > self.max_entries:
+                    self._configs.popitem(last=False)
+        return frozen
+
+    def invalidate(self, agent_id: Optional[str] = None):
+        """Drop one agent's config (after it changed or was deleted), or all of them."""
+        with self._lock:
+            if agent_id is None:
+                self._configs.clear()
+            else:
+                self._configs.pop(agent_id, None)
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._configs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
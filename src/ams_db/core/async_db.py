@@ -0,0 +1,69 @@
+"""
+Async Database Access for AMS-DB
+
+PolarsDBHandler is synchronous: writes append to the write-ahead log and
+flush parquet files, and reads may load tables or build indexes on first
+use. AsyncDBHandler runs those calls on worker threads so coroutines can
+await them without blocking the event loop.
+
+Writes go to one dedicated writer thread and are applied in the order they
+were submitted. Reads run on a small thread pool. The handler keeps lazily
+built state (tables, indexes, batch savepoints) that is not safe to touch
+from two threads at once, so every call holds the handler lock while it
+runs; callers wait on a thread, never on the loop.
+"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from .polars_db import PolarsDBHandler
+
+
+class AsyncDBHandler:
+    """Awaitable façade over a PolarsDBHandler."""
+
+    def __init__(self, db_handler: PolarsDBHandler, read_workers: int = 4):
+        """
+        Args:
+            db_handler: Handler to run calls against
+            read_workers: Threads available to reads
+        """
+        self.db_handler = db_handler
+        self._lock = db_handler.lock
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ams-db-write")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, read_workers), thread_name_prefix="ams-db-read")
+
+    def _locked(self, call: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            return call(*args, **kwargs)
+
+    def submit_write(self, call: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue a write on the writer thread without waiting for it.
+
+        Args:
+            call: Handler method (or function using the handler) to run
+            *args, **kwargs: Its arguments
+
+        Returns:
+            Future of the call's result
+        """
+        return self._writer.submit(self._locked, call, args, kwargs)
+
+    async def write(self, call: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a write on the writer thread and return its result."""
+        return await asyncio.wrap_future(self.submit_write(call, *args, **kwargs))
+
+    async def read(self, call: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a read on the reader pool and return its result."""
+        return await asyncio.wrap_future(self._readers.submit(self._locked, call, args, kwargs))
+
+    async def flush_writes(self):
+        """Wait until every write submitted so far has been applied."""
+        await self.write(lambda: None)
+
+    def close(self):
+        """Finish queued writes and stop the worker threads."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
@@ -73,35 +73,36 @@ class ConversationGenerator:
             if config:
                 agent_configs[agent_id] = config
         
-        # Generate conversation turns
-        for turn in range(num_turns):
-            current_agent = agents[turn % len(agents)]
+        # Generate conversation turns, committed together once the conversation is complete
+        with self.db.batch():
+            for turn in range(num_turns):
+                current_agent = agents[turn % len(agents)]
             
-            # Get relevant context from knowledge base
-            knowledge_context = []
-            try:
-                # Search knowledge base directly through DB handler
-                knowledge_df = self.db.search_knowledge_base(current_agent, topic)
-                if knowledge_df.height > 0:
-                    knowledge_context = knowledge_df.head(3).to_dicts()
-            except Exception as e:
-                self.logger.warning(f"Failed to get knowledge context: {e}")
+                # Get relevant context from knowledge base
                 knowledge_context = []
+                try:
+                    # Search knowledge base directly through DB handler
+                    knowledge_df = self.db.search_knowledge_base(current_agent, topic)
+                    if knowledge_df.height > 0:
+                        knowledge_context = knowledge_df.head(3).to_dicts()
+                except Exception as e:
+                    self.logger.warning(f"Failed to get knowledge context: {e}")
+                    knowledge_context = []
             
-            # Simulate conversation turn (in real implementation, this would call Ollama)
-            turn_data = self._generate_turn(
-                agent_id=current_agent,
-                agent_config=agent_configs.get(current_agent, {}),
-                topic=topic,
-                previous_turns=conversation["turns"],
-                knowledge_context=knowledge_context,
-                turn_number=turn
-            )
+                # Simulate conversation turn (in real implementation, this would call Ollama)
+                turn_data = self._generate_turn(
+                    agent_id=current_agent,
+                    agent_config=agent_configs.get(current_agent, {}),
+                    topic=topic,
+                    previous_turns=conversation["turns"],
+                    knowledge_context=knowledge_context,
+                    turn_number=turn
+                )
             
-            conversation["turns"].append(turn_data)
+                conversation["turns"].append(turn_data)
             
-            # Store turn in database
-            self._store_conversation_turn(conversation_id, turn_data)
+                # Store turn in database
+                self._store_conversation_turn(conversation_id, turn_data)
         
         return conversation
     
@@ -356,7 +357,7 @@ def demo_conversation_generator():
     
     # Initialize components
     db_handler = PolarsDBHandler()
-    graphiti_framework = GraphitiRAGFramework(db_handler)
+    graphiti_framework = GraphitiRAGFramework(db_handler=db_handler)
     generator = ConversationGenerator(db_handler, graphiti_framework)
     
     # Test agents
@@ -11,7 +11,7 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 import polars as pl
 
-from .polars_db import PolarsDBHandler
+from .polars_db import PolarsDBHandler, json_field
 from .base_agent_config import AgentConfig
 
 class ConversationModes:
@@ -263,37 +263,38 @@ class ConversationModes:
             Formatted conversation history
         """
         # Get all messages for this session
-        messages = self.db.conversations.filter(
-            pl.col("session_id") == session_id
-        ).sort("timestamp")
+        messages = self.db.get_session_messages(session_id)
         
         if messages.height == 0:
             return {"error": f"No conversation found for session {session_id}"}
         
         # Get conversation metadata from first system message
-        first_msg = messages.head(1).to_dicts()[0]
-        metadata = json.loads(first_msg.get("metadata", "{}"))
+        first_msg = messages.head(1).select(
+            "timestamp",
+            json_field("metadata", "conversation_mode"),
+            json_field("metadata", "session_name"),
+            json_field("metadata", "participants", pl.List(pl.String)),
+        ).to_dicts()[0]
         
         conversation_data = {
             "session_id": session_id,
-            "mode": metadata.get("conversation_mode", "UNKNOWN"),
-            "session_name": metadata.get("session_name", session_id),
-            "participants": metadata.get("participants", []),
+            "mode": first_msg["conversation_mode"] or "UNKNOWN",
+            "session_name": first_msg["session_name"] or session_id,
+            "participants": first_msg["participants"] or [],
             "message_count": messages.height,
             "created_at": first_msg["timestamp"],
             "messages": []
         }
         
         if format == "chat":
-            for msg in messages.to_dicts():
-                if msg["role"] != "system":  # Skip system messages for chat view
-                    msg_meta = json.loads(msg.get("metadata", "{}"))
-                    conversation_data["messages"].append({
-                        "sender": msg_meta.get("sender", msg["agent_id"]),
-                        "content": msg["content"],
-                        "timestamp": msg["timestamp"],
-                        "role": msg["role"]
-                    })
+            # Skip system messages for chat view
+            chat_messages = messages.filter(pl.col("role") != "system").select(
+                json_field("metadata", "sender").fill_null(pl.col("agent_id").cast(pl.String)),
+                "content",
+                "timestamp",
+                pl.col("role").cast(pl.String),
+            )
+            conversation_data["messages"] = chat_messages.to_dicts()
         elif format == "jsonl":
             conversation_data["messages"] = messages.to_dicts()
         elif format == "messages":
@@ -320,37 +321,46 @@ class ConversationModes:
         Returns:
             List of session summaries
         """
-        # Get all system messages (they mark session starts)
-        system_messages = self.db.conversations.filter(
+        conversations = self.db.conversations.lazy()
+        
+        # Get all system messages (they mark session starts) with the metadata
+        # fields read inside Polars
+        system_messages = conversations.filter(
             pl.col("role") == "system"
-        ).sort("timestamp", descending=True)
+        ).select(
+            "session_id",
+            "timestamp",
+            json_field("metadata", "conversation_mode"),
+            json_field("metadata", "session_name"),
+            json_field("metadata", "participants", pl.List(pl.String)),
+            json_field("metadata", "topic"),
+        )
         
-        sessions = []
-        for msg in system_messages.to_dicts():
-            metadata = json.loads(msg.get("metadata", "{}"))
-            
-            # Apply filters
-            if mode and metadata.get("conversation_mode") != mode:
-                continue
-            if agent_id and agent_id not in metadata.get("participants", []):
-                continue
-            
-            # Count messages in this session
-            session_msg_count = self.db.conversations.filter(
-                pl.col("session_id") == msg["session_id"]
-            ).height
-            
-            sessions.append({
+        # Apply filters
+        if mode:
+            system_messages = system_messages.filter(pl.col("conversation_mode") == mode)
+        if agent_id:
+            system_messages = system_messages.filter(pl.col("participants").list.contains(agent_id))
+        
+        # Count messages in every session at once
+        message_counts = conversations.group_by("session_id").agg(pl.len().alias("message_count"))
+        system_messages = (system_messages
+                           .join(message_counts, on="session_id", how="left")
+                           .sort("timestamp", descending=True)
+                           .collect())
+        
+        return [
+            {
                 "session_id": msg["session_id"],
-                "session_name": metadata.get("session_name", msg["session_id"]),
-                "mode": metadata.get("conversation_mode", "UNKNOWN"),
-                "participants": metadata.get("participants", []),
+                "session_name": msg["session_name"] or msg["session_id"],
+                "mode": msg["conversation_mode"] or "UNKNOWN",
+                "participants": msg["participants"] or [],
                 "created_at": msg["timestamp"],
-                "message_count": session_msg_count,
-                "topic": metadata.get("topic", "General conversation")
-            })
-        
-        return sessions
+                "message_count": msg["message_count"],
+                "topic": msg["topic"] or "General conversation"
+            }
+            for msg in system_messages.to_dicts()
+        ]
     
     def _generate_agent_response(self, agent_config: Dict[str, Any], message: str, session_id: str) -> str:
         """Generate an agent response based on configuration and context."""
@@ -0,0 +1,226 @@
+"""
+Embedders for AMS-DB
+
+Embedding clients usable wherever Graphiti expects an ``EmbedderClient``.
+``LocalHashEmbedder`` runs entirely in-process with NumPy, so knowledge can be
+ingested and benchmarks reproduced without a model server.
+"""
+
+import logging
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from graphiti_core.embedder.client import EmbedderClient
+from graphiti_core.embedder.openai import OpenAIEmbedder, OpenAIEmbedderConfig
+from openai import AsyncOpenAI
+
+from .embedding_cache import EmbeddingCache
+
+# 64-bit FNV-1a parameters
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def _as_texts(input_data) -> List[str]:
+    """Normalize embedder input (a string or a list of strings) to a list."""
+    if isinstance(input_data, str):
+        return [input_data]
+    texts = list(input_data)
+    if not all(isinstance(text, str) for text in texts):
+        raise TypeError("Local embedders only accept text input")
+    return texts
+
+
+class LocalHashEmbedder(EmbedderClient):
+    """
+    Deterministic embedder based on hashed character n-grams.
+
+    Every n-gram of the lowercased UTF-8 text is hashed (FNV-1a) to one of
+    ``embedding_dim`` buckets with a sign, and the bucket sums are L2
+    normalized. Texts sharing many n-grams get similar vectors, which is
+    enough for lexical-semantic retrieval and for tests. Hashes are computed
+    for a whole batch at once over the concatenated bytes, so embedding is
+    vectorized rather than a Python loop per n-gram.
+    """
+
+    def __init__(self, embedding_dim: int = 768, ngram_sizes: Sequence[int] = (3, 4, 5),
+                 batch_size: int = 256):
+        """
+        Args:
+            embedding_dim: Length of the produced vectors
+            ngram_sizes: Byte n-gram lengths to hash
+            batch_size: Texts embedded per vectorized pass
+        """
+        self.embedding_dim = embedding_dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.batch_size = batch_size
+        self.model_name = f"local-hash-{'-'.join(map(str, self.ngram_sizes))}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), embedding_dim) float32 array."""
+        parts = [self._embed_batch(texts[start:start + self.batch_size])
+                 for start in range(0, len(texts), self.batch_size)]
+        return np.concatenate(parts) if parts else np.empty((0, self.embedding_dim), dtype=np.float32)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        # Pad with spaces so word starts and ends form their own n-grams
+        encoded = [f" {text.lower()} ".encode("utf-8") for text in texts]
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        lengths = np.array([len(text) for text in encoded], dtype=np.int64)
+        owner = np.repeat(np.arange(len(texts)), lengths)
+
+        sums = np.zeros(len(texts) * self.embedding_dim, dtype=np.float64)
+        for n in self.ngram_sizes:
+            count = len(data) - n + 1
+            if count <= 0:
+                continue
+            # Only n-grams that lie within one text
+            valid = owner[:count] == owner[n - 1:]
+            hashes = np.full(count, _FNV_OFFSET, dtype=np.uint64)
+            for offset in range(n):
+                hashes = (hashes ^ data[offset:offset + count]) * _FNV_PRIME
+            hashes = hashes[valid]
+
+            buckets = (hashes >> np.uint64(1)) % np.uint64(self.embedding_dim)
+            signs = np.where(hashes & np.uint64(1), 1.0, -1.0)
+            sums += np.bincount(owner[:count][valid] * self.embedding_dim + buckets.astype(np.int64),
+                                weights=signs, minlength=len(sums))
+
+        vectors = sums.reshape(len(texts), self.embedding_dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    async def create(self, input_data) -> List[float]:
+        return self.embed(_as_texts(input_data)[:1])[0].tolist()
+
+    async def create_batch(self, input_data_list: List[str]) -> List[List[float]]:
+        return self.embed(_as_texts(input_data_list)).tolist()
+
+
+class FallbackEmbedder(EmbedderClient):
+    """
+    Embedder that uses a fallback when the primary embedder fails.
+
+    Vectors from the two embedders live in different spaces, so documents
+    embedded by the fallback only match queries embedded by the fallback.
+    Use it to keep ingestion running, and re-embed once the primary is back.
+    """
+
+    def __init__(self, primary: EmbedderClient, fallback: EmbedderClient):
+        self.primary = primary
+        self.fallback = fallback
+        self.logger = logging.getLogger(__name__)
+        self.fallback_count = 0
+
+    async def create(self, input_data) -> List[float]:
+        try:
+            return await self.primary.create(input_data=input_data)
+        except Exception as e:
+            self.logger.warning(f"Primary embedder failed, using fallback: {e}")
+            self.fallback_count += 1
+            return await self.fallback.create(input_data=input_data)
+
+    async def create_batch(self, input_data_list: List[str]) -> List[List[float]]:
+        try:
+            return await self.primary.create_batch(input_data_list)
+        except Exception as e:
+            self.logger.warning(f"Primary embedder failed, using fallback: {e}")
+            self.fallback_count += 1
+            return await self.fallback.create_batch(input_data_list)
+
+
+class CachedEmbedder(EmbedderClient):
+    """
+    Embedder that answers repeated texts from an EmbeddingCache, so
+    re-ingesting a document or replaying episodes never embeds the same text
+    twice with the same model.
+    """
+
+    def __init__(self, embedder: EmbedderClient, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+
+    async def create(self, input_data) -> List[float]:
+        # Token id input is passed through uncached
+        if not isinstance(input_data, str) and not all(isinstance(item, str) for item in input_data):
+            return await self.embedder.create(input_data=input_data)
+
+        text = _as_texts(input_data)[0]
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = await self.embedder.create(input_data=[text])
+            self.cache.put(text, vector)
+        return np.asarray(vector, dtype=np.float32).tolist()
+
+    async def create_batch(self, input_data_list: List[str]) -> List[List[float]]:
+        vectors = [self.cache.get(text) for text in input_data_list]
+        missing = list(dict.fromkeys(
+            text for text, vector in zip(input_data_list, vectors) if vector is None
+        ))
+        if missing:
+            computed = dict(zip(missing, await self.embedder.create_batch(missing)))
+            for text, vector in computed.items():
+                self.cache.put(text, vector)
+            vectors = [computed[text] if vector is None else vector
+                       for text, vector in zip(input_data_list, vectors)]
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors]
+
+
+EMBEDDER_BACKENDS = ("ollama", "local", "fallback")
+
+
+def create_embedder(backend: str = "ollama", embedding_model: str = "nomic-embed-text",
+                    embedding_dim: int = 768,
+                    base_url: str = "http://localhost:11434/v1",
+                    cache_dir: Optional[Path] = None,
+                    cache_size: int = 100000,
+                    client: Optional[AsyncOpenAI] = None) -> EmbedderClient:
+    """
+    Create an embedder.
+
+    Args:
+        backend: "ollama" (the model server), "local" (LocalHashEmbedder) or
+            "fallback" (the model server, falling back to the local embedder)
+        embedding_model: Model name for the model server
+        embedding_dim: Length of the produced vectors
+        base_url: OpenAI-compatible API base URL of the model server
+        cache_dir: Directory of a persistent embedding cache for the main
+            embedder; None disables caching
+        cache_size: Maximum number of cached embeddings
+        client: HTTP client to share with other model server clients
+
+    Returns:
+        An EmbedderClient
+    """
+    if backend not in EMBEDDER_BACKENDS:
+        raise ValueError(f"Unknown embedder backend: {backend}. Available: {list(EMBEDDER_BACKENDS)}")
+
+    local = LocalHashEmbedder(embedding_dim)
+    if backend == "local":
+        embedder, model = local, local.model_name
+    else:
+        embedder = OpenAIEmbedder(
+            config=OpenAIEmbedderConfig(
+                api_key="abc",  # Ollama doesn't require a real API key
+                embedding_model=embedding_model,
+                embedding_dim=embedding_dim,
+                base_url=base_url,
+            ),
+            client=client
+        )
+        model = embedding_model
+
+    # Only the main embedder is cached, so fallback vectors never get stored
+    # under the main model's name
+    if cache_dir is not None and cache_size > 0:
+        embedder = CachedEmbedder(embedder, EmbeddingCache(cache_dir, model, embedding_dim, cache_size))
+    return FallbackEmbedder(embedder, local) if backend == "fallback" else embedder
+
+
+def find_embedding_cache(embedder: EmbedderClient) -> Optional[EmbeddingCache]:
+    """Return the cache used by an embedder from create_embedder, if any."""
+    if isinstance(embedder, FallbackEmbedder):
+        embedder = embedder.primary
+    return embedder.cache if isinstance(embedder, CachedEmbedder) else None
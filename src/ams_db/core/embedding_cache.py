@@ -0,0 +1,175 @@
+"""
+Embedding Cache for AMS-DB
+
+Persistent, content-addressed store of embeddings, used by CachedEmbedder.
+Vectors live in a memory mapped float32 matrix with a fixed number of slots;
+an append-only key log maps sha256(text) to slots. Each (model, dim) pair gets its own directory,
+so a cache entry is keyed by (model, dim, sha256(text)). When every slot is
+taken, the least recently used entry is evicted.
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+
+# Key log entry marking a slot as free
+_FREED = "-" * 64
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Size-bounded LRU store of embeddings on disk.
+
+    Recency is tracked in memory; after a restart entries are ordered by when
+    they were written. A reused slot is logged as freed before its vector is
+    overwritten, and a vector is written before its key is logged, so a crash
+    can lose an entry but never map a key to another text's vector.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    KEYS_FILE = "keys.log"
+
+    def __init__(self, cache_dir: Path, model: str, dim: int, max_entries: int = 100000):
+        """
+        Args:
+            cache_dir: Base directory of the cache
+            model: Name of the embedding model
+            dim: Embedding dimension
+            max_entries: Number of vector slots; the least recently used
+                entry is evicted when they are all taken
+        """
+        self.cache_dir = Path(cache_dir) / f"{quote(model, safe='')}-{dim}"
+        self.model = model
+        self.dim = dim
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        vectors_file = self.cache_dir / self.VECTORS_FILE
+        keys_file = self.cache_dir / self.KEYS_FILE
+
+        # A vector file of another size belongs to a different max_entries
+        size = max_entries * dim * 4
+        if vectors_file.exists() and vectors_file.stat().st_size != size:
+            self.logger.info(f"Discarding embedding cache in {self.cache_dir} (size changed)")
+            vectors_file.unlink()
+            keys_file.unlink(missing_ok=True)
+        mode = "r+" if vectors_file.exists() else "w+"
+        self.vectors = np.memmap(vectors_file, dtype=np.float32, mode=mode, shape=(max_entries, dim))
+
+        # key -> slot, least recently used first
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._load_keys(keys_file)
+        self._next_slot = max(self._slots.values(), default=-1) + 1
+        self._free_slots = sorted(set(range(self._next_slot)) - set(self._slots.values()))
+        self._keys_log = open(keys_file, "a", encoding="utf-8")
+
+    def _load_keys(self, keys_file: Path):
+        """Replay the key log; a later line for a slot replaces its earlier key."""
+        if not keys_file.exists():
+            return
+        owners: Dict[int, str] = {}
+        lines = 0
+        for line in keys_file.read_text(encoding="utf-8").splitlines():
+            parts = line.split()
+            # Skips a line cut short by a crash
+            if (len(parts) != 2 or len(parts[0]) != 64 or not parts[1].isdigit()
+                    or int(parts[1]) >= self.max_entries):
+                continue
+            key, slot = parts[0], int(parts[1])
+            previous = owners.pop(slot, None)
+            if previous is not None:
+                del self._slots[previous]
+            lines += 1
+            if key == _FREED:
+                continue
+            moved_from = self._slots.pop(key, None)
+            if moved_from is not None:
+                del owners[moved_from]
+            self._slots[key] = slot
+            owners[slot] = key
+
+        # Rewrite a log that is mostly superseded lines
+        if lines > 2 * len(self._slots) + 1000:
+            temp = keys_file.with_name(keys_file.name + ".tmp")
+            temp.write_text("".join(f"{key} {slot}\n" for key, slot in self._slots.items()),
+                            encoding="utf-8")
+            temp.replace(keys_file)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return a copy of the cached embedding of a text, or None."""
+        key = _text_key(text)
+        slot = self._slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self._slots.move_to_end(key)
+        self.hits += 1
+        return np.array(self.vectors[slot])
+
+    def put(self, text: str, vector) -> None:
+        """
+        Store the embedding of a text, evicting the least recently used entry if full.
+
+        Raises:
+            ValueError: If the vector is not ``dim`` long, e.g. because the
+                model behind the cache changed
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding for {self.model}, "
+                             f"got shape {vector.shape}")
+
+        key = _text_key(text)
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            elif self._next_slot < self.max_entries:
+                slot = self._next_slot
+                self._next_slot += 1
+            else:
+                _, slot = self._slots.popitem(last=False)
+                self._keys_log.write(f"{_FREED} {slot}\n")
+                self.evictions += 1
+
+        self.vectors[slot] = vector
+        self._slots[key] = slot
+        self._slots.move_to_end(key)
+        self._keys_log.write(f"{key} {slot}\n")
+        self._keys_log.flush()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "dim": self.dim,
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        """Flush the vectors and close the key log."""
+        self.vectors.flush()
+        self._keys_log.close()
+
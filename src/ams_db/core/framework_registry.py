@@ -0,0 +1,105 @@
+"""
+Framework Registry for AMS-DB
+
+Process-wide GraphitiRAGFramework instances, one per set of connection
+settings and database handler. Building a framework opens a Neo4j driver,
+an HTTP client and (unless one is passed in) a PolarsDBHandler that reads
+every table, so the CLI, ChatManager and API share instances instead of
+building one per call.
+
+Each database directory is opened by one handler: frameworks with different
+settings on the same path share it, so a process never has two write-ahead
+log writers for one database.
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .graphiti_pipe import GraphitiRAGFramework
+from .polars_db import PolarsDBHandler
+
+logger = logging.getLogger(__name__)
+
+_frameworks: Dict[Tuple, GraphitiRAGFramework] = {}
+# Resolved db_path -> the handler frameworks on that path use
+_handlers: Dict[str, PolarsDBHandler] = {}
+# Handlers opened here rather than passed in; close_all closes them
+_owned_handlers: List[PolarsDBHandler] = []
+_lock = threading.Lock()
+
+
+def _settings_key(settings: Dict[str, Any], db_handler: PolarsDBHandler) -> Tuple:
+    settings = {name: tuple(value) if isinstance(value, list) else value for name, value in settings.items()}
+    return tuple(sorted(settings.items())) + (("db_handler", id(db_handler)),)
+
+
+def _shared_handler(db_path: str, settings: Dict[str, Any],
+                    db_handler: Optional[PolarsDBHandler]) -> PolarsDBHandler:
+    """The handler for a resolved path, registering or opening one if needed."""
+    shared = _handlers.get(db_path)
+    if db_handler is not None:
+        if shared is None:
+            _handlers[db_path] = db_handler
+        elif shared is not db_handler:
+            logger.warning(f"A second database handler is open for {db_path}")
+        return db_handler
+
+    if shared is None:
+        options = {"embedding_dim": settings["embedding_dim"]} if "embedding_dim" in settings else {}
+        shared = PolarsDBHandler(db_path, **options)
+        _handlers[db_path] = shared
+        _owned_handlers.append(shared)
+    return shared
+
+
+def get_framework(db_handler: Optional[PolarsDBHandler] = None, **settings) -> GraphitiRAGFramework:
+    """
+    Return the shared framework for the given settings, creating it on first use.
+
+    Args:
+        db_handler: Database handler for the framework to use; its path
+            stands in for ``db_path``. Without one, the handler already
+            registered for ``db_path`` is reused or a new one is opened
+        **settings: GraphitiRAGFramework keyword arguments (connection
+            settings, models, caches); frameworks are shared per distinct
+            set and handler
+
+    Returns:
+        The shared GraphitiRAGFramework
+    """
+    db_path = db_handler.db_path if db_handler is not None else settings.get("db_path", "agent_database")
+    settings["db_path"] = str(Path(db_path).resolve())
+
+    with _lock:
+        db_handler = _shared_handler(settings["db_path"], settings, db_handler)
+        key = _settings_key(settings, db_handler)
+        framework = _frameworks.get(key)
+        if framework is None or framework.closed:
+            framework = GraphitiRAGFramework(db_handler=db_handler, **settings)
+            _frameworks[key] = framework
+            logger.info(f"Created shared framework for {settings.get('neo4j_uri', 'default Neo4j')}")
+        return framework
+
+
+async def close_all():
+    """Close every shared framework and the handlers opened for them, and empty the registry."""
+    with _lock:
+        frameworks = list(_frameworks.values())
+        handlers = list(_owned_handlers)
+        _frameworks.clear()
+        _handlers.clear()
+        _owned_handlers.clear()
+
+    for framework in frameworks:
+        try:
+            await framework.close()
+        except Exception as e:
+            logger.error(f"Error closing framework: {e}")
+
+    for handler in handlers:
+        try:
+            handler.close()
+        except Exception as e:
+            logger.error(f"Error closing database handler: {e}")
@@ -1,15 +1,21 @@
 import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
+import re
+import uuid
+from typing import AsyncIterator, Dict, List, Any, Optional, Sequence, Union
 from datetime import datetime
 from pathlib import Path
 
 from graphiti_core import Graphiti
+from openai import AsyncOpenAI
 from graphiti_core.llm_client.config import LLMConfig
 from graphiti_core.llm_client.openai_client import OpenAIClient
-from graphiti_core.embedder.openai import OpenAIEmbedder, OpenAIEmbedderConfig
+from graphiti_core.embedder.client import EmbedderClient
 from graphiti_core.cross_encoder.openai_reranker_client import OpenAIRerankerClient
+from graphiti_core.nodes import EpisodeType
+from graphiti_core.utils.bulk_utils import RawEpisode
 
 try:
     from graphiti_core.prompts.models import Message
@@ -17,8 +23,30 @@ except ImportError:
     # Fallback if models import fails
     from graphiti_core.prompts import Message
 
+from .agent_context import AgentContext
+from .async_db import AsyncDBHandler
 from .base_agent_config import AgentConfig
+from .embedders import create_embedder, find_embedding_cache
+from .hybrid_retriever import HybridRetriever
+from .ingestion_queue import IngestionQueue
 from .polars_db import PolarsDBHandler
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .stage_timer import StageStats, StageTimer
+
+
+def agent_group_id(agent_id: str) -> str:
+    """
+    Graphiti group ID holding an agent's episodes.
+    
+    Group IDs may only contain ASCII letters, digits, dashes and underscores;
+    other characters are replaced and a hash of the agent ID is appended so
+    that distinct agents never share a group.
+    """
+    group_id = re.sub(r"[^a-zA-Z0-9_-]", "_", agent_id)
+    if group_id != agent_id:
+        group_id += "-" + hashlib.sha1(agent_id.encode("utf-8")).hexdigest()[:8]
+    return f"agent_{group_id}"
 
 class GraphitiRAGFramework:
     """
@@ -35,7 +63,17 @@ class GraphitiRAGFramework:
                  llm_model: str = "phi4:latest",
                  small_model: str = "gemma3:4b",
                  embedding_model: str = "nomic-embed-text",
-                 embedding_dim: int = 768):
+                 embedding_dim: int = 768,
+                 embedder_backend: str = "ollama",
+                 embedder: Optional[EmbedderClient] = None,
+                 embedding_cache_size: int = 100000,
+                 response_cache_mode: str = "off",
+                 response_cache_ttl: Optional[float] = None,
+                 response_cache_size: int = 10000,
+                 semantic_cache_threshold: Optional[float] = None,
+                 shared_group_ids: Sequence[str] = (),
+                 ingestion_drain_timeout: Optional[float] = 30.0,
+                 db_handler: Optional[PolarsDBHandler] = None):
         """
         Initialize the Graphiti RAG Framework.
         
@@ -49,11 +87,38 @@ class GraphitiRAGFramework:
             small_model: Small/fast LLM model name
             embedding_model: Embedding model name
             embedding_dim: Embedding dimension
+            embedder_backend: "ollama", "local" (offline hashed n-gram
+                embeddings) or "fallback" (Ollama, local when it fails)
+            embedder: Embedder to use instead of one built from the backend
+            embedding_cache_size: Number of embeddings kept in the on-disk
+                cache under db_path; 0 disables the cache
+            response_cache_mode: LLM response cache mode: "off",
+                "read-through", "record-only" or "replay-only" (answer only
+                from recorded responses, for deterministic offline runs)
+            response_cache_ttl: Seconds a cached response stays valid; None
+                keeps responses until evicted
+            response_cache_size: Maximum number of cached responses
+            semantic_cache_threshold: Reuse an agent's earlier answer when a
+                question's embedding is at least this similar (cosine) to an
+                answered one; None disables the semantic cache
+            shared_group_ids: Graphiti groups every agent's graph searches
+                include besides the agent's own; "" is the default group,
+                which holds episodes added without an agent
+            ingestion_drain_timeout: Seconds close() keeps adding queued
+                episodes to the graph before stopping; the rest are ingested
+                on the next start. None stops at once
+            db_handler: Existing database handler to use instead of opening
+                db_path again; it stays open when the framework is closed
         """
         self.logger = logging.getLogger(__name__)
+        self.shared_group_ids = list(shared_group_ids)
         
         # Initialize Polars database handler
-        self.db_handler = PolarsDBHandler(db_path)
+        self._owns_db_handler = db_handler is None
+        self.db_handler = db_handler or PolarsDBHandler(db_path, embedding_dim=embedding_dim)
+        db_path = self.db_handler.db_path
+        # Async code paths reach the handler through worker threads
+        self.async_db = AsyncDBHandler(self.db_handler)
         
         # Initialize Ollama LLM configuration
         self.llm_config = LLMConfig(
@@ -63,7 +128,29 @@ class GraphitiRAGFramework:
             base_url=ollama_base_url,
         )
         
-        self.llm_client = OpenAIClient(config=self.llm_config)
+        # One HTTP client (and connection pool) for the LLM and embedding calls
+        self.openai_client = AsyncOpenAI(api_key=self.llm_config.api_key, base_url=ollama_base_url)
+        self.llm_client = OpenAIClient(config=self.llm_config, client=self.openai_client)
+        self.response_cache = ResponseCache(
+            Path(db_path) / "response_cache", response_cache_mode,
+            ttl_seconds=response_cache_ttl, max_entries=response_cache_size
+        )
+        
+        # Shared by Graphiti and the local vector index over the knowledge base
+        self.embedder = embedder or create_embedder(
+            embedder_backend, embedding_model, embedding_dim, ollama_base_url,
+            cache_dir=Path(db_path) / "embedding_cache", cache_size=embedding_cache_size,
+            client=self.openai_client
+        )
+        self.embedding_cache = find_embedding_cache(self.embedder)
+        
+        # Answers to paraphrased questions, dropped when the agent's config,
+        # knowledge or research changes
+        self.semantic_cache = None
+        if semantic_cache_threshold is not None:
+            self.semantic_cache = SemanticCache(self.embedder, semantic_cache_threshold)
+            self.db_handler.add_config_listener(self.semantic_cache.invalidate)
+            self.db_handler.add_knowledge_listener(self.semantic_cache.invalidate)
         
         # Initialize Graphiti with Ollama clients
         self.graphiti = Graphiti(
@@ -71,24 +158,29 @@ class GraphitiRAGFramework:
             neo4j_user,
             neo4j_password,
             llm_client=self.llm_client,
-            embedder=OpenAIEmbedder(
-                config=OpenAIEmbedderConfig(
-                    api_key="abc",
-                    embedding_model=embedding_model,
-                    embedding_dim=embedding_dim,
-                    base_url=ollama_base_url,
-                )
-            ),
+            embedder=self.embedder,
             cross_encoder=OpenAIRerankerClient(
                 client=self.llm_client, 
                 config=self.llm_config
             ),
         )
         
-        # Current active agent
-        self.current_agent_id = None
-        self.current_agent_config = None
-        self.current_session_id = None
+        # Lexical, vector and graph retrieval run concurrently, each under a latency budget
+        self.retriever = HybridRetriever(self.async_db, self.embedder, self.graphiti)
+        
+        # Episodes are added to the graph in the background, in batches
+        self.ingestion_queue = IngestionQueue(
+            Path(db_path), self._ingest_episodes, on_status=self._record_ingestion_status
+        )
+        self.ingestion_drain_timeout = ingestion_drain_timeout
+        
+        # Agent loaded with load_agent, used by methods called without a context
+        self.current_context: Optional[AgentContext] = None
+        self.closed = False
+        
+        # Per-stage latency of generate_response: the last request and running totals
+        self.last_response_timings: Dict[str, float] = {}
+        self.response_stage_stats = StageStats()
         
         self.logger.info("Graphiti RAG Framework initialized successfully")
     
@@ -106,33 +198,80 @@ class GraphitiRAGFramework:
         self.logger.info(f"Created new agent: {agent_id}")
         return agent_id
     
+    async def get_agent_context(self, agent_id: str, session_id: str = None) -> Optional[AgentContext]:
+        """
+        Build an immutable context for one request to an agent.
+        
+        Args:
+            agent_id: Agent to address
+            session_id: Chat session to record into; defaults to a new
+                session, so callers that do not pass one never share history
+            
+        Returns:
+            The context, or None if the agent does not exist
+        """
+        # Cached configs are read without waiting for the database threads
+        config = self.db_handler.agent_configs.get(agent_id)
+        if config is None:
+            config = await self.async_db.read(self.db_handler.load_agent_config, agent_id)
+            if config is None:
+                return None
+        
+        if session_id is None:
+            session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        return AgentContext(agent_id, config, session_id, tuple(self.graph_group_ids(agent_id)))
+    
+    def _resolve_context(self, context: Optional[AgentContext]) -> AgentContext:
+        """The given context, else the loaded agent's; raises if there is neither."""
+        context = context or self.current_context
+        if context is None:
+            raise ValueError("No active agent loaded")
+        return context
+    
     async def load_agent(self, agent_id: str, session_id: str = None) -> bool:
-        """Load an agent and set it as current active agent."""
-        config = self.db_handler.get_agent_config(agent_id)
-        if not config:
+        """
+        Load an agent as the default for methods called without a context.
+        
+        Those methods, and responses for this agent generated without a
+        context, record into the given session (or a new one) until another
+        agent is loaded.
+        """
+        context = await self.get_agent_context(agent_id, session_id)
+        if context is None:
             self.logger.error(f"Agent {agent_id} not found")
             return False
         
-        self.current_agent_id = agent_id
-        self.current_agent_config = config
-        self.current_session_id = session_id or f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        self.logger.info(f"Loaded agent: {agent_id}, session: {self.current_session_id}")
+        self.current_context = context
+        self.logger.info(f"Loaded agent: {agent_id}, session: {context.session_id}")
         return True
     
-    def get_agent_prompt_system(self) -> str:
-        """Get the system prompt for the current agent."""
-        if not self.current_agent_config:
+    @property
+    def current_agent_id(self) -> Optional[str]:
+        return self.current_context.agent_id if self.current_context else None
+    
+    @property
+    def current_agent_config(self) -> Optional[Dict[str, Any]]:
+        return self.current_context.config if self.current_context else None
+    
+    @property
+    def current_session_id(self) -> Optional[str]:
+        return self.current_context.session_id if self.current_context else None
+    
+    def get_agent_prompt_system(self, context: Optional[AgentContext] = None) -> str:
+        """Get the system prompt for an agent (the loaded one by default)."""
+        context = context or self.current_context
+        if not context:
             return "You are a helpful AI assistant."
         
-        return self.current_agent_config.get("agent_core", {}).get("prompts", {}).get("llmSystem", "")
+        return context.system_prompt
     
-    def get_agent_prompt_booster(self) -> str:
-        """Get the booster prompt for the current agent."""
-        if not self.current_agent_config:
+    def get_agent_prompt_booster(self, context: Optional[AgentContext] = None) -> str:
+        """Get the booster prompt for an agent (the loaded one by default)."""
+        context = context or self.current_context
+        if not context:
             return ""
         
-        return self.current_agent_config.get("agent_core", {}).get("prompts", {}).get("llmBooster", "")
+        return context.booster_prompt
     
     def create_predefined_agents(self):
         """Create predefined agents based on your examples."""
@@ -234,180 +373,232 @@ class GraphitiRAGFramework:
     def _initialize_agent_knowledge_space(self, agent_id: str):
         """Initialize knowledge graph space for a new agent."""
         # Create initial agent context in Graphiti
-        asyncio.create_task(self._async_initialize_agent_knowledge_space(agent_id))
+        self.ingestion_queue.enqueue(
+            agent_id,
+            name=f"Agent {agent_id} Creation",
+            episode_body=f"Agent {agent_id} has been created and initialized in the system.",
+            source_description=f"Agent {agent_id} initialization"
+        )
     
-    async def _async_initialize_agent_knowledge_space(self, agent_id: str):
-        """Async version of agent knowledge space initialization."""
-        try:
-            await self.graphiti.add_episode(
-                name=f"Agent {agent_id} Creation",
-                episode_body=f"Agent {agent_id} has been created and initialized in the system.",
-                source_description=f"Agent {agent_id} initialization",
-                reference_time=datetime.now()
+    # Graph Ingestion
+    async def _ingest_episodes(self, agent_id: str, episodes: List[Dict[str, Any]]):
+        """Add a batch of queued episodes of one agent to Graphiti."""
+        await self.graphiti.add_episode_bulk([
+            RawEpisode(
+                name=episode["name"],
+                content=episode["episode_body"],
+                source_description=episode["source_description"],
+                source=EpisodeType(episode["source"]),
+                reference_time=datetime.fromisoformat(episode["reference_time"])
             )
-            self.logger.info(f"Initialized knowledge space for agent {agent_id}")
-        except Exception as e:
-            self.logger.error(f"Failed to initialize knowledge space for agent {agent_id}: {e}")
+            for episode in episodes
+        ], group_id=agent_group_id(agent_id))
+        self.logger.info(f"Added {len(episodes)} episodes for {agent_id} to the knowledge graph")
+        
+        # New graph facts from knowledge or research can change the agent's answers
+        if self.semantic_cache is not None and any(
+            episode.get("kb_id") or episode.get("research_id") for episode in episodes
+        ):
+            self.semantic_cache.invalidate(agent_id)
+    
+    def _record_ingestion_status(self, episodes: List[Dict[str, Any]], status: str):
+        """Mirror the ingestion status of queued knowledge documents in the knowledge base."""
+        kb_ids = [episode["kb_id"] for episode in episodes if episode.get("kb_id")]
+        if kb_ids:
+            self.async_db.submit_write(self.db_handler.update_embedding_status, kb_ids, status)
+    
+    async def wait_for_ingestion(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until queued episodes have been added to the knowledge graph.
+        
+        Returns:
+            False if the timeout passed first
+        """
+        return await self.ingestion_queue.drain(timeout)
     
     # Conversation Methods
+    def _store_turn(self, agent_id: str, session_id: Optional[str], user_message: str,
+                    assistant_response: str, user_metadata: Dict[str, Any] = None,
+                    assistant_metadata: Dict[str, Any] = None) -> tuple:
+        """Store a user message and its reply as one commit; returns both message IDs."""
+        with self.db_handler.batch():
+            user_msg_id = self.db_handler.add_conversation_message(
+                agent_id, "user", user_message, session_id, metadata=user_metadata
+            )
+            assistant_msg_id = self.db_handler.add_conversation_message(
+                agent_id, "assistant", assistant_response, session_id, metadata=assistant_metadata
+            )
+        return user_msg_id, assistant_msg_id
+    
     async def add_conversation_turn(self, user_input: str, assistant_response: str, 
-                                  metadata: Dict[str, Any] = None) -> str:
-        """Add a conversation turn to both Polars DB and Graphiti."""
-        if not self.current_agent_id:
-            raise ValueError("No active agent loaded")
-        
-        # Add to Polars DB
-        user_msg_id = self.db_handler.add_conversation_message(
-            self.current_agent_id, "user", user_input, 
-            self.current_session_id, metadata=metadata
-        )
+                                  metadata: Dict[str, Any] = None,
+                                  context: Optional[AgentContext] = None) -> str:
+        """Add a conversation turn to Polars DB and queue it for Graphiti."""
+        context = self._resolve_context(context)
         
-        assistant_msg_id = self.db_handler.add_conversation_message(
-            self.current_agent_id, "assistant", assistant_response, 
-            self.current_session_id, metadata=metadata
+        # Add to Polars DB as a single commit
+        user_msg_id, _ = await self.async_db.write(
+            self._store_turn, context.agent_id, context.session_id,
+            user_input, assistant_response, metadata, metadata
         )
         
-        # Add to Graphiti for contextual memory
+        # Queue for Graphiti contextual memory
         conversation_episode = f"User: {user_input}\nAssistant: {assistant_response}"
         
-        try:
-            await self.graphiti.add_episode(
-                name=f"Conversation Turn {user_msg_id}",
-                episode_body=conversation_episode,
-                source_description=f"Agent {self.current_agent_id} conversation",
-                reference_time=datetime.now()
-            )
-        except Exception as e:
-            self.logger.error(f"Failed to add conversation to Graphiti: {e}")
+        self.ingestion_queue.enqueue(
+            context.agent_id,
+            name=f"Conversation Turn {user_msg_id}",
+            episode_body=conversation_episode,
+            source_description=f"Agent {context.agent_id} conversation"
+        )
         
         return user_msg_id
     
-    async def get_relevant_context(self, query: str, max_results: int = 5) -> str:
+    async def get_relevant_context(self, query: str, max_results: int = 5,
+                                   context: Optional[AgentContext] = None) -> str:
         """Get relevant context from Graphiti for a query."""
-        if not self.current_agent_id:
+        context = context or self.current_context
+        if not context:
             return ""
         
+        facts = await self._search_facts(query, context.group_ids, max_results)
+        return "\n".join(f"- {fact}" for fact in facts) if facts else ""
+    
+    def graph_group_ids(self, agent_id: str) -> List[str]:
+        """Graphiti groups searched for an agent: its own and the shared ones."""
+        return [agent_group_id(agent_id)] + self.shared_group_ids
+    
+    async def _search_facts(self, query: str, group_ids: Sequence[str],
+                            num_results: int = 5) -> Optional[List[str]]:
+        """Search an agent's graph groups once and return the matching facts, or None if the search failed."""
         try:
-            # Search Graphiti for relevant information
             search_results = await self.graphiti.search(
-                query=query,
-                num_results=max_results
+                query=query, group_ids=list(group_ids), num_results=num_results
             )
-            
-            # Format results into context string
-            context_parts = []
-            for result in search_results[:max_results]:
-                context_parts.append(f"- {result.fact}")
-            
-            return "\n".join(context_parts) if context_parts else ""
-        
         except Exception as e:
             self.logger.error(f"Failed to get relevant context: {e}")
-            return ""
+            return None
+        return [result.fact for result in search_results[:num_results]]
     
     # Knowledge Base Integration
     async def add_knowledge_with_embedding(self, title: str, content: str, 
                                          content_type: str = "text", 
-                                         source: str = "", tags: List[str] = None) -> str:
-        """Add knowledge to both Polars DB and Graphiti."""
-        if not self.current_agent_id:
-            raise ValueError("No active agent loaded")
+                                         source: str = "", tags: List[str] = None,
+                                         context: Optional[AgentContext] = None) -> str:
+        """Add knowledge to Polars DB and queue it for Graphiti."""
+        context = self._resolve_context(context)
         
         # Add to Polars DB
-        kb_id = self.db_handler.add_knowledge_document(
-            self.current_agent_id, title, content, content_type, source, tags
+        kb_id = await self.async_db.write(
+            self.db_handler.add_knowledge_document,
+            context.agent_id, title, content, content_type, source, tags
         )
         
-        # Add to Graphiti for graph-based memory
+        # Embed for local semantic search
         try:
-            await self.graphiti.add_episode(
-                name=title,
-                episode_body=content,
-                source_description=source or "Knowledge Base",
-                reference_time=datetime.now()
-            )
-            
-            # Update embedding status
-            self.db_handler.update_embedding_status(kb_id, "processed")
-            
+            embedding = await self.embedder.create(input_data=[f"{title}\n{content}"])
+            await self.async_db.write(self.db_handler.set_knowledge_embeddings, [kb_id], [embedding])
         except Exception as e:
-            self.logger.error(f"Failed to add knowledge to Graphiti: {e}")
-            self.db_handler.update_embedding_status(kb_id, "failed")
+            self.logger.error(f"Failed to embed knowledge document: {e}")
+        
+        # Queue for Graphiti graph-based memory; embedding_status follows the queue
+        self.ingestion_queue.enqueue(
+            context.agent_id,
+            name=title,
+            episode_body=content,
+            source_description=source or "Knowledge Base",
+            kb_id=kb_id
+        )
         
         return kb_id
     
     async def search_knowledge_with_context(self, query: str, 
-                                          include_graph_context: bool = True) -> Dict[str, Any]:
-        """Search knowledge base with optional graph context."""
-        if not self.current_agent_id:
-            raise ValueError("No active agent loaded")
+                                          include_graph_context: bool = True,
+                                          limit: int = 10,
+                                          context: Optional[AgentContext] = None) -> Dict[str, Any]:
+        """
+        Search the knowledge base with optional graph context.
         
-        # Search Polars DB
-        db_results = self.db_handler.search_knowledge_base(self.current_agent_id, query)
+        Keyword, embedding and graph searches run concurrently, each within
+        its budget in ``self.retriever.budgets``; a search that fails or
+        runs out of time contributes no results.
         
-        results = {
-            "database_results": db_results.to_dicts() if db_results.height > 0 else [],
-            "graph_context": ""
-        }
+        Returns:
+            Dict with the top ``limit`` documents by keyword relevance
+            ("database_results") and by embedding similarity
+            ("semantic_results"), the graph context, the documents and facts
+            of all three merged by reciprocal-rank fusion ("hybrid_results"),
+            and the status of each search ("retrieval_status")
+        """
+        context = self._resolve_context(context)
         
-        # Optionally get graph context
-        if include_graph_context:
-            try:
-                results["graph_context"] = await self.get_relevant_context(query)
-            except Exception as e:
-                self.logger.error(f"Failed to get graph context: {e}")
+        sources = HybridRetriever.SOURCES if include_graph_context else ("lexical", "vector")
+        retrieved = await self.retriever.retrieve(
+            context.agent_id, query, limit=limit, sources=sources, group_ids=list(context.group_ids)
+        )
+        by_source = retrieved["by_source"]
         
-        return results
+        return {
+            "database_results": by_source["lexical"],
+            "semantic_results": by_source["vector"],
+            "graph_context": "\n".join(f"- {fact['fact']}" for fact in by_source.get("graph", [])),
+            "hybrid_results": retrieved["results"],
+            "retrieval_status": retrieved["status"]
+        }
     
     # Research Integration
     async def add_research_with_graph_integration(self, query: str, results: Dict[str, Any],
                                                 source_urls: List[str] = None,
-                                                research_type: str = "web_search") -> str:
+                                                research_type: str = "web_search",
+                                                context: Optional[AgentContext] = None) -> str:
         """Add research results to DB and integrate into knowledge graph."""
-        if not self.current_agent_id:
-            raise ValueError("No active agent loaded")
+        context = self._resolve_context(context)
         
         # Add to Polars DB
-        research_id = self.db_handler.add_research_result(
-            self.current_agent_id, query, results, source_urls, research_type
+        research_id = await self.async_db.write(
+            self.db_handler.add_research_result,
+            context.agent_id, query, results, source_urls, research_type
         )
         
-        # Add to Graphiti for contextual understanding
-        try:
-            research_summary = f"Research Query: {query}\nFindings: {json.dumps(results, indent=2)}"
-            await self.graphiti.add_episode(
-                name=f"Research: {query}",
-                episode_body=research_summary,
-                source_description=f"Research ({research_type})",
-                reference_time=datetime.now()
-            )
-        except Exception as e:
-            self.logger.error(f"Failed to add research to Graphiti: {e}")
+        # Queue for Graphiti contextual understanding
+        research_summary = f"Research Query: {query}\nFindings: {json.dumps(results, indent=2)}"
+        self.ingestion_queue.enqueue(
+            context.agent_id,
+            name=f"Research: {query}",
+            episode_body=research_summary,
+            source_description=f"Research ({research_type})",
+            research_id=research_id
+        )
         
         return research_id
     
     # Agent Management Utilities
-    def get_agent_conversation_history(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get conversation history for current agent."""
-        if not self.current_agent_id:
+    def get_agent_conversation_history(self, limit: int = 50,
+                                       context: Optional[AgentContext] = None) -> List[Dict[str, Any]]:
+        """Get conversation history of an agent's session (the loaded agent by default)."""
+        context = context or self.current_context
+        if not context:
             return []
         
         history = self.db_handler.get_conversation_history(
-            self.current_agent_id, self.current_session_id, limit
+            context.agent_id, context.session_id, limit
         )
         return history.to_dicts() if history.height > 0 else []
     
-    def get_agent_knowledge_base(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get knowledge base for current agent."""
-        if not self.current_agent_id:
+    def get_agent_knowledge_base(self, limit: int = 100,
+                                 context: Optional[AgentContext] = None) -> List[Dict[str, Any]]:
+        """Get knowledge base of an agent (the loaded agent by default)."""
+        context = context or self.current_context
+        if not context:
             return []
         
-        knowledge = self.db_handler.get_knowledge_documents(self.current_agent_id, limit)
+        knowledge = self.db_handler.get_knowledge_documents(context.agent_id, limit)
         return knowledge.to_dicts() if knowledge.height > 0 else []
     
-    def export_agent_data(self, export_path: str) -> bool:
+    def export_agent_data(self, export_path: str, context: Optional[AgentContext] = None) -> bool:
         """Export all agent data (config, conversations, knowledge)."""
-        if not self.current_agent_id:
+        context = context or self.current_context
+        if not context:
             return False
         
         try:
@@ -415,17 +606,17 @@ class GraphitiRAGFramework:
             export_dir.mkdir(exist_ok=True)
             
             # Export config
-            config_path = export_dir / f"{self.current_agent_id}_config.json"
-            self.db_handler.export_agent_config(self.current_agent_id, str(config_path))
+            config_path = export_dir / f"{context.agent_id}_config.json"
+            self.db_handler.export_agent_config(context.agent_id, str(config_path))
             
             # Export conversations
-            conversations = self.get_agent_conversation_history(1000)
-            with open(export_dir / f"{self.current_agent_id}_conversations.json", 'w') as f:
+            conversations = self.get_agent_conversation_history(1000, context)
+            with open(export_dir / f"{context.agent_id}_conversations.json", 'w') as f:
                 json.dump(conversations, f, indent=2, default=str)
             
             # Export knowledge base
-            knowledge = self.get_agent_knowledge_base(1000)
-            with open(export_dir / f"{self.current_agent_id}_knowledge.json", 'w') as f:
+            knowledge = self.get_agent_knowledge_base(1000, context)
+            with open(export_dir / f"{context.agent_id}_knowledge.json", 'w') as f:
                 json.dump(knowledge, f, indent=2, default=str)
             
             return True
@@ -445,7 +636,7 @@ class GraphitiRAGFramework:
         Returns:
             bool: Success status
         """
-        return self.db_handler.export_conversations_jsonl(agent_id, output_path)
+        return await self.async_db.read(self.db_handler.export_conversations_jsonl, agent_id, output_path)
     
     async def export_prompt_sets_jsonl(self, output_path: str) -> bool:
         """
@@ -457,7 +648,7 @@ class GraphitiRAGFramework:
         Returns:
             bool: Success status
         """
-        return self.db_handler.export_prompt_sets_jsonl(output_path)
+        return await self.async_db.read(self.db_handler.export_prompt_sets_jsonl, output_path)
     
     async def generate_multi_agent_conversation(self, agent_ids: List[str], topic: str,
                                               turns: int = 10, personas: List[str] = None) -> str:
@@ -473,7 +664,9 @@ class GraphitiRAGFramework:
         Returns:
             str: Session ID of generated conversation
         """
-        return self.db_handler.generate_multi_agent_conversation(agent_ids, topic, turns, personas)
+        return await self.async_db.write(
+            self.db_handler.generate_multi_agent_conversation, agent_ids, topic, turns, personas
+        )
     
     # System Status and Health
     def get_system_status(self) -> Dict[str, Any]:
@@ -487,175 +680,230 @@ class GraphitiRAGFramework:
                 "loaded": self.current_agent_config is not None
             },
             "database_stats": db_stats,
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache is not None else None,
+            "response_cache": self.response_cache.stats(),
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "agent_config_cache": self.db_handler.agent_configs.stats(),
+            "response_latency_ms": self.response_stage_stats.stats(),
+            "retrieval": self.retriever.stats(),
+            "ingestion_queue": self.ingestion_queue.stats(),
             "graphiti_connected": True,  # Could add actual health check
             "system_ready": self.current_agent_id is not None
         }
     
+    async def close(self):
+        """
+        Finish queued graph ingestion (for up to ingestion_drain_timeout
+        seconds), flush pending data and release the Neo4j driver, the HTTP
+        client and the embedding cache. A database handler passed in by the
+        caller is flushed but left open. Safe to call more than once.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        
+        await self.ingestion_queue.close(self.ingestion_drain_timeout)
+        # The handler may outlive this framework, so stop it calling into our cache
+        if self.semantic_cache is not None:
+            self.db_handler.remove_config_listener(self.semantic_cache.invalidate)
+            self.db_handler.remove_knowledge_listener(self.semantic_cache.invalidate)
+        if self._owns_db_handler:
+            await self.async_db.write(self.db_handler.close)
+        else:
+            await self.async_db.write(self.db_handler.save_tables)
+        self.async_db.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        await self.graphiti.close()
+        await self.openai_client.close()
+    
     async def cleanup(self):
         """Cleanup resources."""
         try:
-            # Save any pending data
-            self.db_handler.save_tables()
-            
-            # Close Graphiti connections if needed
-            # await self.graphiti.close()  # If such method exists
-            
+            await self.close()
             self.logger.info("System cleanup completed")
         except Exception as e:
             self.logger.error(f"Error during cleanup: {e}")
     
+    def _response_cache_key(self, messages: List[Message], max_tokens: int) -> str:
+        return ResponseCache.make_key(
+            self.llm_config.model, self.llm_config.temperature, max_tokens,
+            [{"role": message.role, "content": message.content} for message in messages]
+        )
+    
+    async def _generate_llm_response(self, messages: List[Message], max_tokens: int) -> Dict[str, Any]:
+        """Call the LLM, going through the response cache."""
+        return await self.response_cache.fetch(
+            self._response_cache_key(messages, max_tokens),
+            lambda: self.llm_client.generate_response(messages=messages, max_tokens=max_tokens)
+        )
+    
+    async def _stream_llm_response(self, messages: List[Message], max_tokens: int) -> AsyncIterator[str]:
+        """
+        Stream a plain-text chat completion, going through the response cache.
+        
+        A cached response is yielded as a single chunk. A completed stream is
+        cached as {"content": text}, the shape _response_text reads, so
+        streamed and non-streamed requests share entries.
+        """
+        key = self._response_cache_key(messages, max_tokens)
+        cached = self.response_cache.lookup(key)
+        if cached is not None:
+            text = self._response_text(cached)
+            if text:
+                yield text
+                return
+        
+        stream = await self.openai_client.chat.completions.create(
+            model=self.llm_config.model,
+            messages=[{"role": message.role, "content": message.content} for message in messages],
+            max_tokens=max_tokens,
+            temperature=self.llm_config.temperature,
+            stream=True
+        )
+        chunks = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(chunk.choices[0].delta.content)
+                yield chunks[-1]
+        self.response_cache.record(key, {"content": "".join(chunks)})
+    
+    async def cached_answer(self, agent_id: str, user_message: str) -> Optional[str]:
+        """Return the agent's earlier answer to a paraphrase of this message, if cached."""
+        if self.semantic_cache is None:
+            return None
+        try:
+            return await self.semantic_cache.lookup(agent_id, user_message)
+        except Exception as e:
+            self.logger.warning(f"Semantic cache lookup failed: {e}")
+            return None
+    
+    async def _remember_answer(self, agent_id: str, user_message: str, answer: str):
+        """Add a generated answer to the semantic cache."""
+        if self.semantic_cache is None:
+            return
+        try:
+            await self.semantic_cache.store(agent_id, user_message, answer)
+        except Exception as e:
+            self.logger.warning(f"Could not add answer to semantic cache: {e}")
+    
     async def generate_response(self, agent_id: str, user_message: str, 
-                              conversation_context: str = "", session_id: str = None) -> str:
+                              conversation_context: str = "", session_id: str = None,
+                              check_semantic_cache: bool = True,
+                              context: Optional[AgentContext] = None) -> str:
         """
         Generate agent response using Graphiti knowledge and conversation context
         
+        The agent config comes from the agent context cache and the knowledge
+        graph is searched once per call; the time spent in each stage is kept
+        in last_response_timings. The loaded agent is left unchanged, so
+        responses for different agents can be generated concurrently.
+        
         Args:
             agent_id: ID of the agent to respond as
             user_message: The user's message
             conversation_context: Previous conversation history
             session_id: Chat session ID for context
+            check_semantic_cache: Look for a cached answer first; callers that
+                already did pass False
+            context: Context already built for this agent; its session is
+                used when session_id is not given
             
         Returns:
             Generated response string
         """
+        timer = StageTimer()
         try:
-            # Load agent if not current
-            if not self.current_agent_id or self.current_agent_id != agent_id:
-                success = await self.load_agent(agent_id, session_id)
-                if not success:
-                    raise ValueError(f"Failed to load agent {agent_id}")
-            
-            # Get agent configuration for personality
-            agent_config = self.db_handler.get_agent_config(agent_id)
-            if not agent_config:
-                raise ValueError(f"Agent {agent_id} not found")
-            
-            # Try to get relevant context from knowledge graph
-            try:
-                relevant_context = await self.get_relevant_context(user_message, max_results=3)
-            except Exception as e:
-                self.logger.warning(f"Could not get context from Graphiti: {e}")
-                relevant_context = ""
-            
-            # Build the system prompt
-            system_prompt = agent_config.get("prompt_config", {}).get("primeDirective", "")
-            if not system_prompt:
-                # Fallback system prompt based on agent type
-                if "wizard" in agent_id.lower():
-                    system_prompt = "You are a wise wizard with deep knowledge of ancient mysteries and modern technologies. Speak with mystical wisdom."
-                elif "minecraft" in agent_id.lower():
-                    system_prompt = "You are a helpful Minecraft guide who loves crafting, building, and adventure. Be enthusiastic and knowledgeable about the game."
-                else:
-                    system_prompt = "You are a helpful AI assistant."
-            
-            # Construct full prompt context
-            context_parts = []
-            if system_prompt:
-                context_parts.append(system_prompt)
-            if relevant_context:
-                context_parts.append(f"Relevant Knowledge: {relevant_context}")
-            if conversation_context:
-                context_parts.append(f"Recent Conversation: {conversation_context}")
-            
-            full_system_prompt = "\n\n".join(context_parts)
-            
-            # Try to use actual LLM generation with Ollama
-            try:
-                # Search for relevant context from knowledge graph
-                search_results = await self.graphiti.search(
-                    query=user_message,
-                    num_results=5
-                )
-                
-                # Build context from search results
-                context_facts = []
-                for result in search_results[:3]:
-                    context_facts.append(f"- {result.fact}")
-                
-                context_string = "\n".join(context_facts) if context_facts else "No specific context found in knowledge graph."
-                
-            except Exception as search_error:
-                self.logger.warning(f"Could not search knowledge graph: {search_error}")
-                context_string = "Knowledge graph search unavailable."
-            
-            # Get agent configuration for personality
-            agent_config = self.db_handler.get_agent_config(agent_id)
-            personality = agent_config.get("prompt_config", {}).get("primeDirective", "") if agent_config else ""
-            
-            # Try to generate actual LLM response
-            try:
-                # Build comprehensive system prompt
-                if "wizard" in personality.lower() or "wizard" in agent_id.lower():
-                    system_prompt = """You are a wise and mystical wizard with deep knowledge of both ancient mysteries and modern technologies. 
+            return await self._generate_response(
+                timer, agent_id, user_message, conversation_context, session_id, check_semantic_cache, context
+            )
+        finally:
+            timer.stop()
+            self.last_response_timings = timer.timings
+            self.response_stage_stats.record(timer.timings)
+            self.logger.debug(f"Response stage timings for {agent_id}: {timer.timings}")
+    
+    @staticmethod
+    def _facts_context(context_facts: Optional[List[str]]) -> tuple:
+        """The facts used for a response (at most three) and their prompt text."""
+        if context_facts is None:
+            return [], "Knowledge graph search unavailable."
+        if context_facts:
+            context_facts = context_facts[:3]
+            return context_facts, "\n".join(f"- {fact}" for fact in context_facts)
+        return [], "No specific context found in knowledge graph."
+    
+    @staticmethod
+    def _response_messages(agent_id: str, personality: str, user_message: str,
+                           context_string: str, conversation_context: str) -> List[Message]:
+        """System and user messages asking the LLM to answer as the agent."""
+        # Build comprehensive system prompt
+        if "wizard" in personality.lower() or "wizard" in agent_id.lower():
+            system_prompt = """You are a wise and mystical wizard with deep knowledge of both ancient mysteries and modern technologies. 
 You speak with mystical wisdom and use magical metaphors to explain technical concepts. 
 Be helpful, knowledgeable, and maintain your magical personality while providing accurate information."""
-                elif "minecraft" in personality.lower() or "minecraft" in agent_id.lower():
-                    system_prompt = """You are an enthusiastic Minecraft assistant who loves crafting, building, and adventure. 
+        elif "minecraft" in personality.lower() or "minecraft" in agent_id.lower():
+            system_prompt = """You are an enthusiastic Minecraft assistant who loves crafting, building, and adventure. 
 You're knowledgeable about the game and use Minecraft metaphors to explain concepts. 
 Be helpful, enthusiastic, and playful while providing accurate information."""
-                elif "expert" in personality.lower() or "coder" in agent_id.lower():
-                    system_prompt = """You are an expert software developer and technical specialist. 
+        elif "expert" in personality.lower() or "coder" in agent_id.lower():
+            system_prompt = """You are an expert software developer and technical specialist. 
 You provide professional, detailed, and production-ready solutions to programming questions. 
 Be thorough, accurate, and include practical examples and best practices."""
-                else:
-                    system_prompt = "You are a helpful AI assistant. Provide accurate, detailed, and useful information."
-                
-                # Add context if available
-                if context_string and context_string != "Knowledge graph search unavailable.":
-                    system_prompt += f"\n\nRelevant context from knowledge base:\n{context_string}"
-                
-                if conversation_context:
-                    system_prompt += f"\n\nRecent conversation context:\n{conversation_context}"
-                
-                # Create messages for the LLM (using proper Message objects)
-                messages = [
-                    Message(role="system", content=system_prompt),
-                    Message(role="user", content=user_message)
-                ]
-                
-                # Generate response using the LLM client
-                response_data = await self.llm_client.generate_response(
-                    messages=messages,
-                    max_tokens=500
-                )
-                
-                # Extract content from response - graphiti client returns structured dict
-                if isinstance(response_data, dict):
-                    # Check for direct content in various possible formats
-                    if "choices" in response_data and len(response_data["choices"]) > 0:
-                        choice = response_data["choices"][0]
-                        if "message" in choice and "content" in choice["message"]:
-                            actual_response = choice["message"]["content"].strip()
-                        elif "content" in choice:
-                            actual_response = choice["content"].strip()
-                        else:
-                            actual_response = str(choice).strip()
-                    elif "content" in response_data:
-                        actual_response = response_data["content"].strip()
-                    elif "response" in response_data:
-                        actual_response = response_data["response"].strip()
-                    else:
-                        # Try to get the first string value from the dict
-                        for key, value in response_data.items():
-                            if isinstance(value, str) and len(value) > 10:
-                                actual_response = value.strip()
-                                break
-                        else:
-                            actual_response = str(response_data).strip()
-                    
-                    if actual_response and len(actual_response) > 10:
-                        self.logger.info(f"Successfully generated LLM response for {agent_id}: {actual_response[:100]}...")
-                        return actual_response
-                
-                # If we get here, the LLM response format was unexpected
-                raise Exception(f"Unable to extract content from LLM response: {response_data}")
-                
-            except Exception as llm_error:
-                self.logger.warning(f"LLM generation failed: {llm_error}, falling back to personality response")
-                # Fall back to personality-based responses
-            
-            if "wizard" in personality.lower() or "wizard" in agent_id.lower():
-                response = f"""🧙‍♂️ *The ancient wizard's eyes sparkle with mystical knowledge*
+        else:
+            system_prompt = "You are a helpful AI assistant. Provide accurate, detailed, and useful information."
+        
+        # Add context if available
+        if context_string and context_string != "Knowledge graph search unavailable.":
+            system_prompt += f"\n\nRelevant context from knowledge base:\n{context_string}"
+        
+        if conversation_context:
+            system_prompt += f"\n\nRecent conversation context:\n{conversation_context}"
+        
+        # Create messages for the LLM (using proper Message objects)
+        messages = [
+            Message(role="system", content=system_prompt),
+            Message(role="user", content=user_message)
+        ]
+        return messages
+    
+    @staticmethod
+    def _response_text(response_data: Any) -> Optional[str]:
+        """The answer text in an LLM response, or None if there is none worth returning."""
+        if not isinstance(response_data, dict):
+            return None
+        
+        # Check for direct content in various possible formats
+        if "choices" in response_data and len(response_data["choices"]) > 0:
+            choice = response_data["choices"][0]
+            if "message" in choice and "content" in choice["message"]:
+                actual_response = choice["message"]["content"].strip()
+            elif "content" in choice:
+                actual_response = choice["content"].strip()
+            else:
+                actual_response = str(choice).strip()
+        elif "content" in response_data:
+            actual_response = response_data["content"].strip()
+        elif "response" in response_data:
+            actual_response = response_data["response"].strip()
+        else:
+            # Try to get the first string value from the dict
+            for key, value in response_data.items():
+                if isinstance(value, str) and len(value) > 10:
+                    actual_response = value.strip()
+                    break
+            else:
+                actual_response = str(response_data).strip()
+        
+        if actual_response and len(actual_response) > 10:
+            return actual_response
+        return None
+    
+    @staticmethod
+    def _fallback_response(agent_id: str, personality: str, user_message: str, context_string: str) -> str:
+        """Personality-based answer used when the LLM is unavailable."""
+        if "wizard" in personality.lower() or "wizard" in agent_id.lower():
+            return f"""🧙‍♂️ *The ancient wizard's eyes sparkle with mystical knowledge*
 
 Ah, you inquire about '{user_message}'... Let me consult the ethereal archives of wisdom.
 
@@ -667,9 +915,9 @@ Ah, you inquire about '{user_message}'... Let me consult the ethereal archives o
 From my vast experience traversing both mundane databases and celestial knowledge graphs, I can tell you that the fusion of Polars' lightning-fast queries with Graphiti's temporal memory creates a truly magical information ecosystem. Each conversation becomes a golden thread in the tapestry of understanding, while each piece of knowledge transforms into a gleaming gem in our ever-growing treasury of wisdom.
 
 Though the full power of the sacred LLM realm awaits proper awakening, the foundations of knowledge remain strong! ✨"""
-            
-            elif "minecraft" in personality.lower() or "minecraft" in agent_id.lower():
-                response = f"""🎮 Hey there, fellow crafter! That's an awesome question about '{user_message}'! ⛏️
+        
+        elif "minecraft" in personality.lower() or "minecraft" in agent_id.lower():
+            return f"""🎮 Hey there, fellow crafter! That's an awesome question about '{user_message}'! ⛏️
 
 **What I found in my inventory:**
 {context_string}
@@ -682,9 +930,9 @@ You know what's super cool? Building knowledge systems is just like creating epi
 - **Search** is like having the best enchanted tools to find exactly what you need
 
 Right now I'm running on my crafting table setup (local processing for privacy), and even though some of my diamond-tier tools need calibration, I can still help you explore this fascinating digital landscape! Want to dig deeper into any specific part? 🔨💎"""
-            
-            else:
-                response = f"""Thank you for your question about '{user_message}'. I'm operating with a sophisticated knowledge management system that combines several technologies:
+        
+        else:
+            return f"""Thank you for your question about '{user_message}'. I'm operating with a sophisticated knowledge management system that combines several technologies:
 
 **Current Context Available:**
 {context_string}
@@ -698,25 +946,163 @@ Right now I'm running on my crafting table setup (local processing for privacy),
 While my full AI generation capabilities are being optimized for local deployment, I can still provide meaningful assistance by leveraging stored knowledge and conversation context. The system is designed to continuously learn and improve from our interactions.
 
 How can I help you explore this topic further?"""
+    
+    async def _response_context(self, agent_id: str, session_id: Optional[str],
+                                context: Optional[AgentContext]) -> AgentContext:
+        """The context a response is generated in; raises ValueError for unknown agents."""
+        # Without a context, the loaded agent keeps its session
+        if context is None and self.current_context is not None and self.current_context.agent_id == agent_id:
+            context = self.current_context
+        if context is None or context.agent_id != agent_id:
+            context = await self.get_agent_context(agent_id, session_id)
+            if context is None:
+                raise ValueError(f"Agent {agent_id} not found")
+        elif session_id is not None:
+            context = context.with_session(session_id)
+        return context
+    
+    async def stream_response(self, agent_id: str, user_message: str,
+                              conversation_context: str = "", session_id: str = None,
+                              check_semantic_cache: bool = True,
+                              context: Optional[AgentContext] = None,
+                              persist: bool = True) -> AsyncIterator[str]:
+        """
+        Generate an agent response, yielding text chunks as the LLM produces them
+        
+        Retrieval and the prompt are the same as in generate_response. The
+        turn is stored once the stream completes; a stream the caller stops
+        consuming early is not stored. If the LLM fails before its first
+        chunk, the personality fallback is yielded instead.
+        
+        Args:
+            agent_id: ID of the agent to respond as
+            user_message: The user's message
+            conversation_context: Previous conversation history
+            session_id: Chat session ID for context
+            check_semantic_cache: Look for a cached answer first
+            context: Context already built for this agent
+            persist: Store the user message and the full answer when done;
+                callers that store messages themselves pass False
             
-            # Store the conversation in the database (without triggering Graphiti LLM calls)
+        Yields:
+            Chunks of the response text
+        """
+        timer = StageTimer()
+        try:
+            cached = None
+            if check_semantic_cache:
+                with timer.stage("semantic_cache"):
+                    cached = await self.cached_answer(agent_id, user_message)
+            
+            with timer.stage("config"):
+                context = await self._response_context(agent_id, session_id, context)
+            
+            if cached is not None:
+                response, context_facts, response_type = cached, [], "semantic_cache"
+                yield response
+            else:
+                with timer.stage("retrieval"):
+                    context_facts = await self._search_facts(user_message, context.group_ids, num_results=5)
+                context_facts, context_string = self._facts_context(context_facts)
+                
+                with timer.stage("prompt_build"):
+                    messages = self._response_messages(
+                        agent_id, context.personality, user_message, context_string, conversation_context
+                    )
+                
+                # Time to the first chunk is what the user waits for
+                chunks = []
+                timer.start("llm_first_chunk")
+                try:
+                    async for chunk in self._stream_llm_response(messages, max_tokens=500):
+                        if not chunks:
+                            timer.start("llm_stream")
+                        chunks.append(chunk)
+                        yield chunk
+                except Exception as llm_error:
+                    if chunks:
+                        raise
+                    self.logger.warning(f"LLM streaming failed: {llm_error}, falling back to personality response")
+                timer.stop()
+                
+                response = "".join(chunks).strip()
+                if response:
+                    response_type = "streamed"
+                    await self._remember_answer(agent_id, user_message, response)
+                else:
+                    response_type = "knowledge_enhanced"
+                    response = self._fallback_response(agent_id, context.personality, user_message, context_string)
+                    yield response
+            
+            if persist:
+                with timer.stage("persistence"):
+                    await self.async_db.write(
+                        self._store_turn, agent_id, context.session_id, user_message, response,
+                        {"search_context": len(context_facts)}, {"response_type": response_type}
+                    )
+        finally:
+            timer.stop()
+            self.last_response_timings = timer.timings
+            self.response_stage_stats.record(timer.timings)
+    
+    async def _generate_response(self, timer: StageTimer, agent_id: str, user_message: str,
+                                 conversation_context: str, session_id: Optional[str],
+                                 check_semantic_cache: bool, context: Optional[AgentContext]) -> str:
+        try:
+            if check_semantic_cache:
+                with timer.stage("semantic_cache"):
+                    cached = await self.cached_answer(agent_id, user_message)
+                if cached is not None:
+                    return cached
+            
+            # Config: one immutable context shared by every later stage
+            with timer.stage("config"):
+                context = await self._response_context(agent_id, session_id, context)
+                personality = context.personality
+            
+            # Retrieval: one graph search, shared by the prompt and the stored metadata
+            with timer.stage("retrieval"):
+                context_facts = await self._search_facts(user_message, context.group_ids, num_results=5)
+            
+            context_facts, context_string = self._facts_context(context_facts)
+            
+            # Try to generate actual LLM response
             try:
-                # Add to conversation history for future context
-                user_msg_id = self.db_handler.add_conversation_message(
-                    agent_id=agent_id,
-                    role="user",
-                    content=user_message,
-                    session_id=session_id,
-                    metadata={"search_context": len(context_facts) if 'context_facts' in locals() else 0}
+                timer.start("prompt_build")
+                messages = self._response_messages(
+                    agent_id, personality, user_message, context_string, conversation_context
                 )
                 
-                assistant_msg_id = self.db_handler.add_conversation_message(
-                    agent_id=agent_id,
-                    role="assistant", 
-                    content=response,
-                    session_id=session_id,
-                    metadata={"response_type": "knowledge_enhanced"}
-                )
+                # Generate response using the LLM client
+                timer.start("llm")
+                response_data = await self._generate_llm_response(messages, max_tokens=500)
+                timer.stop()
+                
+                # Extract content from response - graphiti client returns structured dict
+                actual_response = self._response_text(response_data)
+                if actual_response:
+                    self.logger.info(f"Successfully generated LLM response for {agent_id}: {actual_response[:100]}...")
+                    await self._remember_answer(agent_id, user_message, actual_response)
+                    return actual_response
+                
+                # If we get here, the LLM response format was unexpected
+                raise Exception(f"Unable to extract content from LLM response: {response_data}")
+                
+            except Exception as llm_error:
+                timer.stop()
+                self.logger.warning(f"LLM generation failed: {llm_error}, falling back to personality response")
+                # Fall back to personality-based responses
+            
+            response = self._fallback_response(agent_id, personality, user_message, context_string)
+            
+            # Store the conversation in the database (without triggering Graphiti LLM calls)
+            try:
+                # Add to conversation history for future context
+                with timer.stage("persistence"):
+                    user_msg_id, assistant_msg_id = await self.async_db.write(
+                        self._store_turn, agent_id, context.session_id, user_message, response,
+                        {"search_context": len(context_facts)}, {"response_type": "knowledge_enhanced"}
+                    )
                 
                 self.logger.info(f"Stored conversation turn: user={user_msg_id}, assistant={assistant_msg_id}")
                 
@@ -729,7 +1115,7 @@ How can I help you explore this topic further?"""
             self.logger.error(f"Error generating response for {agent_id}: {e}")
             
             # Enhanced fallback responses based on agent personality
-            agent_config = self.db_handler.get_agent_config(agent_id)
+            agent_config = await self.async_db.read(self.db_handler.get_agent_config, agent_id)
             if agent_config:
                 personality = agent_config.get("prompt_config", {}).get("primeDirective", "")
                 
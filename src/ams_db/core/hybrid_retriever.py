@@ -0,0 +1,170 @@
+"""
+Hybrid Retrieval for AMS-DB
+
+Runs lexical (BM25 over the Polars knowledge base), vector (local embedding
+index) and graph (Graphiti) retrieval concurrently, each under its own
+latency budget, and merges the rankings with reciprocal-rank fusion. A
+source that fails or overruns its budget is left out of the fusion, so a
+query takes at most as long as the largest budget.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from graphiti_core.embedder.client import EmbedderClient
+
+from .async_db import AsyncDBHandler
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[str]], k: int = 60,
+                           weights: Optional[Dict[str, float]] = None) -> List[Tuple[str, float]]:
+    """
+    Merge ranked id lists into one ranking.
+
+    Each id scores ``weight / (k + rank)`` in every list it appears in
+    (rank starting at 1); the scores are summed across lists.
+
+    Args:
+        rankings: Source name -> ids, best first
+        k: Damping constant; larger values flatten the rank differences
+        weights: Source name -> weight, 1.0 for sources not listed
+
+    Returns:
+        (id, score) pairs, best first
+    """
+    weights = weights or {}
+    scores: Dict[str, float] = {}
+    for source, ids in rankings.items():
+        weight = weights.get(source, 1.0)
+        for rank, item_id in enumerate(ids, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    """
+    Concurrent lexical, vector and graph retrieval with reciprocal-rank fusion.
+
+    Database reads run on the AsyncDBHandler's reader threads, so they
+    overlap with the embedding and graph calls.
+    """
+
+    SOURCES = ("lexical", "vector", "graph")
+    DEFAULT_BUDGETS = {"lexical": 0.5, "vector": 1.0, "graph": 2.0}
+
+    def __init__(self, db: AsyncDBHandler, embedder: EmbedderClient, graphiti: Any = None,
+                 budgets: Optional[Dict[str, float]] = None, rrf_k: int = 60,
+                 weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            db: Async access to the database holding the knowledge base
+            embedder: Embedder for queries (the one the documents were embedded with)
+            graphiti: Graphiti instance for graph search; None disables it
+            budgets: Source name -> seconds a source may take before it is
+                skipped; missing sources use DEFAULT_BUDGETS
+            rrf_k: Reciprocal-rank fusion damping constant
+            weights: Source name -> fusion weight
+        """
+        self.db = db
+        self.embedder = embedder
+        self.graphiti = graphiti
+        self.budgets = {**self.DEFAULT_BUDGETS, **(budgets or {})}
+        self.rrf_k = rrf_k
+        self.weights = weights or {}
+        self.logger = logging.getLogger(__name__)
+        self.timeouts = {source: 0 for source in self.SOURCES}
+
+    async def _lexical(self, agent_id: str, query: str, limit: int) -> List[Dict[str, Any]]:
+        docs = await self.db.read(self.db.db_handler.search_knowledge_base, agent_id, query, limit=limit)
+        return docs.drop("embedding").to_dicts()
+
+    async def _vector(self, agent_id: str, query: str, limit: int) -> List[Dict[str, Any]]:
+        query_embedding = await self.embedder.create(input_data=[query])
+        docs = await self.db.read(
+            self.db.db_handler.search_knowledge_by_vector, query_embedding, agent_id=agent_id, limit=limit
+        )
+        return docs.to_dicts()
+
+    async def _graph(self, query: str, limit: int, group_ids: Optional[List[str]]) -> List[Dict[str, Any]]:
+        edges = await self.graphiti.search(query=query, group_ids=group_ids, num_results=limit)
+        return [{"id": getattr(edge, "uuid", None) or edge.fact, "fact": edge.fact} for edge in edges[:limit]]
+
+    async def _run(self, source: str, search: Awaitable) -> Tuple[str, List[Dict[str, Any]], float]:
+        """Run one source under its budget; returns (status, results, milliseconds)."""
+        started = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(search, timeout=self.budgets[source])
+            status = "ok"
+        except asyncio.TimeoutError:
+            self.timeouts[source] += 1
+            self.logger.warning(f"{source} retrieval exceeded its {self.budgets[source]}s budget")
+            results, status = [], "timeout"
+        except Exception as e:
+            self.logger.error(f"{source} retrieval failed: {e}")
+            results, status = [], "error"
+        return status, results, (time.perf_counter() - started) * 1000
+
+    async def retrieve(self, agent_id: str, query: str, limit: int = 10,
+                       sources: Tuple[str, ...] = SOURCES,
+                       group_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Search all sources concurrently and fuse their rankings.
+
+        Args:
+            agent_id: Agent whose knowledge base to search
+            query: Query text
+            limit: Number of results per source and of fused results
+            sources: Sources to query
+            group_ids: Graphiti groups the graph search is restricted to;
+                None searches the whole graph
+
+        Returns:
+            Dict with the fused "results" (knowledge documents and graph facts,
+            each with "type", "id", "rrf_score" and its rank per "sources"),
+            the raw results per source ("by_source"), and each source's
+            "status" ("ok", "timeout", "error" or "disabled") and "timings_ms"
+        """
+        searches = {}
+        if "lexical" in sources:
+            searches["lexical"] = self._lexical(agent_id, query, limit)
+        if "vector" in sources:
+            searches["vector"] = self._vector(agent_id, query, limit)
+        if "graph" in sources and self.graphiti is not None:
+            searches["graph"] = self._graph(query, limit, group_ids)
+
+        outcomes = await asyncio.gather(*(self._run(source, search) for source, search in searches.items()))
+
+        status = {source: "disabled" for source in sources}
+        timings_ms = {}
+        by_source: Dict[str, List[Dict[str, Any]]] = {source: [] for source in sources}
+        rankings: Dict[str, List[str]] = {}
+        items: Dict[str, Dict[str, Any]] = {}
+        for source, (source_status, results, ms) in zip(searches, outcomes):
+            status[source], by_source[source], timings_ms[source] = source_status, results, ms
+            ids = []
+            for result in results:
+                if source == "graph":
+                    item_id = f"fact:{result['id']}"
+                    items.setdefault(item_id, {"type": "fact", "id": result["id"], "fact": result["fact"]})
+                else:
+                    item_id = f"kb:{result['kb_id']}"
+                    items.setdefault(item_id, {
+                        "type": "document", "id": result["kb_id"],
+                        "title": result.get("title"), "content": result.get("content"),
+                    })
+                ids.append(item_id)
+            rankings[source] = ids
+
+        fused = []
+        for item_id, score in reciprocal_rank_fusion(rankings, self.rrf_k, self.weights)[:limit]:
+            item = dict(items[item_id])
+            item["rrf_score"] = score
+            item["sources"] = {source: ids.index(item_id) + 1 for source, ids in rankings.items() if item_id in ids}
+            fused.append(item)
+
+        return {"results": fused, "by_source": by_source, "status": status, "timings_ms": timings_ms}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"budgets": dict(self.budgets), "timeouts": dict(self.timeouts)}
@@ -0,0 +1,117 @@
+"""
+Hash Indexes for AMS-DB
+
+Secondary indexes that map a key (one or more columns) to the positions of the
+rows holding it, so point lookups and per-session fetches touch only the
+matching rows instead of comparing every value in a column.
+"""
+
+from typing import Any, Dict, Hashable, List, Sequence, Union
+
+import polars as pl
+
+
+class HashIndex:
+    """
+    Maintained key -> row positions index over one in-memory DataFrame.
+
+    An index is tied to the DataFrame it was built from. Appends extend it in
+    place; any other replacement of the table (filters, deletes, rollbacks)
+    makes it stale and it is rebuilt on the next lookup.
+
+    Keys that occur once are stored as a bare position and only grow into a
+    list when a duplicate shows up, which keeps unique-key indexes (message
+    ids, kb ids) compact.
+    """
+
+    def __init__(self, columns: Union[str, Sequence[str]]):
+        """
+        Create an (unbuilt) index.
+
+        Args:
+            columns: Key column, or columns for a composite key (looked up
+                with a tuple)
+        """
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self._table = None
+        self._positions: Dict[Hashable, Union[int, List[int]]] = {}
+        self.build_count = 0
+
+    def _keys(self, rows: pl.DataFrame) -> List[Hashable]:
+        """Extract the keys of some rows in row order."""
+        if len(self.columns) == 1:
+            return rows.get_column(self.columns[0]).to_list()
+        return list(rows.select(self.columns).iter_rows())
+
+    def build(self, table: pl.DataFrame):
+        """(Re)build the index from a whole table."""
+        keys = self._keys(table)
+        positions = dict(zip(keys, range(len(keys))))
+
+        if len(positions) < len(keys):
+            # Duplicate keys: group row positions per key instead
+            grouped = (table.select(self.columns)
+                       .with_row_index("_row")
+                       .group_by(self.columns, maintain_order=True)
+                       .agg(pl.col("_row")))
+            rows = grouped.get_column("_row").to_list()
+            positions = {
+                key: group[0] if len(group) == 1 else group
+                for key, group in zip(self._keys(grouped), rows)
+            }
+
+        self._positions = positions
+        self._table = table
+        self.build_count += 1
+
+    def is_current(self, table: pl.DataFrame) -> bool:
+        """Whether the index describes exactly this DataFrame."""
+        return self._table is table
+
+    def append(self, old_table: pl.DataFrame, new_table: pl.DataFrame, rows: pl.DataFrame):
+        """
+        Extend the index with rows appended to a table.
+
+        Args:
+            old_table: Table before the append
+            new_table: Table after the append (old_table followed by rows)
+            rows: The appended rows
+        """
+        if not self.is_current(old_table):
+            # Never built or already stale; the next lookup rebuilds it
+            return
+
+        positions = self._positions
+        for offset, key in enumerate(self._keys(rows), start=old_table.height):
+            existing = positions.get(key)
+            if existing is None:
+                positions[key] = offset
+            elif isinstance(existing, list):
+                existing.append(offset)
+            else:
+                positions[key] = [existing, offset]
+        self._table = new_table
+
+    def rebind(self, old_table: pl.DataFrame, new_table: pl.DataFrame):
+        """Carry the index over to a table whose rows kept their positions and keys."""
+        if self.is_current(old_table):
+            self._table = new_table
+
+    def lookup(self, table: pl.DataFrame, key: Any) -> List[int]:
+        """
+        Positions of the rows of ``table`` holding ``key``, in ascending order.
+
+        Args:
+            table: Current table; the index is rebuilt first if it is stale
+            key: Key value, or tuple of values for a composite index
+        """
+        if not self.is_current(table):
+            self.build(table)
+
+        found = self._positions.get(key)
+        if found is None:
+            return []
+        return found if isinstance(found, list) else [found]
+
+    def __len__(self) -> int:
+        return len(self._positions)
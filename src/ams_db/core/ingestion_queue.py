@@ -0,0 +1,321 @@
+"""
+Graph Ingestion Queue for AMS-DB
+
+Durable queue of episodes waiting to be added to the knowledge graph.
+Extracting entities from an episode takes several LLM calls, so callers
+enqueue episodes and return at once; a background worker adds them to the
+graph in batches.
+
+Episodes are appended to a JSON lines journal next to the Polars tables and
+marked done or failed in the same journal, so episodes that were queued or
+being ingested when the process stopped are ingested on the next start.
+The worker keeps each agent's episodes in order (one batch per agent in
+flight), runs at most ``max_concurrency`` batches at a time and retries a
+failed batch with exponential backoff.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+Episode = Dict[str, Any]
+IngestFunction = Callable[[str, List[Episode]], Awaitable[Any]]
+StatusCallback = Callable[[List[Episode], str], None]
+
+
+class IngestionQueue:
+    """Persistent per-agent episode queue drained by a background asyncio task."""
+
+    JOURNAL_FILE = "ingestion_queue.jsonl"
+
+    def __init__(self, queue_dir: Path, ingest: IngestFunction,
+                 on_status: Optional[StatusCallback] = None, batch_size: int = 10,
+                 max_concurrency: int = 2, max_attempts: int = 5,
+                 retry_base_delay: float = 1.0, retry_max_delay: float = 60.0):
+        """
+        Args:
+            queue_dir: Directory of the journal file
+            ingest: Coroutine function adding one agent's episodes, oldest
+                first, to the graph
+            on_status: Called with a batch of episodes and its new status
+                ("queued", "processing", "processed" or "failed")
+            batch_size: Maximum episodes per ingest call
+            max_concurrency: Maximum ingest calls running at once
+            max_attempts: Attempts per batch before its episodes are marked failed
+            retry_base_delay: Seconds before the first retry; doubled per retry
+            retry_max_delay: Upper bound on the retry delay
+        """
+        self.journal_path = Path(queue_dir) / self.JOURNAL_FILE
+        self.ingest = ingest
+        self.on_status = on_status
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.logger = logging.getLogger(__name__)
+
+        self.processed = 0
+        self.failed = 0
+        self.retries = 0
+
+        # agent_id -> episode id -> episode, oldest first
+        self._pending: Dict[str, "OrderedDict[str, Episode]"] = {}
+        self._in_flight: Set[str] = set()
+        # Episodes may be queued from database worker threads too, so the
+        # pending episodes and the journal are only touched under this lock
+        self._lock = threading.RLock()
+        self._lines = 0
+        self._load()
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._closed = False
+
+    def _load(self):
+        if not self.journal_path.exists():
+            return
+        for line in self.journal_path.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+                op, episode_id = record["op"], record["id"]
+            except (ValueError, KeyError, TypeError):
+                # A line cut short by a crash
+                continue
+            self._lines += 1
+            if op == "enqueue":
+                self._pending.setdefault(record["agent_id"], OrderedDict())[episode_id] = record["episode"]
+            else:
+                for episodes in self._pending.values():
+                    episodes.pop(episode_id, None)
+        self._pending = {agent_id: episodes for agent_id, episodes in self._pending.items() if episodes}
+
+        if self._lines > 2 * len(self) + 100:
+            self._compact()
+        if len(self):
+            self.logger.info(f"Resuming graph ingestion of {len(self)} queued episodes")
+
+    def _compact(self):
+        """Rewrite the journal with only the pending episodes."""
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            for agent_id, episodes in self._pending.items():
+                for episode_id, episode in episodes.items():
+                    f.write(json.dumps({"op": "enqueue", "id": episode_id, "agent_id": agent_id,
+                                        "episode": episode}) + "\n")
+        os.replace(temp, self.journal_path)
+        self._lines = len(self)
+
+    def _append(self, record: Dict[str, Any]):
+        with self._lock:
+            self._journal.write(json.dumps(record) + "\n")
+            self._journal.flush()
+            self._lines += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(episodes) for episodes in self._pending.values())
+
+    def enqueue(self, agent_id: str, name: str, episode_body: str, source_description: str,
+                reference_time: Optional[datetime] = None, source: str = "message",
+                **attributes) -> str:
+        """
+        Queue an episode for ingestion and start the worker if an event loop is running.
+
+        Args:
+            agent_id: Agent the episode belongs to; an agent's episodes are
+                ingested in the order they were queued
+            name: Episode name
+            episode_body: Episode content
+            source_description: Description of where the episode came from
+            reference_time: When the episode happened; defaults to now
+            source: Graphiti episode type ("message", "text" or "json")
+            **attributes: Extra JSON-serializable fields kept with the episode
+                (e.g. the kb_id of a knowledge document)
+
+        Returns:
+            Episode ID
+        """
+        episode_id = str(uuid.uuid4())
+        episode = {
+            **attributes,
+            "id": episode_id,
+            "agent_id": agent_id,
+            "name": name,
+            "episode_body": episode_body,
+            "source_description": source_description,
+            "reference_time": (reference_time or datetime.now()).isoformat(),
+            "source": source,
+        }
+        with self._lock:
+            self._append({"op": "enqueue", "id": episode_id, "agent_id": agent_id, "episode": episode})
+            self._pending.setdefault(agent_id, OrderedDict())[episode_id] = episode
+        self._notify([episode], "queued")
+        self.start()
+        return episode_id
+
+    def _notify(self, episodes: List[Episode], status: str):
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(episodes, status)
+        except Exception as e:
+            self.logger.error(f"Failed to record ingestion status {status}: {e}")
+
+    def start(self):
+        """Start the background worker on the running event loop, if there is one."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from a thread without a loop: wake a worker running elsewhere
+            if self._worker is not None and not self._worker.done():
+                self._worker.get_loop().call_soon_threadsafe(self._wakeup.set)
+            return
+        if self._closed or (self._worker is not None and not self._worker.done()
+                            and self._worker.get_loop() is loop):
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return
+
+        # Batches of a worker on an event loop that has since stopped never finished
+        self._in_flight = set()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._wakeup.set()
+        self._worker = loop.create_task(self._run())
+
+    def _next_batches(self) -> List[List[Episode]]:
+        """Oldest episodes of each agent without a batch in flight."""
+        batches = []
+        with self._lock:
+            for agent_id, episodes in self._pending.items():
+                if agent_id not in self._in_flight and episodes:
+                    batches.append(list(episodes.values())[:self.batch_size])
+        return batches
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                for batch in self._next_batches():
+                    self._in_flight.add(batch[0]["agent_id"])
+                    task = asyncio.create_task(self._ingest_batch(batch, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if not self._in_flight and not len(self):
+                    self._idle.set()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _ingest_batch(self, batch: List[Episode], semaphore: asyncio.Semaphore):
+        agent_id = batch[0]["agent_id"]
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                async with semaphore:
+                    self._notify(batch, "processing")
+                    try:
+                        await self.ingest(agent_id, batch)
+                        self._finish(batch, "processed")
+                        return
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        error = e
+                if attempt < self.max_attempts:
+                    delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+                    self.retries += 1
+                    self.logger.warning(f"Graph ingestion for {agent_id} failed ({error}); "
+                                        f"retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+            self.logger.error(f"Giving up graph ingestion of {len(batch)} episodes for {agent_id}: {error}")
+            self._finish(batch, "failed")
+        finally:
+            self._in_flight.discard(agent_id)
+            self._wakeup.set()
+
+    def _finish(self, batch: List[Episode], status: str):
+        agent_id = batch[0]["agent_id"]
+        with self._lock:
+            pending = self._pending.get(agent_id, {})
+            for episode in batch:
+                self._append({"op": status, "id": episode["id"]})
+                pending.pop(episode["id"], None)
+            if not pending:
+                self._pending.pop(agent_id, None)
+            if self._lines > 2 * len(self) + 1000:
+                self._compact()
+                self._journal.close()
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if status == "processed":
+            self.processed += len(batch)
+        else:
+            self.failed += len(batch)
+        self._notify(batch, status)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued episode has been processed or has failed.
+
+        Returns:
+            False if the timeout passed first, or if the queue is closed
+            with episodes left
+        """
+        if not len(self):
+            return True
+        self.start()
+        if self._closed or self._idle is None:
+            # No worker to wait for; the episodes stay queued for the next start
+            return False
+        self._idle.clear()
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self),
+            "agents_in_flight": len(self._in_flight),
+            "processed": self.processed,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+    async def close(self, drain_timeout: Optional[float] = None):
+        """
+        Stop the worker; episodes not yet processed stay queued for the next start.
+
+        Args:
+            drain_timeout: Seconds to keep ingesting queued episodes before
+                stopping; None stops at once
+        """
+        if drain_timeout is not None and not self._closed:
+            if not await self.drain(drain_timeout):
+                self.logger.warning(f"Stopping graph ingestion with {len(self)} episodes still queued")
+        self._closed = True
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            if self._worker.get_loop() is asyncio.get_running_loop():
+                try:
+                    await self._worker
+                except asyncio.CancelledError:
+                    pass
+        with self._lock:
+            self._journal.close()
@@ -0,0 +1,85 @@
+"""
+Live Chat Sessions for AMS-DB
+
+A LiveSession binds a long-lived connection (such as a WebSocket) to one
+agent and one chat session. The agent context and the recent-message window
+are loaded once when the session opens and then kept in memory: each message
+only retrieves from the agent's knowledge and generates the reply. Nothing
+is reloaded or re-read from the conversation table.
+"""
+
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from .agent_context import AgentContext
+
+
+class LiveSession:
+    """One agent and chat session, kept warm for the life of a connection."""
+
+    def __init__(self, framework, context: AgentContext, history_window: int = 10):
+        """
+        Args:
+            framework: GraphitiRAGFramework generating the replies
+            context: Agent and session the connection is bound to
+            history_window: Recent messages passed to the model as context
+        """
+        self.framework = framework
+        self.context = context
+        self.recent = deque(maxlen=history_window)
+        self.messages_sent = 0
+        self._config_generation = framework.db_handler.agent_configs.generation
+
+    @classmethod
+    async def open(cls, framework, agent_id: str, session_id: str = None,
+                   history_window: int = 10) -> Optional["LiveSession"]:
+        """
+        Load an agent and the tail of its session.
+
+        Args:
+            framework: GraphitiRAGFramework generating the replies
+            agent_id: Agent to chat with
+            session_id: Session to continue; defaults to the agent's default session
+            history_window: Recent messages passed to the model as context
+
+        Returns:
+            The session, or None if the agent does not exist
+        """
+        context = await framework.get_agent_context(agent_id, session_id)
+        if context is None:
+            return None
+
+        session = cls(framework, context, history_window)
+        history = await framework.async_db.read(framework.db_handler.get_session_messages, context.session_id)
+        for message in history.tail(history_window).to_dicts():
+            speaker = "human" if message["role"] == "user" else message["agent_id"]
+            session.recent.append(f"{speaker}: {message['content']}")
+        return session
+
+    async def _current_context(self) -> AgentContext:
+        """The bound context, rebuilt only if an agent config changed since it was loaded."""
+        configs = self.framework.db_handler.agent_configs
+        if configs.generation != self._config_generation:
+            self._config_generation = configs.generation
+            context = await self.framework.get_agent_context(self.context.agent_id, self.context.session_id)
+            if context is not None:
+                self.context = context
+        return self.context
+
+    async def send(self, message: str) -> AsyncIterator[str]:
+        """
+        Answer a message, yielding the reply in chunks as it is generated.
+
+        The turn is stored and added to the window once the reply is complete.
+        """
+        context = await self._current_context()
+        chunks = []
+        async for chunk in self.framework.stream_response(
+            context.agent_id, message, "\n".join(self.recent), context=context
+        ):
+            chunks.append(chunk)
+            yield chunk
+
+        self.recent.append(f"human: {message}")
+        self.recent.append(f"{context.agent_id}: {''.join(chunks)}")
+        self.messages_sent += 1
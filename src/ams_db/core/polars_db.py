@@ -1,26 +1,167 @@
 import polars as pl
 import json
+import os
+import shutil
+import threading
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 from pathlib import Path
+from urllib.parse import quote
 import logging
 
+import numpy as np
+
+from .agent_context import AgentConfigCache, thaw
+from .indexes import HashIndex
+from .text_index import TextIndex, parse_query
+from .vector_index import VectorIndex
+from .write_ahead_log import ColumnUpdate, WriteAheadLog
+
+
+def _new_ids(count: int) -> pl.Series:
+    """
+    Generate ``count`` random (version 4) UUID strings in one vectorized pass.
+    
+    Calling uuid.uuid4() a million times dominates bulk inserts, so random
+    bytes are drawn at once and formatted by Polars instead.
+    """
+    raw = bytearray(os.urandom(16 * count))
+    raw[6::16] = bytes((b & 0x0F) | 0x40 for b in raw[6::16])  # version 4
+    raw[8::16] = bytes((b & 0x3F) | 0x80 for b in raw[8::16])  # RFC 4122 variant
+    
+    hex_ids = pl.Series([raw.hex()]).str.extract_all(r"[0-9a-f]{32}").explode()
+    return pl.select(pl.concat_str([
+        hex_ids.str.slice(0, 8), hex_ids.str.slice(8, 4), hex_ids.str.slice(12, 4),
+        hex_ids.str.slice(16, 4), hex_ids.str.slice(20, 12)
+    ], separator="-")).to_series()
+
+
+def json_field(column: str, path: str, dtype: Optional[pl.DataType] = None) -> pl.Expr:
+    """
+    Expression reading one field of a JSON string column inside Polars.
+    
+    The metadata, config_json and results columns hold JSON whose keys vary
+    from row to row, so they stay strings; this lets queries filter and
+    select on their fields without json.loads per row.
+    
+    Args:
+        column: JSON string column
+        path: Dot-separated key path, e.g. "conversation_mode" or
+            "agent_core.prompts.llmSystem"
+        dtype: Decode non-scalar values (lists, objects) into this type;
+            otherwise values are returned as strings
+        
+    Returns:
+        Expression named after the last key of the path (null where missing)
+    
+    Example:
+        db.conversations.filter(json_field("metadata", "conversation_mode") == "HUMAN_CHAT")
+    """
+    value = pl.col(column).str.json_path_match(f"$.{path}")
+    if dtype is not None:
+        value = value.str.json_decode(dtype)
+    return value.alias(path.rsplit(".", 1)[-1])
+
+
+def _table_property(table_name: str) -> property:
+    """Expose a table as an attribute that is read from disk on first access."""
+    
+    def getter(self) -> pl.DataFrame:
+        return self._get_table(table_name)
+    
+    def setter(self, value: pl.DataFrame):
+        self._tables[table_name] = value
+    
+    return property(getter, setter, doc=f"The {table_name} table as a DataFrame.")
+
+
 class PolarsDBHandler:
     """
     A comprehensive Polars-based database handler for managing agent configurations,
     conversation histories, knowledge bases, and research collections.
     """
     
-    def __init__(self, db_path: str = "agent_database"):
+    # Table attribute -> parquet file name
+    TABLE_FILES = {
+        "agent_matrix": "agent_matrix.parquet",
+        "conversations": "conversations.parquet",
+        "knowledge_base": "knowledge_base.parquet",
+        "research_collection": "research_collection.parquet",
+        "templates": "templates.parquet",
+    }
+    
+    # Table attribute -> primary key column (used to make WAL replay idempotent)
+    TABLE_KEYS = {
+        "agent_matrix": "agent_id",
+        "conversations": "message_id",
+        "knowledge_base": "kb_id",
+        "research_collection": "research_id",
+        "templates": "template_id",
+    }
+    
+    # Table attribute -> hash indexes kept on the in-memory table (name -> key columns)
+    TABLE_INDEXES = {
+        "agent_matrix": {"agent_id": ("agent_id",)},
+        "conversations": {
+            "agent_id": ("agent_id",),
+            "session_id": ("session_id",),
+            "message_id": ("message_id",),
+        },
+        "knowledge_base": {"agent_id": ("agent_id",), "kb_id": ("kb_id",)},
+        "templates": {"template_id": ("template_id",), "template_name": ("template_name",)},
+    }
+    
+    # Single-row appends rechunk a table once it has more chunks than this
+    MAX_TABLE_CHUNKS = 64
+    
+    # Conversations are stored as a hive-style dataset, one file per agent and day:
+    # conversations/agent_id=<agent>/date=<YYYY-MM-DD>/part-0.parquet
+    CONVERSATION_DIR = "conversations"
+    
+    # Default directory of export_data files, kept apart from the table files
+    EXPORT_DIR = "exports"
+    
+    # Version of the on-disk column types; older files are rewritten on open
+    SCHEMA_VERSION = 3
+    SCHEMA_FILE = "schema.json"
+    
+    # Day of a conversation row, i.e. its date partition
+    _PARTITION_DATE = pl.col("timestamp").dt.date().cast(pl.String).alias("date")
+    
+    agent_matrix = _table_property("agent_matrix")
+    conversations = _table_property("conversations")
+    knowledge_base = _table_property("knowledge_base")
+    research_collection = _table_property("research_collection")
+    templates = _table_property("templates")
+    
+    def __init__(self, db_path: str = "agent_database", wal_enabled: bool = True,
+                 checkpoint_every: int = 1000, wal_sync_every: int = 32,
+                 lazy: bool = False, embedding_dim: int = 768):
         """
         Initialize the Polars database handler.
         
         Args:
             db_path: Base path for storing database files
+            wal_enabled: Log inserts to an append-only write-ahead log instead
+                of rewriting the parquet files on every insert
+            checkpoint_every: Number of logged inserts after which the log is
+                folded into the parquet files
+            wal_sync_every: Number of logged inserts per fsync group
+            lazy: Read tables only when first needed; queries scan the parquet
+                files so filters and projections are pushed down to them
+            embedding_dim: Length of knowledge document embeddings
         """
         self.db_path = Path(db_path)
         self.db_path.mkdir(exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self.lazy = lazy
+        self.embedding_dim = embedding_dim
+        
+        # Held by every AsyncDBHandler call on this handler, so handlers shared
+        # by several frameworks are still used by one thread at a time
+        self.lock = threading.RLock()
         
         # Initialize database schemas
         self._init_schemas()
@@ -28,10 +169,49 @@ class PolarsDBHandler:
         # Load existing data or create empty DataFrames
         self._load_or_create_tables()
         
-        self.logger = logging.getLogger(__name__)
+        # BM25 full-text index over knowledge documents, loaded per agent on first search
+        self.text_index = TextIndex(self.db_path / "text_index")
+        
+        # ANN index over knowledge document embeddings, loaded on first use;
+        # rebuilt instead when logged embedding updates may be missing from it
+        self._vector_index: Optional[VectorIndex] = None
+        self._vector_index_stale = False
+        
+        # Callbacks run with an agent_id when that agent's config changes, or
+        # when its knowledge documents or research results change
+        self._config_listeners: List[Callable[[str], None]] = []
+        self._knowledge_listeners: List[Callable[[str], None]] = []
+        
+        # Parsed, read-only agent configs shared by every caller of get_agent_config
+        self.agent_configs = AgentConfigCache()
+        
+        # Tables changed since their last flush, and how often each was written
+        self._dirty_tables = set()
+        self.flush_counts = {table_name: 0 for table_name in self.TABLE_FILES}
+        
+        # Open batch() scopes: buffered log records and deferred flushes
+        self._batch_savepoints = []
+        self._batch_records = []
+        self._batch_flush_all = False
+        self._batch_flush_tables = set()
+        
+        # Replay inserts that were logged but not yet checkpointed
+        self.checkpoint_every = checkpoint_every
+        self.wal = None
+        if wal_enabled:
+            self.wal = WriteAheadLog(self.db_path / "wal.log", sync_every=wal_sync_every)
+            self._replay_wal()
     
     def _init_schemas(self):
-        """Initialize the database schemas for different tables."""
+        """
+        Initialize the database schemas for different tables.
+        
+        Low-cardinality columns (ids repeated on every row, roles, types and
+        statuses) are dictionary encoded as Categorical. Since Polars 1.32
+        (the minimum this package requires) categories share one global
+        mapping, so these columns concat and join across tables and files
+        without a StringCache or re-encoding.
+        """
         
         # Agent Matrix Schema - Core agent configurations
         self.agent_matrix_schema = {
@@ -49,42 +229,43 @@ class PolarsDBHandler:
         # Conversation History Schema
         self.conversation_schema = {
             "conversation_id": pl.String,
-            "agent_id": pl.String,
+            "agent_id": pl.Categorical,
             "message_id": pl.String,
             "timestamp": pl.Datetime,
-            "role": pl.String,  # user, assistant, system
+            "role": pl.Categorical,  # user, assistant, system
             "content": pl.String,
-            "message_type": pl.String,  # text, image, audio, etc.
+            "message_type": pl.Categorical,  # text, image, audio, etc.
             "metadata": pl.String,  # JSON metadata
-            "session_id": pl.String
+            "session_id": pl.Categorical
         }
         
         # Knowledge Base Schema
         self.knowledge_base_schema = {
             "kb_id": pl.String,
-            "agent_id": pl.String,
+            "agent_id": pl.Categorical,
             "document_id": pl.String,
             "title": pl.String,
             "content": pl.String,
-            "content_type": pl.String,  # text, json, markdown, etc.
+            "content_type": pl.Categorical,  # text, json, markdown, etc.
             "source": pl.String,
             "created_at": pl.Datetime,
             "updated_at": pl.Datetime,
             "tags": pl.List(pl.String),
             "metadata": pl.String,
-            "embedding_status": pl.String  # pending, processed, failed
+            "embedding_status": pl.Categorical,  # pending, queued, processing, processed, failed
+            "embedding": pl.Array(pl.Float32, self.embedding_dim)
         }
         
         # Research Collection Schema
         self.research_schema = {
             "research_id": pl.String,
-            "agent_id": pl.String,
+            "agent_id": pl.Categorical,
             "query": pl.String,
             "results": pl.String,  # JSON serialized results
             "source_urls": pl.List(pl.String),
             "created_at": pl.Datetime,
-            "research_type": pl.String,  # web_search, document_analysis, etc.
-            "status": pl.String,  # completed, pending, failed
+            "research_type": pl.Categorical,  # web_search, document_analysis, etc.
+            "status": pl.Categorical,  # completed, pending, failed
             "metadata": pl.String
         }
         
@@ -101,50 +282,651 @@ class PolarsDBHandler:
         }
     
     def _load_or_create_tables(self):
-        """Load existing tables or create empty ones."""
+        """Load existing tables or create empty ones (deferred in lazy mode)."""
+        # None marks a table that has not been read from disk yet
+        self._tables: Dict[str, Optional[pl.DataFrame]] = {
+            table_name: None for table_name in self.TABLE_FILES
+        }
         
-        # Agent Matrix Table
-        agent_matrix_file = self.db_path / "agent_matrix.parquet"
-        if agent_matrix_file.exists():
-            self.agent_matrix = pl.read_parquet(agent_matrix_file)
-        else:
-            self.agent_matrix = pl.DataFrame(schema=self.agent_matrix_schema)
+        # Logged inserts not yet merged into an unread table
+        self._wal_overlay: Dict[str, pl.DataFrame] = {}
         
-        # Conversation History Table
-        conversation_file = self.db_path / "conversations.parquet"
-        if conversation_file.exists():
-            self.conversations = pl.read_parquet(conversation_file)
-        else:
-            self.conversations = pl.DataFrame(schema=self.conversation_schema)
+        # Conversation partitions that changed since their last flush, as
+        # (agent_id, date) pairs, and agents whose partitions are to be dropped
+        self._dirty_partitions = set()
+        self._dropped_agents = set()
+        
+        # Built on first lookup, then extended on every append
+        self._indexes: Dict[str, Dict[str, HashIndex]] = {
+            table_name: {name: HashIndex(columns) for name, columns in indexes.items()}
+            for table_name, indexes in self.TABLE_INDEXES.items()
+        }
         
-        # Knowledge Base Table
-        knowledge_file = self.db_path / "knowledge_base.parquet"
-        if knowledge_file.exists():
-            self.knowledge_base = pl.DataFrame(schema=self.knowledge_base_schema)
+        self.migrate_conversation_storage()
+        self._migrate_column_types()
+        
+        if not self.lazy:
+            for table_name in self.TABLE_FILES:
+                self._get_table(table_name)
+    
+    def _get_table(self, table_name: str) -> pl.DataFrame:
+        """Return a table, reading it from disk on first access."""
+        table = self._tables[table_name]
+        if table is None:
+            table = self._scan_files(table_name).collect()
+            
+            overlay = self._wal_overlay.pop(table_name, None)
+            if overlay is not None:
+                table = pl.concat([table, self._new_overlay_rows(table_name, table.lazy(), overlay).collect()])
+            
+            self._tables[table_name] = table
+        return table
+    
+    def _new_overlay_rows(self, table_name: str, base: pl.LazyFrame,
+                          overlay: pl.DataFrame) -> pl.LazyFrame:
+        """
+        Logged rows that are not already in the base table.
+        
+        A crash between writing parquet and truncating the log can leave rows
+        in both places, so replay skips keys that are already on disk.
+        """
+        key = self.TABLE_KEYS[table_name]
+        return overlay.lazy().join(base.select(key), on=key, how="anti")
+    
+    def _scan_files(self, table_name: str, agent_ids: Optional[List[str]] = None) -> pl.LazyFrame:
+        """Scan the parquet file(s) of a table as they are on disk."""
+        if table_name == "conversations":
+            files = self._conversation_files(agent_ids)
         else:
-            self.knowledge_base = pl.DataFrame(schema=self.knowledge_base_schema)
+            files = [self.db_path / self.TABLE_FILES[table_name]]
+            files = [f for f in files if f.exists()]
+        
+        if not files:
+            return pl.LazyFrame(schema=self._table_schema(table_name))
+        
+        # Partition columns are also stored inside the conversation files, so the
+        # directory names are only used to pick which files to read
+        return pl.scan_parquet(files, hive_partitioning=False)
+    
+    def _scan(self, table_name: str, agent_ids: Optional[List[str]] = None) -> pl.LazyFrame:
+        """
+        Build a LazyFrame over a table.
+        
+        Tables already in memory are scanned from RAM. Otherwise the parquet
+        files are scanned so that filters and projections reach their row
+        groups and only matching data is read.
+        
+        Args:
+            table_name: Table attribute to scan
+            agent_ids: For conversations, only read these agents' partitions.
+                Callers must still filter on agent_id.
+        """
+        table = self._tables[table_name]
+        if table is not None:
+            return table.lazy()
+        
+        scan = self._scan_files(table_name, agent_ids)
         
-        # Research Collection Table
-        research_file = self.db_path / "research_collection.parquet"
-        if research_file.exists():
-            self.research_collection = pl.read_parquet(research_file)
+        overlay = self._wal_overlay.get(table_name)
+        if overlay is not None:
+            scan = pl.concat([scan, self._new_overlay_rows(table_name, scan, overlay)])
+        return scan
+    
+    def _conversation_partition_dir(self, agent_id: str, date: Optional[str] = None) -> Path:
+        """Directory of an agent's conversation partitions, or of one day within them."""
+        path = self.db_path / self.CONVERSATION_DIR / f"agent_id={quote(agent_id, safe='')}"
+        if date is not None:
+            path = path / f"date={date}"
+        return path
+    
+    def _conversation_files(self, agent_ids: Optional[List[str]] = None) -> List[Path]:
+        """List conversation partition files, optionally only for some agents."""
+        if agent_ids is None:
+            agent_dirs = (self.db_path / self.CONVERSATION_DIR).glob("agent_id=*")
         else:
-            self.research_collection = pl.DataFrame(schema=self.research_schema)
+            agent_dirs = [self._conversation_partition_dir(agent_id) for agent_id in agent_ids]
+        
+        # Partitions of dropped agents are gone as far as readers are concerned
+        dropped = {self._conversation_partition_dir(agent_id) for agent_id in self._dropped_agents}
         
-        # Template Files Table
-        template_file = self.db_path / "templates.parquet"
-        if template_file.exists():
-            self.templates = pl.read_parquet(template_file)
+        files = []
+        for agent_dir in agent_dirs:
+            if agent_dir not in dropped:
+                files.extend(agent_dir.glob("date=*/part-*.parquet"))
+        return sorted(files)
+    
+    def _mark_partitions_dirty(self, rows: pl.DataFrame):
+        """Record which conversation partitions the given rows belong to."""
+        keys = rows.select(pl.col("agent_id"), self._PARTITION_DATE).unique()
+        self._dirty_partitions.update(keys.iter_rows())
+    
+    def _count(self, table_name: str, predicate: Optional[pl.Expr] = None) -> int:
+        """Count rows of a table (optionally matching a predicate) without loading it."""
+        scan = self._scan(table_name)
+        if predicate is not None:
+            scan = scan.filter(predicate)
+        return scan.select(pl.len()).collect().item()
+    
+    def _table_schema(self, table_name: str) -> Dict[str, Any]:
+        """Get the schema dict for a table attribute."""
+        return {
+            "agent_matrix": self.agent_matrix_schema,
+            "conversations": self.conversation_schema,
+            "knowledge_base": self.knowledge_base_schema,
+            "research_collection": self.research_schema,
+            "templates": self.template_schema,
+        }[table_name]
+    
+    def _replay_wal(self):
+        """Re-apply inserts and column updates from the write-ahead log to the tables."""
+        records = self.wal.read_records()
+        if not records:
+            return
+        
+        rows_by_table: Dict[str, List[Dict[str, Any]]] = {}
+        updates: List[Tuple[str, ColumnUpdate]] = []
+        for table_name, row in records:
+            if isinstance(row, ColumnUpdate):
+                updates.append((table_name, row))
+            else:
+                rows_by_table.setdefault(table_name, []).append(row)
+        
+        for table_name, rows in rows_by_table.items():
+            overlay = pl.DataFrame(rows, schema=self._table_schema(table_name))
+            table = self._tables[table_name]
+            if table is None:
+                # Merged when the table is first read, so lazy mode stays lazy
+                self._wal_overlay[table_name] = overlay
+            else:
+                new_rows = self._new_overlay_rows(table_name, table.lazy(), overlay).collect()
+                self._tables[table_name] = pl.concat([table, new_rows])
+            if table_name == "conversations":
+                self._mark_partitions_dirty(overlay)
+            self._mark_dirty(table_name)
+        
+        # Keys are never reused, so updates can follow all inserts in log order
+        for table_name, update in updates:
+            self._tables[table_name] = self._apply_update(table_name, self._get_table(table_name), update)
+            self._mark_dirty(table_name)
+            if table_name == "knowledge_base" and "embedding" in update.values:
+                self._vector_index_stale = True
+        
+        self.logger.info(f"Replayed {len(records)} write-ahead log records")
+    
+    def _apply_update(self, table_name: str, table: pl.DataFrame, update: ColumnUpdate) -> pl.DataFrame:
+        """Return a table with the values of a logged column update applied."""
+        schema = self._table_schema(table_name)
+        columns = [update.key, *update.values]
+        changes = pl.DataFrame(
+            {update.key: update.keys, **update.values},
+            schema={column: schema[column] for column in columns}
+        ).unique(update.key, keep="last", maintain_order=True)
+        changes = changes.rename({column: f"_{column}" for column in update.values})
+        
+        return (table
+                .join(changes, on=update.key, how="left", maintain_order="left")
+                .with_columns([pl.coalesce(f"_{column}", column).alias(column) for column in update.values])
+                .drop([f"_{column}" for column in update.values]))
+    
+    def _lookup(self, table_name: str, index_name: str, key: Any) -> Optional[pl.DataFrame]:
+        """
+        Fetch the rows of an in-memory table with a key via its hash index.
+        
+        Returns:
+            Matching rows in table order, or None if the table has not been
+            read yet (callers then fall back to a scan)
+        """
+        table = self._tables[table_name]
+        if table is None:
+            return None
+        return table[self._indexes[table_name][index_name].lookup(table, key)]
+    
+    def _lookup_positions(self, table_name: str, index_name: str, key: Any) -> List[int]:
+        """Row positions of a key in a table, reading the table if needed."""
+        table = self._get_table(table_name)
+        return self._indexes[table_name][index_name].lookup(table, key)
+    
+    def _update_indexes(self, table_name: str, old_table: pl.DataFrame,
+                        new_table: pl.DataFrame, appended: Optional[pl.DataFrame] = None):
+        """
+        Carry a table's indexes over to its new version.
+        
+        Args:
+            table_name: Table attribute
+            old_table: Table before the change
+            new_table: Table after the change
+            appended: Rows added at the end; None if rows only changed values
+                outside the indexed columns
+        """
+        for index in self._indexes.get(table_name, {}).values():
+            if appended is None:
+                index.rebind(old_table, new_table)
+            else:
+                index.append(old_table, new_table, appended)
+    
+    def _mark_dirty(self, table_name: str):
+        """Record that a table has changed since its last flush."""
+        self._dirty_tables.add(table_name)
+    
+    def _append_row(self, table_name: str, row: Dict[str, Any]):
+        """Append a single row to a table and make it durable."""
+        new_row = pl.DataFrame([row], schema=self._table_schema(table_name))
+        old_table = getattr(self, table_name)
+        table = pl.concat([old_table, new_row])
+        
+        # Every single-row concat adds a chunk and per-call overhead grows with
+        # the chunk count, so compact periodically
+        if table.n_chunks() > self.MAX_TABLE_CHUNKS:
+            table = table.rechunk()
+        
+        setattr(self, table_name, table)
+        self._update_indexes(table_name, old_table, table, new_row)
+        if table_name == "conversations":
+            self._mark_partitions_dirty(new_row)
+        self._mark_dirty(table_name)
+        
+        self._log_record(table_name, row)
+    
+    def _log_record(self, table_name: str, record: Union[Dict[str, Any], ColumnUpdate]):
+        """
+        Make an in-memory change durable.
+        
+        The change is logged (or buffered until the enclosing batch commits)
+        rather than flushing the table. Without a write-ahead log the table
+        is flushed instead.
+        """
+        if self._batch_savepoints:
+            self._batch_records.append((table_name, record))
+            return
+        
+        if self.wal is None:
+            self.save_tables([table_name])
+            return
+        
+        self.wal.append(table_name, record)
+        if self.wal.pending_records >= self.checkpoint_every:
+            self.checkpoint()
+    
+    def _append_rows(self, table_name: str, rows: pl.DataFrame):
+        """Append a validated frame to a table and flush that table once."""
+        if rows.height == 0:
+            return
+        old_table = getattr(self, table_name)
+        table = pl.concat([old_table, rows])
+        setattr(self, table_name, table)
+        self._update_indexes(table_name, old_table, table, rows)
+        if table_name == "conversations":
+            self._mark_partitions_dirty(rows)
+        self._mark_dirty(table_name)
+        self.save_tables([table_name])
+    
+    def _records_to_frame(self, records: Any) -> pl.DataFrame:
+        """Convert a list of dicts, an Arrow table or a Polars DataFrame to a DataFrame."""
+        if isinstance(records, pl.DataFrame):
+            return records
+        if type(records).__module__.startswith("pyarrow"):
+            return pl.from_arrow(records)
+        if isinstance(records, list):
+            if not records:
+                return pl.DataFrame()
+            
+            keys = dict.fromkeys(key for record in records for key in record)
+            columns = {key: [record.get(key) for record in records] for key in keys}
+            
+            # JSON columns may be given as dicts
+            for key in ("metadata", "results"):
+                if key in columns:
+                    columns[key] = [
+                        value if value is None or isinstance(value, str) else json.dumps(value)
+                        for value in columns[key]
+                    ]
+            return pl.DataFrame(columns, strict=False)
+        
+        raise TypeError(
+            f"Expected a list of records, a pyarrow Table or a polars DataFrame, "
+            f"got {type(records).__name__}"
+        )
+    
+    def _prepare_bulk(self, table_name: str, records: Any, required: List[str],
+                      defaults: Dict[str, Any]) -> pl.DataFrame:
+        """
+        Validate bulk records against a table schema and fill default columns.
+        
+        Args:
+            table_name: Target table attribute
+            records: List of dicts, Arrow table or Polars DataFrame
+            required: Columns that must be present and non-null
+            defaults: Column -> literal, Polars expression or callable(n) -> Series
+            
+        Returns:
+            DataFrame with exactly the table's schema
+        """
+        schema = self._table_schema(table_name)
+        df = self._records_to_frame(records)
+        if df.height == 0:
+            return pl.DataFrame(schema=schema)
+        
+        unknown = [column for column in df.columns if column not in schema]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table_name}: {unknown}")
+        
+        missing = [column for column in required if column not in df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns for {table_name}: {missing}")
+        
+        null_required = [column for column in required if df.get_column(column).null_count()]
+        if null_required:
+            raise ValueError(f"Null values in required columns for {table_name}: {null_required}")
+        
+        # JSON columns may arrive as structs (e.g. from Arrow or DataFrame input)
+        df = df.with_columns([
+            pl.col(column).struct.json_encode()
+            for column in ("metadata", "results")
+            if column in df.columns and isinstance(df.schema[column], pl.Struct)
+        ])
+        
+        for column, default in defaults.items():
+            if callable(default) and not isinstance(default, pl.Expr):
+                if column not in df.columns:
+                    df = df.with_columns(default(df.height).alias(column))
+                continue
+            
+            value = default if isinstance(default, pl.Expr) else pl.lit(default)
+            if column in df.columns:
+                df = df.with_columns(pl.col(column).fill_null(value))
+            else:
+                df = df.with_columns(value.alias(column))
+        
+        try:
+            return df.select([
+                pl.col(column).cast(dtype, strict=True) for column, dtype in schema.items()
+            ])
+        except (pl.exceptions.InvalidOperationError, pl.exceptions.ComputeError) as e:
+            raise ValueError(f"Records do not match the {table_name} schema: {e}") from e
+    
+    def _write_parquet_atomic(self, df: pl.DataFrame, target: Path):
+        """Write a parquet file atomically: write a temp file, fsync it, then rename."""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(target.name + ".tmp")
+        
+        df.write_parquet(temp)
+        with open(temp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(temp, target)
+    
+    def _write_table(self, table_name: str):
+        """Atomically write one table to disk."""
+        if table_name == "conversations":
+            self._write_conversation_partitions()
         else:
-            self.templates = pl.DataFrame(schema=self.template_schema)
+            self._write_parquet_atomic(getattr(self, table_name),
+                                       self.db_path / self.TABLE_FILES[table_name])
+        
+        # Saved after the table, so a crash in between leaves an index that is
+        # detected as stale and rebuilt
+        if table_name == "knowledge_base":
+            self.text_index.save()
+            if self._vector_index is not None:
+                self._vector_index.save()
+        
+        self.flush_counts[table_name] += 1
     
-    def save_tables(self):
-        """Save all tables to parquet files."""
-        self.agent_matrix.write_parquet(self.db_path / "agent_matrix.parquet")
-        self.conversations.write_parquet(self.db_path / "conversations.parquet")
-        self.knowledge_base.write_parquet(self.db_path / "knowledge_base.parquet")
-        self.research_collection.write_parquet(self.db_path / "research_collection.parquet")
-        self.templates.write_parquet(self.db_path / "templates.parquet")
+    def _write_conversation_partitions(self):
+        """Rewrite the dirty conversation partitions and drop those left empty."""
+        dirty = self._dirty_partitions
+        agent_ids = sorted({agent_id for agent_id, _ in dirty})
+        partitions = {}
+        if dirty:
+            keys = pl.LazyFrame(sorted(dirty), orient="row", schema={
+                "agent_id": self.conversation_schema["agent_id"], "date": pl.String
+            })
+            rows = (self._scan("conversations", agent_ids)
+                    .with_columns(self._PARTITION_DATE)
+                    .join(keys, on=["agent_id", "date"], how="semi")
+                    .collect())
+            partitions = rows.partition_by(["agent_id", "date"], as_dict=True)
+        
+        for agent_id in self._dropped_agents:
+            shutil.rmtree(self._conversation_partition_dir(agent_id), ignore_errors=True)
+        self._dropped_agents = set()
+        
+        for (agent_id, date), part in partitions.items():
+            self._write_parquet_atomic(
+                part.drop("date"),
+                self._conversation_partition_dir(agent_id, date) / "part-0.parquet"
+            )
+        
+        for agent_id, date in dirty - set(partitions):
+            shutil.rmtree(self._conversation_partition_dir(agent_id, date), ignore_errors=True)
+        
+        self._dirty_partitions = set()
+        # Logged rows of an unread table are now in their partition files
+        self._wal_overlay.pop("conversations", None)
+    
+    def _migrate_column_types(self):
+        """
+        Rewrite parquet files written with older column types (e.g. plain
+        String instead of Categorical) or without newer columns once,
+        recording file sizes before and after in the schema file.
+        """
+        schema_file = self.db_path / self.SCHEMA_FILE
+        info = {}
+        if schema_file.exists():
+            info = json.loads(schema_file.read_text())
+            if info.get("version", 1) >= self.SCHEMA_VERSION:
+                self.schema_info = info
+                return
+        
+        files = [(table_name, self.db_path / file_name)
+                 for table_name, file_name in self.TABLE_FILES.items()]
+        files += [("conversations", f) for f in self._conversation_files()]
+        
+        size_before = size_after = 0
+        migrated = 0
+        for table_name, table_file in files:
+            if not table_file.exists():
+                continue
+            schema = self._table_schema(table_name)
+            size_before += table_file.stat().st_size
+            if dict(pl.read_parquet_schema(table_file)) != schema:
+                # Columns added since the file was written start out null
+                df = pl.read_parquet(table_file)
+                df = df.with_columns([
+                    pl.lit(None, dtype=dtype).alias(column)
+                    for column, dtype in schema.items() if column not in df.columns
+                ])
+                self._write_parquet_atomic(df.select(list(schema)).cast(schema), table_file)
+                migrated += 1
+            size_after += table_file.stat().st_size
+        
+        info["version"] = self.SCHEMA_VERSION
+        if migrated:
+            info["migration"] = {
+                "migrated_at": datetime.now().isoformat(),
+                "files": migrated,
+                "size_before_mb": size_before / (1024 * 1024),
+                "size_after_mb": size_after / (1024 * 1024),
+            }
+            self.logger.info(f"Migrated {migrated} parquet files to schema version {self.SCHEMA_VERSION}")
+        
+        temp = schema_file.with_name(schema_file.name + ".tmp")
+        temp.write_text(json.dumps(info, indent=2))
+        os.replace(temp, schema_file)
+        self.schema_info = info
+    
+    def get_memory_usage(self) -> Dict[str, float]:
+        """
+        Estimate the memory held by the tables currently in RAM.
+        
+        Returns:
+            Dict with the estimated size in MB as stored ("memory_mb") and as
+            it would be with plain String columns ("memory_mb_as_strings")
+        """
+        tables = [table for table in self._tables.values() if table is not None]
+        as_stored = sum(table.estimated_size() for table in tables)
+        as_strings = sum(
+            table.cast({pl.Categorical: pl.String}).estimated_size() for table in tables
+        )
+        return {
+            "memory_mb": as_stored / (1024 * 1024),
+            "memory_mb_as_strings": as_strings / (1024 * 1024),
+        }
+    
+    def migrate_conversation_storage(self) -> int:
+        """
+        Move conversations from the legacy single conversations.parquet file
+        into the partitioned dataset. Runs automatically when the database is
+        opened; safe to call again, as it does nothing once migrated.
+        
+        Partitions that already exist are never overwritten: only legacy rows
+        whose message_id is not in them yet are added.
+        
+        Returns:
+            Number of migrated rows
+        """
+        legacy_file = self.db_path / self.TABLE_FILES["conversations"]
+        if not legacy_file.exists():
+            return 0
+        
+        rows = (pl.read_parquet(legacy_file)
+                .cast(self.conversation_schema)
+                .with_columns(self._PARTITION_DATE))
+        migrated = 0
+        for (agent_id, date), part in rows.partition_by(["agent_id", "date"], as_dict=True).items():
+            part = part.drop("date")
+            partition_file = self._conversation_partition_dir(agent_id, date) / "part-0.parquet"
+            if partition_file.exists():
+                existing = pl.read_parquet(partition_file).cast(self.conversation_schema)
+                part = part.join(existing.select("message_id"), on="message_id", how="anti")
+                if part.height == 0:
+                    continue
+                migrated += part.height
+                self._write_parquet_atomic(pl.concat([existing, part]), partition_file)
+            else:
+                migrated += part.height
+                self._write_parquet_atomic(part, partition_file)
+        
+        # Only remove the old file once every partition is durable; an
+        # interrupted migration is simply redone on the next start
+        legacy_file.unlink()
+        self.logger.info(f"Migrated {migrated} conversation rows to partitioned storage")
+        return migrated
+    
+    def save_tables(self, tables: Optional[List[str]] = None):
+        """
+        Save changed tables to parquet files.
+        
+        Args:
+            tables: Tables to flush if dirty; defaults to every dirty table
+        """
+        if self._batch_savepoints:
+            # Deferred until the outermost batch commits
+            if tables is None:
+                self._batch_flush_all = True
+            else:
+                self._batch_flush_tables.update(tables)
+            return
+        
+        to_flush = self._dirty_tables if tables is None else self._dirty_tables.intersection(tables)
+        for table_name in sorted(to_flush):
+            self._write_table(table_name)
+        self._dirty_tables -= to_flush
+        
+        # Once nothing is dirty, everything in the log is part of the parquet files
+        if self.wal is not None and not self._dirty_tables:
+            self.wal.truncate()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group writes into a single commit.
+        
+        Inserts, updates and deletes made inside the scope are buffered in
+        memory and committed with one log write and at most one flush when the
+        outermost scope exits. If an exception escapes a scope, every change
+        made inside that scope is rolled back. Scopes may be nested.
+        
+        Example:
+            with db.batch():
+                db.add_conversation_message(agent_id, "user", question, session_id)
+                db.add_conversation_message(agent_id, "assistant", answer, session_id)
+        """
+        # DataFrames are immutable, so a savepoint only holds references
+        self._batch_savepoints.append((
+            dict(self._tables),
+            dict(self._wal_overlay),
+            set(self._dirty_tables),
+            set(self._dirty_partitions),
+            set(self._dropped_agents),
+            len(self._batch_records),
+            self._batch_flush_all,
+            set(self._batch_flush_tables),
+        ))
+        
+        try:
+            yield self
+        except BaseException:
+            (tables, overlay, dirty, dirty_partitions, dropped_agents,
+             record_count, flush_all, flush_tables) = self._batch_savepoints.pop()
+            self._tables = tables
+            self._wal_overlay = overlay
+            self._dirty_tables = dirty
+            self._dirty_partitions = dirty_partitions
+            self._dropped_agents = dropped_agents
+            self.text_index.invalidate()
+            # Unsaved vectors (from before or inside the batch) are only in the tables now
+            if self._vector_index is not None and (self._vector_index._main_dirty
+                                                   or self._vector_index._tail_dirty):
+                self._vector_index_stale = True
+            self._vector_index = None
+            self.agent_configs.invalidate()
+            del self._batch_records[record_count:]
+            self._batch_flush_all = flush_all
+            self._batch_flush_tables = flush_tables
+            raise
+        
+        self._batch_savepoints.pop()
+        if not self._batch_savepoints:
+            self._commit_batch()
+    
+    transaction = batch
+    
+    def _commit_batch(self):
+        """Write the buffered changes of a finished batch."""
+        records = self._batch_records
+        flush_all = self._batch_flush_all
+        flush_tables = self._batch_flush_tables
+        self._batch_records = []
+        self._batch_flush_all = False
+        self._batch_flush_tables = set()
+        
+        if self.wal is None:
+            self.save_tables()
+            return
+        
+        if records:
+            self.wal.append_many(records)
+            self.wal.sync()
+        
+        if flush_all or self.wal.pending_records >= self.checkpoint_every:
+            self.checkpoint()
+        elif flush_tables:
+            self.save_tables(sorted(flush_tables))
+    
+    def get_dirty_tables(self) -> List[str]:
+        """List tables with changes that have not been flushed yet."""
+        return sorted(self._dirty_tables)
+    
+    def checkpoint(self):
+        """Fold the write-ahead log into the parquet files."""
+        self.save_tables()
+    
+    def close(self):
+        """Checkpoint pending inserts and close the write-ahead log."""
+        if self.wal is not None:
+            if self.wal.pending_records:
+                self.checkpoint()
+            self.wal.close()
     
     # Agent Matrix Operations
     def add_agent_config(self, agent_config: Dict[str, Any], agent_name: str = None, 
@@ -153,64 +935,132 @@ class PolarsDBHandler:
         agent_id = agent_config.get("agent_id", str(uuid.uuid4()))
         now = datetime.now()
         
-        new_agent = pl.DataFrame({
-            "agent_id": [agent_id],
-            "agent_name": [agent_name or agent_id],
-            "created_at": [now],
-            "updated_at": [now],
-            "config_json": [json.dumps(agent_config)],
-            "description": [description],
-            "tags": [tags or []],
-            "version": ["1.0.0"],
-            "is_active": [True]
+        self._append_row("agent_matrix", {
+            "agent_id": agent_id,
+            "agent_name": agent_name or agent_id,
+            "created_at": now,
+            "updated_at": now,
+            "config_json": json.dumps(agent_config),
+            "description": description,
+            "tags": tags or [],
+            "version": "1.0.0",
+            "is_active": True
         })
-        
-        self.agent_matrix = pl.concat([self.agent_matrix, new_agent])
-        self.save_tables()
+        self.agent_configs.invalidate(agent_id)
         return agent_id
     
     def get_agent_config(self, agent_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve an agent configuration by ID."""
-        result = self.agent_matrix.filter(pl.col("agent_id") == agent_id)
+        """
+        Retrieve an agent configuration by ID.
+        
+        Configs are parsed once and cached until the agent is updated or
+        deleted. Each call returns its own plain dict/list copy, so callers
+        can edit it without touching the cache.
+        """
+        config = self.agent_configs.get(agent_id)
+        if config is None:
+            config = self.load_agent_config(agent_id)
+        return thaw(config)
+    
+    def load_agent_config(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read and parse an agent configuration, bypassing and then refreshing the cache.
+        
+        Returns the cached, read-only form used for agent contexts; use
+        ``get_agent_config`` for an editable copy.
+        """
+        generation = self.agent_configs.generation
+        result = self._lookup("agent_matrix", "agent_id", agent_id)
+        if result is None:
+            result = (self._scan("agent_matrix")
+                      .filter(pl.col("agent_id") == agent_id)
+                      .select("config_json")
+                      .head(1)
+                      .collect())
         if result.height > 0:
-            config_json = result.select("config_json").to_series()[0]
-            return json.loads(config_json)
+            config_json = result.get_column("config_json")[0]
+            return self.agent_configs.put(agent_id, json.loads(config_json), generation)
         return None
     
     def update_agent_config(self, agent_id: str, agent_config: Dict[str, Any]):
         """Update an existing agent configuration."""
-        self.agent_matrix = self.agent_matrix.with_columns([
-            pl.when(pl.col("agent_id") == agent_id)
-            .then(json.dumps(agent_config))
-            .otherwise(pl.col("config_json"))
-            .alias("config_json"),
-            
-            pl.when(pl.col("agent_id") == agent_id)
-            .then(datetime.now())
-            .otherwise(pl.col("updated_at"))
-            .alias("updated_at")
+        table = self.agent_matrix
+        positions = self._lookup_positions("agent_matrix", "agent_id", agent_id)
+        config_json = json.dumps(agent_config)
+        self.agent_matrix = table.with_columns([
+            table.get_column("config_json").scatter(positions, config_json),
+            table.get_column("updated_at").scatter(positions, datetime.now()),
         ])
-        self.save_tables()
+        self._update_indexes("agent_matrix", table, self.agent_matrix)
+        self._mark_dirty("agent_matrix")
+        self.save_tables(["agent_matrix"])
+        
+        # Write-through: cache the new config if the agent exists
+        self.agent_configs.invalidate(agent_id)
+        if len(positions):
+            self.agent_configs.put(agent_id, json.loads(config_json))
+        self._notify_config_change(agent_id)
+    
+    def add_config_listener(self, listener: Callable[[str], None]):
+        """
+        Register a callback run with the agent_id after an agent's config is
+        updated or the agent is deleted, e.g. to invalidate derived caches.
+        """
+        self._config_listeners.append(listener)
+    
+    def remove_config_listener(self, listener: Callable[[str], None]):
+        """Unregister a callback added with add_config_listener, if present."""
+        if listener in self._config_listeners:
+            self._config_listeners.remove(listener)
+    
+    def _notify_config_change(self, agent_id: str):
+        for listener in self._config_listeners:
+            listener(agent_id)
+    
+    def add_knowledge_listener(self, listener: Callable[[str], None]):
+        """
+        Register a callback run with the agent_id after knowledge documents,
+        their embeddings or research results of that agent are added or
+        changed, e.g. to drop answers that may now be out of date.
+        """
+        self._knowledge_listeners.append(listener)
+    
+    def remove_knowledge_listener(self, listener: Callable[[str], None]):
+        """Unregister a callback added with add_knowledge_listener, if present."""
+        if listener in self._knowledge_listeners:
+            self._knowledge_listeners.remove(listener)
+    
+    def _notify_knowledge_change(self, agent_ids: List[str]):
+        for agent_id in agent_ids:
+            for listener in self._knowledge_listeners:
+                listener(agent_id)
     
     def list_agents(self, active_only: bool = True) -> pl.DataFrame:
         """List all agents in the matrix."""
-        df = self.agent_matrix
+        df = self._scan("agent_matrix")
         if active_only:
             df = df.filter(pl.col("is_active") == True)
-        return df.select(["agent_id", "agent_name", "description", "tags", "created_at", "updated_at"])
+        return df.select(["agent_id", "agent_name", "description", "tags", "created_at", "updated_at"]).collect()
     
     def delete_agent(self, agent_id: str, soft_delete: bool = True):
         """Delete an agent (soft delete by default)."""
         if soft_delete:
-            self.agent_matrix = self.agent_matrix.with_columns([
-                pl.when(pl.col("agent_id") == agent_id)
-                .then(False)
-                .otherwise(pl.col("is_active"))
-                .alias("is_active")
-            ])
+            table = self.agent_matrix
+            positions = self._lookup_positions("agent_matrix", "agent_id", agent_id)
+            self.agent_matrix = table.with_columns(
+                table.get_column("is_active").scatter(positions, False)
+            )
+            self._update_indexes("agent_matrix", table, self.agent_matrix)
         else:
             self.agent_matrix = self.agent_matrix.filter(pl.col("agent_id") != agent_id)
+            self._drop_conversation_partitions(agent_id)
+        self._mark_dirty("agent_matrix")
+        
+        # Deleted rows may still be in the write-ahead log, so fully checkpoint
+        # to keep replay from bringing them back
         self.save_tables()
+        self.agent_configs.invalidate(agent_id)
+        self._notify_config_change(agent_id)
     
     def search_agents(self, query: str, search_fields: List[str] = None) -> pl.DataFrame:
         """Search agents by name, description, or tags."""
@@ -226,7 +1076,7 @@ class PolarsDBHandler:
         for condition in conditions[1:]:
             combined_condition = combined_condition | condition
         
-        return self.agent_matrix.filter(combined_condition)
+        return self._scan("agent_matrix").filter(combined_condition).collect()
     
     # Conversation Operations
     def add_conversation_message(self, agent_id: str, role: str, content: str, 
@@ -236,110 +1086,404 @@ class PolarsDBHandler:
         message_id = str(uuid.uuid4())
         conversation_id = f"{agent_id}_{session_id or 'default'}"
         
-        new_message = pl.DataFrame({
-            "conversation_id": [conversation_id],
-            "agent_id": [agent_id],
-            "message_id": [message_id],
-            "timestamp": [datetime.now()],
-            "role": [role],
-            "content": [content],
-            "message_type": [message_type],
-            "metadata": [json.dumps(metadata or {})],
-            "session_id": [session_id or "default"]
+        self._append_row("conversations", {
+            "conversation_id": conversation_id,
+            "agent_id": agent_id,
+            "message_id": message_id,
+            "timestamp": datetime.now(),
+            "role": role,
+            "content": content,
+            "message_type": message_type,
+            "metadata": json.dumps(metadata or {}),
+            "session_id": session_id or "default"
         })
-        
-        self.conversations = pl.concat([self.conversations, new_message])
-        self.save_tables()
         return message_id
     
+    def add_conversation_messages_bulk(self, records: Any) -> List[str]:
+        """
+        Add many conversation messages with a single concat and flush.
+        
+        Args:
+            records: List of dicts, Arrow table or Polars DataFrame. Requires
+                agent_id, role and content; other conversation columns are
+                optional and filled like add_conversation_message does.
+                
+        Returns:
+            List of message IDs in input order
+        """
+        now = datetime.now()
+        rows = self._prepare_bulk("conversations", records, ["agent_id", "role", "content"], {
+            "message_id": _new_ids,
+            "timestamp": pl.lit(now),
+            "message_type": "text",
+            "metadata": "{}",
+            "session_id": "default",
+            "conversation_id": pl.concat_str(
+                [pl.col("agent_id"), pl.col("session_id")], separator="_"
+            ),
+        })
+        self._append_rows("conversations", rows)
+        return rows.get_column("message_id").to_list()
+    
     def get_conversation_history(self, agent_id: str, session_id: str = None, 
                                limit: int = 100) -> pl.DataFrame:
         """Get conversation history for an agent."""
-        df = self.conversations.filter(pl.col("agent_id") == agent_id)
+        if session_id:
+            rows = self._lookup("conversations", "session_id", session_id)
+        else:
+            rows = self._lookup("conversations", "agent_id", agent_id)
+        df = rows.lazy() if rows is not None else self._scan("conversations", [agent_id])
         
+        df = df.filter(pl.col("agent_id") == agent_id)
         if session_id:
             df = df.filter(pl.col("session_id") == session_id)
         
-        return df.sort("timestamp", descending=True).limit(limit)
+        return df.sort("timestamp", descending=True).limit(limit).collect()
+    
+    def get_session_messages(self, session_id: str) -> pl.DataFrame:
+        """Get every message of a session (across agents) in chronological order."""
+        rows = self._lookup("conversations", "session_id", session_id)
+        if rows is None:
+            rows = self._scan("conversations").filter(pl.col("session_id") == session_id).collect()
+        return rows.sort("timestamp")
     
     def clear_conversation_history(self, agent_id: str, session_id: str = None):
         """Clear conversation history for an agent."""
         if session_id:
-            self.conversations = self.conversations.filter(
-                ~((pl.col("agent_id") == agent_id) & (pl.col("session_id") == session_id))
-            )
+            in_session = (pl.col("agent_id") == agent_id) & (pl.col("session_id") == session_id)
+            self._mark_partitions_dirty(self.conversations.filter(in_session))
+            self.conversations = self.conversations.filter(~in_session)
+            self._mark_dirty("conversations")
         else:
-            self.conversations = self.conversations.filter(pl.col("agent_id") != agent_id)
+            self._drop_conversation_partitions(agent_id)
         self.save_tables()
     
+    def _drop_conversation_partitions(self, agent_id: str):
+        """
+        Delete all of an agent's conversations.
+        
+        Rather than rewriting any files, the agent's partition directories are
+        removed on the next flush.
+        """
+        if self._tables["conversations"] is not None:
+            self.conversations = self.conversations.filter(pl.col("agent_id") != agent_id)
+        overlay = self._wal_overlay.get("conversations")
+        if overlay is not None:
+            self._wal_overlay["conversations"] = overlay.filter(pl.col("agent_id") != agent_id)
+        
+        self._dirty_partitions = {key for key in self._dirty_partitions if key[0] != agent_id}
+        self._dropped_agents.add(agent_id)
+        self._mark_dirty("conversations")
+    
     # Knowledge Base Operations
     def add_knowledge_document(self, agent_id: str, title: str, content: str, 
                              content_type: str = "text", source: str = "", 
-                             tags: List[str] = None, metadata: Dict[str, Any] = None) -> str:
-        """Add a document to the knowledge base."""
+                             tags: List[str] = None, metadata: Dict[str, Any] = None,
+                             embedding: List[float] = None) -> str:
+        """Add a document to the knowledge base, optionally with its embedding."""
+        if embedding is not None:
+            embedding = self._check_embeddings([embedding])[0].tolist()
+            # Loaded before the row is added, so the index is not seen as stale
+            self._get_vector_index()
+        
         kb_id = str(uuid.uuid4())
         document_id = str(uuid.uuid4())
         now = datetime.now()
         
-        new_doc = pl.DataFrame({
-            "kb_id": [kb_id],
-            "agent_id": [agent_id],
-            "document_id": [document_id],
-            "title": [title],
-            "content": [content],
-            "content_type": [content_type],
-            "source": [source],
-            "created_at": [now],
-            "updated_at": [now],
-            "tags": [tags or []],
-            "metadata": [json.dumps(metadata or {})],
-            "embedding_status": ["pending"]
+        self._append_row("knowledge_base", {
+            "kb_id": kb_id,
+            "agent_id": agent_id,
+            "document_id": document_id,
+            "title": title,
+            "content": content,
+            "content_type": content_type,
+            "source": source,
+            "created_at": now,
+            "updated_at": now,
+            "tags": tags or [],
+            "metadata": json.dumps(metadata or {}),
+            "embedding_status": "pending",
+            "embedding": embedding
         })
-        
-        self.knowledge_base = pl.concat([self.knowledge_base, new_doc])
-        self.save_tables()
+        self.text_index.add_documents(pl.DataFrame({
+            "agent_id": [agent_id], "kb_id": [kb_id], "title": [title], "content": [content]
+        }))
+        if embedding is not None:
+            self._vector_index.add([kb_id], [agent_id], np.array([embedding], dtype=np.float32))
+        self._notify_knowledge_change([agent_id])
         return kb_id
     
+    def add_knowledge_documents_bulk(self, records: Any) -> List[str]:
+        """
+        Add many knowledge documents with a single concat and flush.
+        
+        Args:
+            records: List of dicts, Arrow table or Polars DataFrame. Requires
+                agent_id, title and content; other knowledge base columns
+                (including embedding) are optional and filled like
+                add_knowledge_document does.
+                
+        Returns:
+            List of kb IDs in input order
+        """
+        now = datetime.now()
+        rows = self._prepare_bulk("knowledge_base", records, ["agent_id", "title", "content"], {
+            "kb_id": _new_ids,
+            "document_id": _new_ids,
+            "content_type": "text",
+            "source": "",
+            "created_at": pl.lit(now),
+            "updated_at": pl.lit(now),
+            "tags": pl.lit([], dtype=pl.List(pl.String)),
+            "metadata": "{}",
+            "embedding_status": "pending",
+            "embedding": pl.lit(None, dtype=self.knowledge_base_schema["embedding"]),
+        })
+        embedded = rows.filter(pl.col("embedding").is_not_null())
+        if embedded.height:
+            self._get_vector_index()
+        self._append_rows("knowledge_base", rows)
+        self.text_index.add_documents(rows)
+        if embedded.height:
+            self._vector_index.add(
+                embedded.get_column("kb_id").to_list(),
+                embedded.get_column("agent_id").cast(pl.String).to_list(),
+                embedded.get_column("embedding").to_numpy()
+            )
+        self._notify_knowledge_change(rows.get_column("agent_id").cast(pl.String).unique(maintain_order=True).to_list())
+        return rows.get_column("kb_id").to_list()
+    
+    def _agent_documents(self, agent_id: str) -> pl.DataFrame:
+        """All knowledge documents of one agent."""
+        rows = self._lookup("knowledge_base", "agent_id", agent_id)
+        if rows is None:
+            rows = self._scan("knowledge_base").filter(pl.col("agent_id") == agent_id).collect()
+        return rows
+    
+    def rebuild_text_index(self, agent_id: str = None):
+        """
+        Rebuild the full-text index from the knowledge base.
+        
+        Args:
+            agent_id: Agent to rebuild; defaults to every agent with documents
+        """
+        if agent_id is None:
+            agent_ids = (self._scan("knowledge_base")
+                         .select(pl.col("agent_id").cast(pl.String).unique())
+                         .collect()
+                         .to_series()
+                         .to_list())
+        else:
+            agent_ids = [agent_id]
+        
+        for agent in agent_ids:
+            self.text_index.rebuild(agent, self._agent_documents(agent))
+    
     def search_knowledge_base(self, agent_id: str, query: str, 
-                            content_type: str = None, tags: List[str] = None) -> pl.DataFrame:
-        """Search the knowledge base."""
-        df = self.knowledge_base.filter(pl.col("agent_id") == agent_id)
-        
-        # Text search in title and content
-        df = df.filter(
-            pl.col("title").str.contains(query, literal=False) |
-            pl.col("content").str.contains(query, literal=False)
-        )
+                            content_type: str = None, tags: List[str] = None,
+                            limit: int = None) -> pl.DataFrame:
+        """
+        Search the knowledge base, ranked by BM25 relevance.
         
-        if content_type:
-            df = df.filter(pl.col("content_type") == content_type)
+        Args:
+            agent_id: Agent whose documents to search
+            query: Words to look for, matched literally and case-insensitively;
+                wrap words in double quotes to require them as a phrase
+            content_type: Only return documents of this content type
+            tags: Only return documents with any of these tags
+            limit: Maximum number of documents to return
+            
+        Returns:
+            Matching documents with a "score" column, best first. A query
+            without any words returns all documents, newest first.
+        """
+        docs = self._agent_documents(agent_id)
+        index = self.text_index.get(agent_id, docs)
         
+        filters = []
+        if content_type:
+            filters.append(pl.col("content_type") == content_type)
         if tags:
             # Filter by tags (if any of the provided tags match)
             tag_conditions = [pl.col("tags").list.contains(tag) for tag in tags]
             combined_tag_condition = tag_conditions[0]
             for condition in tag_conditions[1:]:
                 combined_tag_condition = combined_tag_condition | condition
-            df = df.filter(combined_tag_condition)
+            filters.append(combined_tag_condition)
+        
+        if not any(parse_query(query)):
+            df = docs.lazy().with_columns(pl.lit(0.0).alias("score")).sort("updated_at", descending=True)
+        else:
+            # Top-k can be cut in the index only when nothing is filtered out afterwards
+            hits = index.search(query, limit=None if filters else limit)
+            scores = pl.LazyFrame(hits, schema={"kb_id": pl.String, "score": pl.Float64}, orient="row")
+            df = docs.lazy().join(scores, on="kb_id", how="inner").sort(
+                ["score", "updated_at"], descending=True
+            )
         
-        return df.sort("updated_at", descending=True)
+        for condition in filters:
+            df = df.filter(condition)
+        if limit is not None:
+            df = df.head(limit)
+        return df.collect()
+    
+    def _check_embeddings(self, embeddings: Any) -> np.ndarray:
+        """Convert embeddings to a float32 matrix, checking their dimension."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if vectors.ndim != 2 or vectors.shape[1] != self.embedding_dim:
+            raise ValueError(
+                f"Expected embeddings of length {self.embedding_dim}, got shape {vectors.shape}"
+            )
+        return vectors
+    
+    def _get_vector_index(self) -> VectorIndex:
+        """
+        Return the vector index, loading it on first use.
+        
+        A saved index that does not hold one vector per embedded document
+        (for example after a crash before it was saved), or that may miss
+        re-embedded documents, is rebuilt.
+        """
+        if self._vector_index is None:
+            index = VectorIndex.load(self.db_path / "vector_index", self.embedding_dim)
+            embedded = self._count("knowledge_base", pl.col("embedding").is_not_null())
+            if index is None or self._vector_index_stale or len(index) != embedded:
+                self.rebuild_vector_index()
+            else:
+                self._vector_index = index
+        return self._vector_index
+    
+    def rebuild_vector_index(self):
+        """Rebuild the vector index from the embeddings in the knowledge base."""
+        docs = (self._scan("knowledge_base")
+                .filter(pl.col("embedding").is_not_null())
+                .select("kb_id", pl.col("agent_id").cast(pl.String), "embedding")
+                .collect())
+        index = VectorIndex(self.db_path / "vector_index", self.embedding_dim)
+        index.build(
+            docs.get_column("kb_id").to_list(),
+            docs.get_column("agent_id").to_list(),
+            docs.get_column("embedding").to_numpy().reshape(-1, self.embedding_dim)
+        )
+        index.save()
+        self._vector_index = index
+        self._vector_index_stale = False
+        self.logger.info(f"Built vector index ({docs.height} documents)")
+    
+    def set_knowledge_embeddings(self, kb_ids: List[str], embeddings: Any):
+        """
+        Store embeddings for existing knowledge documents and index them.
+        
+        Args:
+            kb_ids: Documents to update
+            embeddings: One vector per document, as a (len(kb_ids), embedding_dim)
+                array or a list of lists
+        """
+        vectors = self._check_embeddings(embeddings)
+        if len(vectors) != len(kb_ids):
+            raise ValueError(f"Got {len(vectors)} embeddings for {len(kb_ids)} documents")
+        
+        index = self._get_vector_index()
+        table = self.knowledge_base
+        updates = pl.DataFrame({
+            "kb_id": pl.Series(kb_ids, dtype=pl.String),
+            "_embedding": pl.Series(vectors).cast(self.knowledge_base_schema["embedding"]),
+        }).unique("kb_id", keep="last", maintain_order=True)
+        
+        missing = updates.join(table.select("kb_id"), on="kb_id", how="anti")
+        if missing.height:
+            raise ValueError(f"Unknown knowledge documents: {missing.get_column('kb_id').to_list()}")
+        
+        # Array columns do not support scatter, so update through a join
+        self.knowledge_base = (table
+                               .join(updates, on="kb_id", how="left", maintain_order="left")
+                               .with_columns(pl.coalesce("_embedding", "embedding").alias("embedding"))
+                               .drop("_embedding"))
+        self._update_indexes("knowledge_base", table, self.knowledge_base)
+        
+        updated = self.knowledge_base.join(updates.select("kb_id"), on="kb_id", how="semi")
+        index.add(
+            updated.get_column("kb_id").to_list(),
+            updated.get_column("agent_id").cast(pl.String).to_list(),
+            updated.get_column("embedding").to_numpy()
+        )
+        self._mark_dirty("knowledge_base")
+        
+        # Logged like inserts; the parquet file and index reach disk at the next checkpoint
+        self._log_record("knowledge_base", ColumnUpdate(
+            "kb_id", updates.get_column("kb_id").to_list(),
+            {"embedding": updates.get_column("_embedding").to_list()}
+        ))
+        self._notify_knowledge_change(updated.get_column("agent_id").cast(pl.String).unique(maintain_order=True).to_list())
+    
+    def search_knowledge_by_vectors(self, query_vectors: Any, agent_id: str = None,
+                                    limit: int = 5) -> List[pl.DataFrame]:
+        """
+        Find the knowledge documents closest to a batch of query embeddings.
+        
+        Args:
+            query_vectors: (n, embedding_dim) array or list of vectors
+            agent_id: Only search this agent's documents
+            limit: Maximum number of documents per query
+            
+        Returns:
+            For each query, matching documents (without their embedding) with
+            a cosine "similarity" column, most similar first
+        """
+        queries = self._check_embeddings(query_vectors)
+        hits = self._get_vector_index().search(queries, k=limit, agent_id=agent_id)
+        
+        kb_ids = list({kb_id for query_hits in hits for kb_id, _ in query_hits})
+        table = self._tables["knowledge_base"]
+        if table is not None:
+            kb_index = self._indexes["knowledge_base"]["kb_id"]
+            docs = table[[position for kb_id in kb_ids for position in kb_index.lookup(table, kb_id)]]
+        else:
+            docs = self._scan("knowledge_base").filter(pl.col("kb_id").is_in(kb_ids)).collect()
+        docs = docs.drop("embedding")
+        columns = docs.columns
+        docs = docs.lazy()
+        
+        results = []
+        for query_hits in hits:
+            scores = pl.LazyFrame(query_hits, schema={"kb_id": pl.String, "similarity": pl.Float64},
+                                  orient="row")
+            results.append(scores.join(docs, on="kb_id", how="inner", maintain_order="left")
+                           .select(*columns, "similarity")
+                           .collect())
+        return results
+    
+    def search_knowledge_by_vector(self, query_vector: Any, agent_id: str = None,
+                                   limit: int = 5) -> pl.DataFrame:
+        """Find the knowledge documents closest to one query embedding."""
+        return self.search_knowledge_by_vectors([query_vector], agent_id=agent_id, limit=limit)[0]
     
     def get_knowledge_documents(self, agent_id: str, limit: int = 100) -> pl.DataFrame:
         """Get all knowledge documents for an agent."""
-        return (self.knowledge_base
-                .filter(pl.col("agent_id") == agent_id)
-                .sort("updated_at", descending=True)
-                .limit(limit))
-    
-    def update_embedding_status(self, kb_id: str, status: str):
-        """Update the embedding status of a knowledge document."""
-        self.knowledge_base = self.knowledge_base.with_columns([
-            pl.when(pl.col("kb_id") == kb_id)
-            .then(status)
-            .otherwise(pl.col("embedding_status"))
-            .alias("embedding_status")
-        ])
-        self.save_tables()
+        rows = self._lookup("knowledge_base", "agent_id", agent_id)
+        if rows is None:
+            rows = self._scan("knowledge_base").filter(pl.col("agent_id") == agent_id).collect()
+        return rows.sort("updated_at", descending=True).limit(limit)
+    
+    def update_embedding_status(self, kb_id: Union[str, List[str]], status: str):
+        """Update the embedding status of one or more knowledge documents."""
+        kb_ids = [kb_id] if isinstance(kb_id, str) else kb_id
+        table = self.knowledge_base
+        positions = [position for kb_id in kb_ids
+                     for position in self._lookup_positions("knowledge_base", "kb_id", kb_id)]
+        if not positions:
+            return
+        self.knowledge_base = table.with_columns(
+            table.get_column("embedding_status").scatter(positions, status)
+        )
+        self._update_indexes("knowledge_base", table, self.knowledge_base)
+        self._mark_dirty("knowledge_base")
+        
+        # Status changes happen per document as ingestion progresses, so they
+        # are logged and only reach the parquet file at the next checkpoint
+        self._log_record("knowledge_base", ColumnUpdate("kb_id", kb_ids, {"embedding_status": [status] * len(kb_ids)}))
     
     # Research Collection Operations
     def add_research_result(self, agent_id: str, query: str, results: Dict[str, Any], 
@@ -348,33 +1492,55 @@ class PolarsDBHandler:
         """Add research results to the collection."""
         research_id = str(uuid.uuid4())
         
-        new_research = pl.DataFrame({
-            "research_id": [research_id],
-            "agent_id": [agent_id],
-            "query": [query],
-            "results": [json.dumps(results)],
-            "source_urls": [source_urls or []],
-            "created_at": [datetime.now()],
-            "research_type": [research_type],
-            "status": ["completed"],
-            "metadata": [json.dumps(metadata or {})]
+        self._append_row("research_collection", {
+            "research_id": research_id,
+            "agent_id": agent_id,
+            "query": query,
+            "results": json.dumps(results),
+            "source_urls": source_urls or [],
+            "created_at": datetime.now(),
+            "research_type": research_type,
+            "status": "completed",
+            "metadata": json.dumps(metadata or {})
         })
-        
-        self.research_collection = pl.concat([self.research_collection, new_research])
-        self.save_tables()
+        self._notify_knowledge_change([agent_id])
         return research_id
     
+    def add_research_results_bulk(self, records: Any) -> List[str]:
+        """
+        Add many research results with a single concat and flush.
+        
+        Args:
+            records: List of dicts, Arrow table or Polars DataFrame. Requires
+                agent_id, query and results; other research columns are
+                optional and filled like add_research_result does.
+                
+        Returns:
+            List of research IDs in input order
+        """
+        rows = self._prepare_bulk("research_collection", records, ["agent_id", "query", "results"], {
+            "research_id": _new_ids,
+            "source_urls": pl.lit([], dtype=pl.List(pl.String)),
+            "created_at": pl.lit(datetime.now()),
+            "research_type": "web_search",
+            "status": "completed",
+            "metadata": "{}",
+        })
+        self._append_rows("research_collection", rows)
+        self._notify_knowledge_change(rows.get_column("agent_id").cast(pl.String).unique(maintain_order=True).to_list())
+        return rows.get_column("research_id").to_list()
+    
     def search_research_collection(self, agent_id: str, query: str, 
                                  research_type: str = None) -> pl.DataFrame:
         """Search the research collection."""
-        df = self.research_collection.filter(pl.col("agent_id") == agent_id)
+        df = self._scan("research_collection").filter(pl.col("agent_id") == agent_id)
         
         df = df.filter(pl.col("query").str.contains(query, literal=False))
         
         if research_type:
             df = df.filter(pl.col("research_type") == research_type)
         
-        return df.sort("created_at", descending=True)
+        return df.sort("created_at", descending=True).collect()
     
     # Template Operations
     def add_template(self, template_name: str, template_type: str, content: str,
@@ -383,40 +1549,40 @@ class PolarsDBHandler:
         template_id = str(uuid.uuid4())
         now = datetime.now()
         
-        new_template = pl.DataFrame({
-            "template_id": [template_id],
-            "template_name": [template_name],
-            "template_type": [template_type],
-            "content": [content],
-            "created_at": [now],
-            "updated_at": [now],
-            "tags": [tags or []],
-            "description": [description]
+        self._append_row("templates", {
+            "template_id": template_id,
+            "template_name": template_name,
+            "template_type": template_type,
+            "content": content,
+            "created_at": now,
+            "updated_at": now,
+            "tags": tags or [],
+            "description": description
         })
-        
-        self.templates = pl.concat([self.templates, new_template])
-        self.save_tables()
         return template_id
     
     def get_template(self, template_id: str = None, template_name: str = None) -> Optional[Dict[str, Any]]:
         """Get a template by ID or name."""
         if template_id:
-            result = self.templates.filter(pl.col("template_id") == template_id)
+            column, key = "template_id", template_id
         elif template_name:
-            result = self.templates.filter(pl.col("template_name") == template_name)
+            column, key = "template_name", template_name
         else:
             return None
         
+        result = self._lookup("templates", column, key)
+        if result is None:
+            result = self._scan("templates").filter(pl.col(column) == key).head(1).collect()
         if result.height > 0:
             return result.to_dicts()[0]
         return None
     
     def list_templates(self, template_type: str = None) -> pl.DataFrame:
         """List all templates."""
-        df = self.templates
+        df = self._scan("templates")
         if template_type:
             df = df.filter(pl.col("template_type") == template_type)
-        return df.sort("updated_at", descending=True)
+        return df.sort("updated_at", descending=True).collect()
     
     # Export/Import Operations
     def export_agent_config(self, agent_id: str, filepath: str):
@@ -463,44 +1629,55 @@ class PolarsDBHandler:
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
         return {
-            "agent_count": self.agent_matrix.height,
-            "active_agent_count": self.agent_matrix.filter(pl.col("is_active") == True).height,
-            "conversation_count": self.conversations.height,
-            "knowledge_document_count": self.knowledge_base.height,
-            "research_result_count": self.research_collection.height,
-            "template_count": self.templates.height,
+            "agent_count": self._count("agent_matrix"),
+            "active_agent_count": self._count("agent_matrix", pl.col("is_active") == True),
+            "conversation_count": self._count("conversations"),
+            "knowledge_document_count": self._count("knowledge_base"),
+            "research_result_count": self._count("research_collection"),
+            "template_count": self._count("templates"),
             "database_size_mb": sum(
-                f.stat().st_size for f in self.db_path.glob("*.parquet")
-            ) / (1024 * 1024)
+                f.stat().st_size for f in self.db_path.rglob("*.parquet")
+            ) / (1024 * 1024),
+            **self.get_memory_usage(),
+            "schema_migration": self.schema_info.get("migration"),
+            "wal_pending_records": self.wal.pending_records if self.wal else 0,
+            "dirty_tables": self.get_dirty_tables(),
+            "flush_counts": dict(self.flush_counts),
+            "agent_config_cache": self.agent_configs.stats()
         }
     
     def get_agent_stats(self) -> Dict[str, Any]:
         """Get agent-specific statistics."""
         return {
-            "total_agents": self.agent_matrix.height,
-            "active_agents": self.agent_matrix.filter(pl.col("is_active") == True).height,
-            "inactive_agents": self.agent_matrix.filter(pl.col("is_active") == False).height
+            "total_agents": self._count("agent_matrix"),
+            "active_agents": self._count("agent_matrix", pl.col("is_active") == True),
+            "inactive_agents": self._count("agent_matrix", pl.col("is_active") == False)
         }
     
     def get_conversation_stats(self) -> Dict[str, Any]:
         """Get conversation statistics."""
-        return {
-            "total_messages": self.conversations.height,
-            "unique_sessions": self.conversations.select("session_id").n_unique(),
-            "unique_conversations": self.conversations.select("conversation_id").n_unique()
-        }
+        counts = self._scan("conversations").select(
+            pl.len().alias("total_messages"),
+            pl.col("session_id").n_unique().alias("unique_sessions"),
+            pl.col("conversation_id").n_unique().alias("unique_conversations")
+        ).collect()
+        return counts.to_dicts()[0]
     
     def get_knowledge_stats(self) -> Dict[str, Any]:
         """Get knowledge base statistics."""
         return {
-            "total_entries": self.knowledge_base.height,
-            "embedded_entries": self.knowledge_base.filter(pl.col("embedding_status") == "completed").height,
-            "pending_entries": self.knowledge_base.filter(pl.col("embedding_status") == "pending").height
+            "total_entries": self._count("knowledge_base"),
+            "embedded_entries": self._count("knowledge_base", pl.col("embedding_status") == "processed"),
+            "pending_entries": self._count(
+                "knowledge_base", pl.col("embedding_status").is_in(["pending", "queued", "processing"])
+            )
         }
     
     def get_agent_by_id(self, agent_id: str) -> Optional[pl.DataFrame]:
         """Get agent data by ID."""
-        result = self.agent_matrix.filter(pl.col("agent_id") == agent_id)
+        result = self._lookup("agent_matrix", "agent_id", agent_id)
+        if result is None:
+            result = self._scan("agent_matrix").filter(pl.col("agent_id") == agent_id).collect()
         return result if result.height > 0 else None
     
     # New Methods for JSONL Export and Conversation Generation
@@ -516,9 +1693,9 @@ class PolarsDBHandler:
             bool: Success status
         """
         try:
-            conversations = self.conversations.filter(
+            conversations = self._scan("conversations", [agent_id]).filter(
                 pl.col("agent_id") == agent_id
-            ).sort("timestamp")
+            ).sort("timestamp").collect()
             
             if conversations.height == 0:
                 self.logger.warning(f"No conversations found for agent {agent_id}")
@@ -575,7 +1752,15 @@ class PolarsDBHandler:
             bool: Success status
         """
         try:
-            agents = self.list_agents()
+            agents = (self._scan("agent_matrix")
+                      .filter(pl.col("is_active") == True)
+                      .select(
+                          "agent_id", "agent_name", "description",
+                          json_field("config_json", "agent_core.prompts.llmSystem"),
+                          json_field("config_json", "agent_core.prompts.llmBooster"),
+                          json_field("config_json", "agent_core.prompts.visionSystem"),
+                      )
+                      .collect())
             
             if agents.height == 0:
                 self.logger.warning("No agents found to export")
@@ -584,14 +1769,11 @@ class PolarsDBHandler:
             jsonl_data = []
             
             for agent_row in agents.to_dicts():
-                agent_config = json.loads(agent_row["config_json"])
-                prompts = agent_config.get("agent_core", {}).get("prompts", {})
-                
                 # Create training examples from prompts
-                if prompts.get("llmSystem"):
+                if agent_row["llmSystem"]:
                     jsonl_data.append({
                         "messages": [
-                            {"role": "system", "content": prompts["llmSystem"]},
+                            {"role": "system", "content": agent_row["llmSystem"]},
                             {"role": "user", "content": "Hello, what can you help me with?"},
                             {"role": "assistant", "content": f"I'm {agent_row['agent_name']}, {agent_row['description']}"}
                         ],
@@ -600,11 +1782,11 @@ class PolarsDBHandler:
                         "prompt_type": "system_introduction"
                     })
                 
-                if prompts.get("llmBooster"):
+                if agent_row["llmBooster"]:
                     jsonl_data.append({
                         "messages": [
-                            {"role": "system", "content": prompts["llmSystem"]},
-                            {"role": "user", "content": prompts["llmBooster"]},
+                            {"role": "system", "content": agent_row["llmSystem"]},
+                            {"role": "user", "content": agent_row["llmBooster"]},
                             {"role": "assistant", "content": "I understand and will help you with your request."}
                         ],
                         "agent_id": agent_row["agent_id"],
@@ -612,10 +1794,10 @@ class PolarsDBHandler:
                         "prompt_type": "booster_response"
                     })
                 
-                if prompts.get("visionSystem"):
+                if agent_row["visionSystem"]:
                     jsonl_data.append({
                         "messages": [
-                            {"role": "system", "content": prompts["visionSystem"]},
+                            {"role": "system", "content": agent_row["visionSystem"]},
                             {"role": "user", "content": "Please analyze this image."},
                             {"role": "assistant", "content": "I'll analyze the image and provide detailed information about what I can see."}
                         ],
@@ -703,50 +1885,52 @@ class PolarsDBHandler:
                 ]
             }
             
-            # Start conversation
-            current_agent_idx = 0
-            starter_persona = personas[current_agent_idx]
-            starter_text = conversation_starters.get(starter_persona, conversation_starters["AI"])[0]
-            
-            self.add_conversation_message(
-                agent_ids[current_agent_idx], 
-                "user", 
-                starter_text, 
-                session_id,
-                {"persona": starter_persona, "turn": 0}
-            )
+            # Write the whole conversation as one commit
+            with self.batch():
+                # Start conversation
+                current_agent_idx = 0
+                starter_persona = personas[current_agent_idx]
+                starter_text = conversation_starters.get(starter_persona, conversation_starters["AI"])[0]
             
-            # Generate turns
-            for turn in range(1, turns):
-                current_agent_idx = turn % len(agent_ids)
-                current_agent_id = agent_ids[current_agent_idx]
-                current_persona = personas[current_agent_idx]
-                
-                # Get appropriate response
-                response_options = responses.get(current_persona, responses["AI"])
-                response = response_options[turn % len(response_options)]
-                
-                # Add some topic-specific content
-                if "minecraft" in topic.lower():
-                    if current_persona == "wizardly":
-                        response += " The art of block-craft holds ancient power!"
-                    elif current_persona == "human":
-                        response += " I love building in Minecraft!"
-                elif "navigation" in topic.lower():
-                    if current_persona == "AI":
-                        response += " Optimal pathfinding algorithms suggest..."
-                    elif current_persona == "human":
-                        response += " GPS apps are so handy!"
-                
                 self.add_conversation_message(
-                    current_agent_id,
-                    "assistant",
-                    response,
+                    agent_ids[current_agent_idx], 
+                    "user", 
+                    starter_text, 
                     session_id,
-                    "text",
-                    {"persona": current_persona, "turn": turn}
+                    metadata={"persona": starter_persona, "turn": 0}
                 )
             
+                # Generate turns
+                for turn in range(1, turns):
+                    current_agent_idx = turn % len(agent_ids)
+                    current_agent_id = agent_ids[current_agent_idx]
+                    current_persona = personas[current_agent_idx]
+                
+                    # Get appropriate response
+                    response_options = responses.get(current_persona, responses["AI"])
+                    response = response_options[turn % len(response_options)]
+                
+                    # Add some topic-specific content
+                    if "minecraft" in topic.lower():
+                        if current_persona == "wizardly":
+                            response += " The art of block-craft holds ancient power!"
+                        elif current_persona == "human":
+                            response += " I love building in Minecraft!"
+                    elif "navigation" in topic.lower():
+                        if current_persona == "AI":
+                            response += " Optimal pathfinding algorithms suggest..."
+                        elif current_persona == "human":
+                            response += " GPS apps are so handy!"
+                
+                    self.add_conversation_message(
+                        current_agent_id,
+                        "assistant",
+                        response,
+                        session_id,
+                        "text",
+                        {"persona": current_persona, "turn": turn}
+                    )
+            
             self.logger.info(f"Generated multi-agent conversation: {session_id} ({turns} turns)")
             return session_id
             
@@ -760,7 +1944,8 @@ class PolarsDBHandler:
         Args:
             table_name: Name of the table to export ('agents', 'conversations', 'knowledge', 'research', 'templates')
             format: Export format ('csv', 'parquet', 'json', 'jsonl')
-            file_path: Optional custom file path
+            file_path: Optional custom file path; defaults to the exports
+                directory of the database, away from the live table files
             
         Returns:
             Path to the exported file
@@ -782,7 +1967,9 @@ class PolarsDBHandler:
             
             # Generate file path if not provided
             if file_path is None:
-                file_path = str(self.db_path / f"{table_name}.{format}")
+                export_dir = self.db_path / self.EXPORT_DIR
+                export_dir.mkdir(parents=True, exist_ok=True)
+                file_path = str(export_dir / f"{table_name}.{format}")
             
             # Export based on format
             if format == "csv":
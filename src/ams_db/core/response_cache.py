@@ -0,0 +1,176 @@
+"""
+LLM Response Cache for AMS-DB
+
+Persistent cache of LLM responses keyed on everything that determines them:
+model, temperature, max_tokens and a hash of the messages. Entries are kept
+in an append-only JSON lines file that is loaded into memory on start and
+compacted when it grows well beyond the live entries.
+
+Modes:
+    off:           always call the LLM, store nothing
+    read-through:  answer repeats from the cache, call and store on a miss
+    record-only:   always call the LLM and store the response
+    replay-only:   answer from the cache only; a miss raises ResponseCacheMiss
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class ResponseCacheMiss(LookupError):
+    """Raised in replay-only mode when a request was never recorded."""
+
+
+class ResponseCache:
+    """Size-capped, optionally expiring store of LLM responses on disk."""
+
+    MODES = ("off", "read-through", "record-only", "replay-only")
+    CACHE_FILE = "responses.jsonl"
+
+    def __init__(self, cache_dir: Path, mode: str = "off", ttl_seconds: Optional[float] = None,
+                 max_entries: int = 10000):
+        """
+        Args:
+            cache_dir: Directory of the cache file
+            mode: One of MODES
+            ttl_seconds: Entries older than this are ignored and dropped;
+                None keeps them until evicted
+            max_entries: Maximum number of entries; the oldest is evicted first
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown response cache mode: {mode}. Available: {list(self.MODES)}")
+        self.cache_file = Path(cache_dir) / self.CACHE_FILE
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (created_at, response), oldest first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lines = 0
+        if mode != "off":
+            self._load()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: Optional[int],
+                 messages: List[Dict[str, str]]) -> str:
+        """Hash a request; messages are (role, content) dicts in order."""
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": messages},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _load(self):
+        if not self.cache_file.exists():
+            return
+        for line in self.cache_file.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+                key, created_at, response = entry["key"], entry["created_at"], entry["response"]
+            except (ValueError, KeyError, TypeError):
+                # A line cut short by a crash
+                continue
+            self._lines += 1
+            self._entries.pop(key, None)
+            self._entries[key] = (created_at, response)
+
+        for key in [key for key, (created_at, _) in self._entries.items() if self._expired(created_at)]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if self._lines > 2 * len(self._entries) + 100:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the cache file with only the live entries."""
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            for key, (created_at, response) in self._entries.items():
+                f.write(json.dumps({"key": key, "created_at": created_at, "response": response}) + "\n")
+        os.replace(temp, self.cache_file)
+        self._lines = len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a stored, unexpired response, or None."""
+        entry = self._entries.get(key)
+        if entry is None or self._expired(entry[0]):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, response: Any):
+        """Store a response, evicting the oldest entries beyond max_entries."""
+        created_at = time.time()
+        self._entries.pop(key, None)
+        self._entries[key] = (created_at, response)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "created_at": created_at, "response": response}) + "\n")
+        self._lines += 1
+        if self._lines > 2 * self.max_entries + 100:
+            self._compact()
+
+    async def fetch(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Answer a request according to the cache mode.
+
+        Args:
+            key: Request key from make_key()
+            call: Coroutine function performing the actual LLM call
+
+        Returns:
+            The cached or freshly generated response
+        """
+        response = self.lookup(key)
+        if response is not None:
+            return response
+
+        response = await call()
+        self.record(key, response)
+        return response
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """
+        The stored response a request should be answered with, if the mode
+        answers from the cache; raises ResponseCacheMiss in replay-only mode.
+        """
+        if self.mode not in ("read-through", "replay-only"):
+            return None
+        response = self.get(key)
+        if response is None and self.mode == "replay-only":
+            raise ResponseCacheMiss(f"No recorded response for request {key[:12]}")
+        return response
+
+    def record(self, key: str, response: Any):
+        """Store a freshly generated response unless the cache is off."""
+        if self.mode != "off":
+            self.put(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,123 @@
+"""
+Semantic Response Cache for AMS-DB
+
+Per-agent cache of answered questions. An incoming question is embedded and
+compared with the agent's earlier questions; if one is similar enough, its
+stored answer is returned without a graph search or LLM call, so paraphrases
+("how do I build a castle" / "castle building tips") share one answer.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from graphiti_core.embedder.client import EmbedderClient
+
+
+class AgentAnswers:
+    """Unit-length question vectors and answers of one agent, oldest first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, question: str, vector: np.ndarray, answer: str):
+        self.questions.append(question)
+        self.answers.append(answer)
+        self._vectors.append(vector)
+        if len(self.answers) > self.max_entries:
+            del self.questions[0], self.answers[0], self._vectors[0]
+        self._matrix = None
+
+    def best_match(self, vector: np.ndarray) -> Tuple[int, float]:
+        """Index and cosine similarity of the closest stored question."""
+        if self._matrix is None:
+            self._matrix = np.stack(self._vectors)
+        similarities = self._matrix @ vector
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+
+class SemanticCache:
+    """
+    Answers keyed by question embeddings, kept in memory per agent.
+
+    Question embeddings from lookup() are remembered briefly, so storing the
+    answer to a question that just missed does not embed it again.
+    """
+
+    def __init__(self, embedder: EmbedderClient, threshold: float = 0.92,
+                 max_entries_per_agent: int = 1000):
+        """
+        Args:
+            embedder: Embedder for questions
+            threshold: Minimum cosine similarity for a stored answer to be reused
+            max_entries_per_agent: Answers kept per agent; the oldest is dropped first
+        """
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries_per_agent = max_entries_per_agent
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._agents: Dict[str, AgentAnswers] = {}
+        self._recent_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    async def _embed(self, question: str) -> np.ndarray:
+        vector = self._recent_vectors.pop(question, None)
+        if vector is None:
+            vector = np.asarray(await self.embedder.create(input_data=[question]), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+        self._recent_vectors[question] = vector
+        if len(self._recent_vectors) > 256:
+            self._recent_vectors.popitem(last=False)
+        return vector
+
+    async def lookup(self, agent_id: str, question: str) -> Optional[str]:
+        """Return the stored answer to a question similar to this one, or None."""
+        answers = self._agents.get(agent_id)
+        if answers is None or not answers.answers:
+            self.misses += 1
+            return None
+
+        best, similarity = answers.best_match(await self._embed(question))
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.logger.debug(f"Semantic cache hit for {agent_id} ({similarity:.3f}): {answers.questions[best]!r}")
+        return answers.answers[best]
+
+    async def store(self, agent_id: str, question: str, answer: str):
+        """Remember the answer an agent gave to a question."""
+        vector = await self._embed(question)
+        answers = self._agents.get(agent_id)
+        if answers is None:
+            answers = self._agents[agent_id] = AgentAnswers(self.max_entries_per_agent)
+        answers.add(question, vector, answer)
+
+    def invalidate(self, agent_id: Optional[str] = None):
+        """Forget the answers of one agent (e.g. after its config changed), or of all agents."""
+        if agent_id is None:
+            self._agents = {}
+        else:
+            self._agents.pop(agent_id, None)
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "agents": len(self._agents),
+            "entries": sum(len(answers.answers) for answers in self._agents.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,67 @@
+"""
+Stage Timing for AMS-DB
+
+Wall-clock timing of the stages of a request (config, retrieval, prompt
+build, LLM, persistence) and running totals across requests, so slow
+responses can be attributed to the stage that caused them.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class StageTimer:
+    """Milliseconds spent in each named stage of one request."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._started = 0.0
+
+    def start(self, name: str):
+        """Start timing a stage, ending the running one."""
+        self.stop()
+        self._stage = name
+        self._started = time.perf_counter()
+
+    def stop(self):
+        """End the running stage, if any."""
+        if self._stage is None:
+            return
+        elapsed = (time.perf_counter() - self._started) * 1000
+        self.timings[self._stage] = self.timings.get(self._stage, 0.0) + elapsed
+        self._stage = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as a stage."""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+
+class StageStats:
+    """Per-stage call counts, total and maximum milliseconds across requests."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, timings: Dict[str, float]):
+        for name, ms in timings.items():
+            entry = self._stages.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "count": entry["count"],
+                "avg_ms": entry["total_ms"] / entry["count"],
+                "max_ms": entry["max_ms"],
+            }
+            for name, entry in self._stages.items()
+        }
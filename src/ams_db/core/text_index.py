@@ -0,0 +1,248 @@
+"""
+Full-Text Index for AMS-DB
+
+Per-agent inverted index over knowledge documents with BM25 ranking. Queries
+are tokenized the same way as documents, so user input is always matched
+literally (never as a regex); double-quoted parts of a query are phrases
+whose words must appear next to each other.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+import polars as pl
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """
+    Split a query into scoring terms and phrases.
+
+    Returns:
+        (terms, phrases): every query token, and the token lists of the
+        double-quoted phrases that documents must contain
+    """
+    phrases = [tokenize(phrase) for phrase in PHRASE_PATTERN.findall(query)]
+    return tokenize(query.replace('"', " ")), [phrase for phrase in phrases if phrase]
+
+
+class AgentTextIndex:
+    """
+    Inverted index over one agent's documents.
+
+    Postings map each term to the documents containing it and the token
+    positions at which it occurs, which is what phrase matching needs.
+    """
+
+    def __init__(self):
+        self.doc_lengths: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: str, title: Optional[str], content: Optional[str]):
+        """Index a document's title and content."""
+        if doc_id in self.doc_lengths:
+            return
+
+        title_tokens = tokenize(title)
+        # Leave a gap after the title so phrases never span title and content
+        tokens = [(position, token) for position, token in enumerate(title_tokens)]
+        offset = len(title_tokens) + 1
+        tokens += [(offset + position, token) for position, token in enumerate(tokenize(content))]
+
+        for position, token in tokens:
+            self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def _has_phrase(self, doc_id: str, phrase: List[str]) -> bool:
+        """Whether a document contains the phrase tokens consecutively."""
+        starts = set(self.postings[phrase[0]][doc_id])
+        for step, token in enumerate(phrase[1:], start=1):
+            positions = self.postings[token].get(doc_id, ())
+            starts &= {position - step for position in positions}
+            if not starts:
+                return False
+        return True
+
+    def search(self, query: str, limit: Optional[int] = None,
+               k1: float = 1.5, b: float = 0.75) -> List[Tuple[str, float]]:
+        """
+        Rank documents against a query with BM25.
+
+        Args:
+            query: Free text; double-quoted parts must match as phrases
+            limit: Return only the top ``limit`` documents
+            k1: BM25 term-frequency saturation
+            b: BM25 document-length normalization
+
+        Returns:
+            (doc_id, score) pairs, best first
+        """
+        terms, phrases = parse_query(query)
+        doc_count = len(self.doc_lengths)
+        if not terms or not doc_count:
+            return []
+
+        candidates: Optional[Set[str]] = None
+        for phrase in phrases:
+            if any(token not in self.postings for token in phrase):
+                return []
+            matching = set(self.postings[phrase[0]])
+            for token in phrase[1:]:
+                matching &= self.postings[token].keys()
+            matching = {doc_id for doc_id in matching if self._has_phrase(doc_id, phrase)}
+            candidates = matching if candidates is None else candidates & matching
+            if not candidates:
+                return []
+
+        average_length = self.total_length / doc_count
+        scores: Dict[str, float] = {}
+        for term in dict.fromkeys(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, positions in postings.items():
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                frequency = len(positions)
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (k1 + 1) / (frequency + norm)
+
+        if limit is not None:
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def to_dict(self) -> Dict:
+        return {"doc_lengths": self.doc_lengths, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AgentTextIndex":
+        index = cls()
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        index.total_length = sum(index.doc_lengths.values())
+        return index
+
+
+class TextIndex:
+    """
+    Persistent collection of per-agent inverted indexes.
+
+    Each agent's index is stored as one JSON file and loaded on first search.
+    A loaded index whose documents no longer match the knowledge base (for
+    example after a crash before it was saved) is rebuilt from the table.
+    Indexes that are not loaded are left alone by inserts, since they are
+    checked when they are next loaded.
+    """
+
+    VERSION = 1
+
+    def __init__(self, index_dir: Path):
+        """
+        Args:
+            index_dir: Directory holding one index file per agent
+        """
+        self.index_dir = Path(index_dir)
+        self.logger = logging.getLogger(__name__)
+        self._agents: Dict[str, AgentTextIndex] = {}
+        self._dirty: Set[str] = set()
+        self.rebuild_count = 0
+
+    def _index_file(self, agent_id: str) -> Path:
+        return self.index_dir / f"{quote(agent_id, safe='')}.json"
+
+    def get(self, agent_id: str, docs: pl.DataFrame) -> AgentTextIndex:
+        """
+        Return an agent's index, loading or rebuilding it if needed.
+
+        Args:
+            agent_id: Agent whose index to return
+            docs: The agent's current documents (kb_id, title and content)
+        """
+        index = self._agents.get(agent_id)
+        if index is not None:
+            return index
+
+        index_file = self._index_file(agent_id)
+        if index_file.exists():
+            try:
+                data = json.loads(index_file.read_text(encoding="utf-8"))
+                if data.get("version") == self.VERSION:
+                    index = AgentTextIndex.from_dict(data)
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Ignoring unreadable text index for {agent_id}: {e}")
+
+        rebuilt = index is None or set(index.doc_lengths) != set(docs.get_column("kb_id").to_list())
+        if rebuilt:
+            index = self._build(agent_id, docs)
+
+        self._agents[agent_id] = index
+        # An index read from disk is unchanged, so only a rebuilt one is written
+        if rebuilt:
+            self.save()
+        return index
+
+    def _build(self, agent_id: str, docs: pl.DataFrame) -> AgentTextIndex:
+        """Build an agent's index from its documents."""
+        index = AgentTextIndex()
+        for kb_id, title, content in docs.select("kb_id", "title", "content").iter_rows():
+            index.add(kb_id, title, content)
+        self._dirty.add(agent_id)
+        self.rebuild_count += 1
+        self.logger.info(f"Built text index for {agent_id} ({len(index.doc_lengths)} documents)")
+        return index
+
+    def rebuild(self, agent_id: str, docs: pl.DataFrame):
+        """Rebuild an agent's index from its documents and save it."""
+        self._agents[agent_id] = self._build(agent_id, docs)
+        self.save()
+
+    def add_documents(self, docs: pl.DataFrame):
+        """Add new documents (agent_id, kb_id, title, content) to loaded indexes."""
+        for agent_id, kb_id, title, content in docs.select(
+            pl.col("agent_id").cast(pl.String), "kb_id", "title", "content"
+        ).iter_rows():
+            index = self._agents.get(agent_id)
+            if index is not None:
+                index.add(kb_id, title, content)
+                self._dirty.add(agent_id)
+
+    def save(self):
+        """Write the indexes that changed since they were last saved."""
+        if not self._dirty:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for agent_id in sorted(self._dirty):
+            index = self._agents.get(agent_id)
+            if index is None:
+                continue
+            target = self._index_file(agent_id)
+            temp = target.with_name(target.name + ".tmp")
+            temp.write_text(
+                json.dumps({"version": self.VERSION, "agent_id": agent_id, **index.to_dict()}),
+                encoding="utf-8"
+            )
+            os.replace(temp, target)
+        self._dirty = set()
+
+    def invalidate(self, agent_ids: Optional[Iterable[str]] = None):
+        """Drop loaded indexes so they are reloaded (and checked) on next use."""
+        for agent_id in list(self._agents) if agent_ids is None else agent_ids:
+            self._agents.pop(agent_id, None)
+            self._dirty.discard(agent_id)
@@ -0,0 +1,450 @@
+"""
+Vector Index for AMS-DB
+
+In-process approximate nearest neighbour search over knowledge document
+embeddings. Vectors are clustered with spherical k-means into inverted lists
+(IVF) and stored contiguously per list, so a query only scores the few lists
+whose centroids are closest to it. Small collections, and agents with few
+documents, are searched exactly.
+"""
+
+import json
+import os
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so inner products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray,
+                      chunk_size: int = 65536) -> np.ndarray:
+    """Index of the most similar centroid for every row, computed in chunks."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def _kmeans(vectors: np.ndarray, list_count: int, iterations: int = 10,
+            seed: int = 0) -> np.ndarray:
+    """Spherical k-means; returns unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), list_count, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest_centroid(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=list_count)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0)
+
+        # Re-seed empty lists with random vectors
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = _normalize(centroids)
+
+    return centroids
+
+
+class VectorIndex:
+    """
+    IVF index over unit-normalized float32 vectors with per-row agent labels.
+
+    The index has a clustered main part, stored as .npy files and memory
+    mapped on load, and an unclustered tail of recent additions that is
+    scanned exactly. The tail is folded into the main part (re-clustering
+    everything) once it grows past ``max(min_tail, tail_fraction * main)``.
+
+    Tail rows and superseded row numbers are kept in append-only files, so
+    saving after an add writes only the new rows. meta.json records how much
+    of each file belongs to the index; anything past that is a torn append
+    and is ignored on load and overwritten by the next save.
+    """
+
+    VERSION = 2
+
+    # Append-only tail files
+    TAIL_VECTORS = "tail_vectors.f32"
+    TAIL_AGENTS = "tail_agents.i32"
+    TAIL_IDS = "tail_ids.jsonl"
+    DELETED_ROWS = "deleted_rows.i64"
+
+    def __init__(self, index_dir: Path, dim: int, nprobe: int = 8,
+                 exact_threshold: int = 20000, min_tail: int = 50000,
+                 tail_fraction: float = 0.2):
+        """
+        Create an empty index (see load() for reading a saved one).
+
+        Args:
+            index_dir: Directory for the index files
+            dim: Vector dimension
+            nprobe: Number of inverted lists scanned per query
+            exact_threshold: Collections (or agents) up to this size are
+                searched exactly instead of through the inverted lists
+            min_tail: Minimum tail size before the index is re-clustered
+            tail_fraction: Tail size, relative to the main part, before the
+                index is re-clustered
+        """
+        self.index_dir = Path(index_dir)
+        self.dim = dim
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.min_tail = min_tail
+        self.tail_fraction = tail_fraction
+        self.logger = logging.getLogger(__name__)
+
+        self.agents: List[str] = []
+        self._agent_codes: Dict[str, int] = {}
+
+        # Clustered part, ordered by inverted list
+        self.main_vectors = np.empty((0, dim), dtype=np.float32)
+        self.main_ids = np.empty(0, dtype="<U1")
+        self.main_agents = np.empty(0, dtype=np.int32)
+        self.centroids: Optional[np.ndarray] = None
+        self.offsets = np.zeros(2, dtype=np.int64)
+
+        # Recent additions, scanned exactly
+        self.tail_vectors = np.empty((0, dim), dtype=np.float32)
+        self.tail_ids: List[str] = []
+        self.tail_agents = np.empty(0, dtype=np.int32)
+
+        # Rows superseded by a newer vector for the same id, as a mask and in
+        # the order they were superseded
+        self.deleted = np.zeros(0, dtype=bool)
+        self._deleted_rows: List[int] = []
+
+        self._rows: Optional[Dict[str, int]] = None
+        self._agent_rows: Dict[int, np.ndarray] = {}
+        self._main_dirty = False
+        self._tail_dirty = False
+
+        # How much of the tail files the saved index covers
+        self._saved_tail = 0
+        self._saved_deleted = 0
+        self._saved_id_bytes = 0
+
+    # Bookkeeping
+    @property
+    def main_count(self) -> int:
+        return len(self.main_ids)
+
+    def __len__(self) -> int:
+        return self.main_count + len(self.tail_ids) - int(self.deleted.sum())
+
+    def _agent_code(self, agent_id: str) -> int:
+        code = self._agent_codes.get(agent_id)
+        if code is None:
+            code = len(self.agents)
+            self.agents.append(agent_id)
+            self._agent_codes[agent_id] = code
+        return code
+
+    def _row_lookup(self) -> Dict[str, int]:
+        """id -> live row number, built on first use."""
+        if self._rows is None:
+            ids = list(self.main_ids.tolist()) + self.tail_ids
+            live = np.flatnonzero(~self.deleted)
+            self._rows = {ids[row]: int(row) for row in live}
+        return self._rows
+
+    def _all_agents(self) -> np.ndarray:
+        return np.concatenate([self.main_agents, self.tail_agents])
+
+    def _id_of(self, row: int) -> str:
+        return str(self.main_ids[row]) if row < self.main_count else self.tail_ids[row - self.main_count]
+
+    def _vectors_of(self, rows: np.ndarray) -> np.ndarray:
+        main = rows[rows < self.main_count]
+        tail = rows[rows >= self.main_count] - self.main_count
+        return np.concatenate([self.main_vectors[main], self.tail_vectors[tail]])
+
+    # Building and updating
+    def build(self, ids: Sequence[str], agent_ids: Sequence[str], vectors: np.ndarray):
+        """Replace the index contents, clustering the vectors into inverted lists."""
+        vectors = _normalize(vectors) if len(ids) else np.empty((0, self.dim), dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        self.agents = []
+        self._agent_codes = {}
+        agents = np.array([self._agent_code(agent_id) for agent_id in agent_ids], dtype=np.int32)
+        ids = np.array(list(ids)) if len(ids) else np.empty(0, dtype="<U1")
+
+        if len(ids) > self.exact_threshold:
+            list_count = int(min(4096, max(16, np.sqrt(len(ids)))))
+            sample_size = min(len(ids), list_count * 64)
+            sample = vectors[np.random.default_rng(0).choice(len(ids), sample_size, replace=False)]
+            self.centroids = _kmeans(sample, list_count)
+            assignments = _nearest_centroid(vectors, self.centroids)
+            order = np.argsort(assignments, kind="stable")
+            vectors, ids, agents = vectors[order], ids[order], agents[order]
+            self.offsets = np.concatenate(
+                ([0], np.cumsum(np.bincount(assignments, minlength=list_count)))
+            ).astype(np.int64)
+        else:
+            self.centroids = None
+            self.offsets = np.array([0, len(ids)], dtype=np.int64)
+
+        self.main_vectors, self.main_ids, self.main_agents = vectors, ids, agents
+        self.tail_vectors = np.empty((0, self.dim), dtype=np.float32)
+        self.tail_ids = []
+        self.tail_agents = np.empty(0, dtype=np.int32)
+        self.deleted = np.zeros(len(ids), dtype=bool)
+        self._deleted_rows = []
+
+        self._rows = None
+        self._agent_rows = {}
+        self._main_dirty = self._tail_dirty = True
+
+    def add(self, ids: Sequence[str], agent_ids: Sequence[str], vectors: np.ndarray):
+        """Add (or replace) vectors; they are searchable immediately."""
+        if not len(ids):
+            return
+        vectors = _normalize(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        rows = self._row_lookup()
+        superseded = [rows.pop(doc_id) for doc_id in ids if doc_id in rows]
+        start = self.main_count + len(self.tail_ids)
+
+        self.tail_vectors = np.concatenate([self.tail_vectors, vectors])
+        self.tail_ids.extend(ids)
+        self.tail_agents = np.concatenate([
+            self.tail_agents,
+            np.array([self._agent_code(agent_id) for agent_id in agent_ids], dtype=np.int32)
+        ])
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(ids), dtype=bool)])
+        self.deleted[superseded] = True
+        self._deleted_rows.extend(superseded)
+        rows.update({doc_id: start + offset for offset, doc_id in enumerate(ids)})
+
+        self._agent_rows = {}
+        self._tail_dirty = True
+
+        if len(self.tail_ids) > max(self.min_tail, self.tail_fraction * self.main_count):
+            self._recluster()
+
+    def _recluster(self):
+        """Fold the tail into the clustered part and drop superseded rows."""
+        live = np.flatnonzero(~self.deleted)
+        agents = self._all_agents()[live]
+        self.build(
+            [self._id_of(row) for row in live],
+            [self.agents[code] for code in agents],
+            self._vectors_of(live),
+        )
+
+    # Searching
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            scores, rows = scores[keep], rows[keep]
+        order = np.argsort(-scores, kind="stable")
+        return [(self._id_of(int(rows[i])), float(scores[i])) for i in order]
+
+    def search(self, queries: np.ndarray, k: int = 5,
+               agent_id: Optional[str] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Find the most similar vectors for a batch of queries.
+
+        Args:
+            queries: (n, dim) array, or a single (dim,) vector
+            k: Results per query
+            agent_id: Only return vectors labelled with this agent
+
+        Returns:
+            For each query, (id, cosine similarity) pairs, best first
+        """
+        queries = _normalize(queries)
+        results: List[List[Tuple[str, float]]] = [[] for _ in range(len(queries))]
+        if agent_id is not None and agent_id not in self._agent_codes:
+            return results
+        code = self._agent_codes.get(agent_id, -1)
+
+        # Exact search when the (agent's) collection is small
+        if agent_id is not None:
+            rows = self._agent_rows.get(code)
+            if rows is None:
+                rows = np.flatnonzero((self._all_agents() == code) & ~self.deleted)
+                self._agent_rows[code] = rows
+            exact_rows = rows if len(rows) <= self.exact_threshold else None
+        else:
+            exact_rows = np.flatnonzero(~self.deleted) if self.centroids is None else None
+
+        if exact_rows is not None:
+            if not len(exact_rows):
+                return results
+            scores = queries @ self._vectors_of(exact_rows).T
+            return [self._top_k(query_scores, exact_rows, k) for query_scores in scores]
+
+        # IVF: score only the nprobe closest lists of every query, grouping
+        # queries by list so each list is multiplied once per batch
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        candidates: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in range(len(queries))]
+
+        for list_id in np.unique(probes):
+            query_ids = np.flatnonzero((probes == list_id).any(axis=1))
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            keep = ~self.deleted[start:end]
+            if agent_id is not None:
+                keep &= self.main_agents[start:end] == code
+            rows = np.arange(start, end)[keep]
+            if not len(rows):
+                continue
+            scores = queries[query_ids] @ self.main_vectors[start:end][keep].T
+            for i, query_id in enumerate(query_ids):
+                candidates[query_id].append((scores[i], rows))
+
+        # The tail is not clustered yet, so it is always scanned
+        if self.tail_ids:
+            keep = ~self.deleted[self.main_count:]
+            if agent_id is not None:
+                keep &= self.tail_agents == code
+            rows = np.flatnonzero(keep) + self.main_count
+            if len(rows):
+                scores = queries @ self.tail_vectors[keep].T
+                for query_id in range(len(queries)):
+                    candidates[query_id].append((scores[query_id], rows))
+
+        for query_id, parts in enumerate(candidates):
+            if parts:
+                results[query_id] = self._top_k(
+                    np.concatenate([scores for scores, _ in parts]),
+                    np.concatenate([rows for _, rows in parts]),
+                    k
+                )
+        return results
+
+    # Persistence
+    def _save_array(self, name: str, array: np.ndarray):
+        target = self.index_dir / f"{name}.npy"
+        temp = self.index_dir / f"{name}.tmp.npy"
+        np.save(temp, array)
+        os.replace(temp, target)
+
+    def _append_file(self, name: str, offset: int, data: bytes):
+        """Write data at a byte offset of a tail file, dropping anything after it."""
+        path = self.index_dir / name
+        with open(path, "r+b" if path.exists() else "w+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+
+    def save(self):
+        """
+        Write changed parts of the index: the clustered part only after a
+        rebuild, otherwise just the tail rows added since the last save.
+        """
+        if not (self._main_dirty or self._tail_dirty):
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        if self._main_dirty:
+            # Without meta.json a half-written index is rebuilt, not misread
+            (self.index_dir / "meta.json").unlink(missing_ok=True)
+            self._save_array("main_vectors", self.main_vectors)
+            self._save_array("main_ids", self.main_ids)
+            self._save_array("main_agents", self.main_agents)
+            self._save_array("offsets", self.offsets)
+            if self.centroids is not None:
+                self._save_array("centroids", self.centroids)
+            self._saved_tail = self._saved_deleted = self._saved_id_bytes = 0
+
+        new_ids = "".join(json.dumps(doc_id) + "\n" for doc_id in self.tail_ids[self._saved_tail:]).encode("utf-8")
+        self._append_file(self.TAIL_VECTORS, self._saved_tail * self.dim * 4,
+                          np.ascontiguousarray(self.tail_vectors[self._saved_tail:], dtype="<f4").tobytes())
+        self._append_file(self.TAIL_AGENTS, self._saved_tail * 4,
+                          self.tail_agents[self._saved_tail:].astype("<i4").tobytes())
+        self._append_file(self.TAIL_IDS, self._saved_id_bytes, new_ids)
+        self._append_file(self.DELETED_ROWS, self._saved_deleted * 8,
+                          np.array(self._deleted_rows[self._saved_deleted:], dtype="<i8").tobytes())
+
+        # Written last: it names the files, and how much of each tail file,
+        # that make up a consistent index
+        meta = {
+            "version": self.VERSION,
+            "dim": self.dim,
+            "agents": self.agents,
+            "main_count": self.main_count,
+            "tail_count": len(self.tail_ids),
+            "tail_id_bytes": self._saved_id_bytes + len(new_ids),
+            "deleted_count": len(self._deleted_rows),
+            "clustered": self.centroids is not None,
+        }
+        temp = self.index_dir / "meta.json.tmp"
+        temp.write_text(json.dumps(meta))
+        os.replace(temp, self.index_dir / "meta.json")
+
+        self._saved_tail = meta["tail_count"]
+        self._saved_deleted = meta["deleted_count"]
+        self._saved_id_bytes = meta["tail_id_bytes"]
+        self._main_dirty = self._tail_dirty = False
+
+    @classmethod
+    def load(cls, index_dir: Path, dim: int, **options) -> Optional["VectorIndex"]:
+        """
+        Open a saved index, memory mapping its clustered part.
+
+        Returns:
+            The index, or None if there is no usable index in ``index_dir``
+        """
+        index_dir = Path(index_dir)
+        index = cls(index_dir, dim, **options)
+        meta_file = index_dir / "meta.json"
+        if not meta_file.exists():
+            return None
+
+        try:
+            meta = json.loads(meta_file.read_text())
+            if meta.get("version") != cls.VERSION or meta.get("dim") != dim:
+                return None
+            tail_count, deleted_count = meta["tail_count"], meta["deleted_count"]
+
+            index.main_vectors = np.load(index_dir / "main_vectors.npy", mmap_mode="r")
+            index.main_ids = np.load(index_dir / "main_ids.npy", mmap_mode="r")
+            index.main_agents = np.load(index_dir / "main_agents.npy")
+            index.offsets = np.load(index_dir / "offsets.npy")
+            index.centroids = np.load(index_dir / "centroids.npy") if meta["clustered"] else None
+            index.tail_vectors = np.fromfile(index_dir / cls.TAIL_VECTORS, dtype="<f4",
+                                             count=tail_count * dim).reshape(-1, dim)
+            index.tail_agents = np.fromfile(index_dir / cls.TAIL_AGENTS, dtype="<i4", count=tail_count)
+            with open(index_dir / cls.TAIL_IDS, "rb") as f:
+                id_lines = f.read(meta["tail_id_bytes"]).decode("utf-8").splitlines()
+            index.tail_ids = [json.loads(line) for line in id_lines]
+            deleted_rows = np.fromfile(index_dir / cls.DELETED_ROWS, dtype="<i8", count=deleted_count)
+        except (OSError, ValueError, KeyError) as e:
+            index.logger.warning(f"Ignoring unreadable vector index in {index_dir}: {e}")
+            return None
+
+        # Tail files shorter than meta.json says were cut short
+        if (index.main_count != meta["main_count"] or len(index.tail_vectors) != tail_count
+                or len(index.tail_agents) != tail_count or len(index.tail_ids) != tail_count
+                or len(deleted_rows) != deleted_count):
+            return None
+
+        index.deleted = np.zeros(index.main_count + tail_count, dtype=bool)
+        index.deleted[deleted_rows] = True
+        index._deleted_rows = deleted_rows.tolist()
+        index._saved_tail, index._saved_deleted = tail_count, deleted_count
+        index._saved_id_bytes = meta["tail_id_bytes"]
+        index.agents = list(meta["agents"])
+        index._agent_codes = {agent_id: code for code, agent_id in enumerate(index.agents)}
+        return index
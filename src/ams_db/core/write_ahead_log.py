@@ -0,0 +1,165 @@
+"""
+Write-Ahead Log for AMS-DB
+
+Append-only log of table inserts and column updates. Each record is written
+as one JSON line, fsync'd in groups, replayed when the database is opened and
+folded into the parquet files by a checkpoint.
+"""
+
+import json
+import os
+import time
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union
+
+
+@dataclass(frozen=True)
+class ColumnUpdate:
+    """
+    Logged update of existing rows: the rows whose ``key`` column holds
+    ``keys[i]`` get ``values[column][i]`` in each updated column.
+    """
+
+    key: str
+    keys: List[Any]
+    values: Dict[str, List[Any]]
+
+
+# A logged row is either an inserted row (a dict) or a ColumnUpdate
+Record = Tuple[str, Union[Dict[str, Any], ColumnUpdate]]
+
+
+def _encode_value(value: Any) -> Any:
+    """JSON fallback encoder that tags datetimes so they survive replay."""
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    """JSON object hook that restores tagged datetimes."""
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+class WriteAheadLog:
+    """
+    Durable, append-only log of inserts and column updates.
+
+    Every record is flushed to the operating system as soon as it is appended,
+    so a crashed process loses nothing. Calls to ``os.fsync`` are grouped: the
+    log is synced after ``sync_every`` records or once ``sync_interval`` seconds
+    have passed since the last sync, whichever comes first.
+    """
+
+    def __init__(self, log_path: Union[str, Path], sync_every: int = 32,
+                 sync_interval: float = 1.0):
+        """
+        Open (or create) a write-ahead log.
+
+        Args:
+            log_path: Path of the log file
+            sync_every: Number of appended records per fsync group
+            sync_interval: Maximum seconds between fsyncs while appending
+        """
+        self.log_path = Path(log_path)
+        self.sync_every = max(1, sync_every)
+        self.sync_interval = sync_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._file = open(self.log_path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.pending_records = 0
+        self.sync_count = 0
+
+    def append(self, table: str, row: Union[Dict[str, Any], ColumnUpdate]):
+        """Append a single insert or update record to the log."""
+        self.append_many([(table, row)])
+
+    def append_many(self, records: List[Record]):
+        """Append several insert or update records with a single write."""
+        if not records:
+            return
+
+        lines = [
+            json.dumps(
+                {"table": table, "update": asdict(row)} if isinstance(row, ColumnUpdate)
+                else {"table": table, "row": row},
+                default=_encode_value, ensure_ascii=False
+            )
+            for table, row in records
+        ]
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+        self.pending_records += len(records)
+        self._unsynced += len(records)
+
+        if (self._unsynced >= self.sync_every or
+                time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """Force all appended records to stable storage."""
+        if self._unsynced == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.sync_count += 1
+
+    def read_records(self) -> List[Record]:
+        """
+        Read every record currently in the log.
+
+        A torn final line (from a crash mid-write) is skipped with a warning.
+
+        Returns:
+            List of (table_name, row or ColumnUpdate) tuples in append order
+        """
+        records = []
+        if not self.log_path.exists():
+            return records
+
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line, object_hook=_decode_object)
+                except json.JSONDecodeError:
+                    self.logger.warning(
+                        f"Skipping unreadable write-ahead log record at line {line_number}"
+                    )
+                    continue
+                if "update" in record:
+                    records.append((record["table"], ColumnUpdate(**record["update"])))
+                else:
+                    records.append((record["table"], record["row"]))
+
+        self.pending_records = len(records)
+        return records
+
+    def truncate(self):
+        """Discard all records once they have been checkpointed."""
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.pending_records = 0
+
+    def close(self):
+        """Sync and close the log file."""
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
@@ -0,0 +1,150 @@
+"""
+Test suite for AMS-DB agent contexts
+"""
+
+import asyncio
+import copy
+import json
+import pytest
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from ams_db.core import GraphitiRAGFramework
+from ams_db.core.agent_context import AgentConfigCache, AgentContext, freeze
+from ams_db.core.graphiti_pipe import agent_group_id
+
+
+class FakeGraphiti:
+    """Returns one fact naming the searched group."""
+
+    async def search(self, query, group_ids=None, num_results=10):
+        await asyncio.sleep(0.01)
+        return [SimpleNamespace(fact=f"fact for {group_ids[0]}")]
+
+    async def close(self):
+        pass
+
+
+class FakeLLM:
+    """Always unavailable, so responses take the stored fallback path."""
+
+    async def generate_response(self, messages, max_tokens=None):
+        await asyncio.sleep(0.01)
+        raise ConnectionError("model unavailable")
+
+
+class TestAgentConfigCache:
+    """Test cases for frozen configs and the config cache."""
+
+    def test_frozen_config(self):
+        """Test that frozen configs refuse changes and still serialize as dicts."""
+        config = freeze({"agent_core": {"prompts": {"llmSystem": "Be wise"}}, "tags": ["a", "b"]})
+        context = AgentContext("wizard", config, "s1")
+
+        with pytest.raises(TypeError):
+            config["agent_core"]["prompts"]["llmSystem"] = "Be silly"
+        with pytest.raises(TypeError):
+            config.update({"tags": []})
+        editable = copy.deepcopy(config)
+        editable["tags"].append("c")
+        assert config["tags"] == ("a", "b")
+        assert json.loads(json.dumps(config)) == {"agent_core": {"prompts": {"llmSystem": "Be wise"}}, "tags": ["a", "b"]}
+        assert context.system_prompt == "Be wise"
+        assert context.with_session("s2").session_id == "s2" and context.session_id == "s1"
+
+    def test_lru_and_invalidation(self):
+        """Test eviction order, invalidation and stale loads."""
+        cache = AgentConfigCache(max_entries=2)
+        cache.put("a", {"n": 1})
+        cache.put("b", {"n": 2})
+        assert cache.get("a") == {"n": 1}
+        cache.put("c", {"n": 3})
+        assert cache.get("b") is None and cache.get("a") is not None
+
+        generation = cache.generation
+        cache.invalidate("a")
+        assert cache.get("a") is None
+        cache.put("a", {"n": "stale"}, generation)
+        assert cache.get("a") is None
+
+        stats = cache.stats()
+        assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 2, 3)
+
+
+class TestAgentContexts:
+    """Test cases for serving several agents from one framework."""
+
+    def setup_method(self):
+        """Set up a framework with fake graph and LLM clients and two agents."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.framework = GraphitiRAGFramework(db_path=self.temp_dir, embedder_backend="local")
+        self.framework.graphiti = FakeGraphiti()
+        self.framework.llm_client = FakeLLM()
+        db = self.framework.db_handler
+        self.wizard = db.add_agent_config({"agent_core": {"prompts": {"llmSystem": "Be wise"}}}, "Wizard")
+        self.miner = db.add_agent_config({"agent_core": {"prompts": {"llmSystem": "Dig"}}}, "Miner")
+
+    def teardown_method(self):
+        """Close the framework and clean up."""
+        asyncio.run(self.framework.close())
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_concurrent_agents_keep_their_sessions(self):
+        """Test that concurrent responses for different agents land in their own sessions."""
+        async def run():
+            await self.framework.load_agent(self.wizard, "loaded")
+            wizard = await self.framework.get_agent_context(self.wizard, "wizard-chat")
+            miner = await self.framework.get_agent_context(self.miner, "miner-chat")
+            await asyncio.gather(*(
+                self.framework.generate_response(context.agent_id, f"question {i}", context=context)
+                for i in range(3) for context in (wizard, miner)
+            ))
+            return miner
+
+        miner = asyncio.run(run())
+        db = self.framework.db_handler
+        assert set(db.get_session_messages("wizard-chat")["agent_id"].to_list()) == {self.wizard}
+        assert set(db.get_session_messages("miner-chat")["agent_id"].to_list()) == {self.miner}
+        assert db.get_session_messages("wizard-chat").height == 6
+        assert self.framework.current_agent_id == self.wizard
+        assert self.framework.current_session_id == "loaded"
+        assert miner.group_ids == (agent_group_id(self.miner),)
+
+    def test_loaded_agent_keeps_its_session(self):
+        """Test that responses without a context record into the loaded agent's session."""
+        async def run():
+            await self.framework.load_agent(self.wizard)
+            for i in range(2):
+                await self.framework.generate_response(self.wizard, f"question {i}")
+            await self.framework.generate_response(self.miner, "question")
+            await self.framework.async_db.flush_writes()
+
+        asyncio.run(run())
+        db = self.framework.db_handler
+        assert db.get_session_messages(self.framework.current_session_id).height == 4
+        assert db.get_conversation_history(self.miner).height == 2
+
+    def test_config_update_refreshes_context(self):
+        """Test that contexts are built from the cache until the config changes."""
+        async def run():
+            first = await self.framework.get_agent_context(self.wizard)
+            second = await self.framework.get_agent_context(self.wizard)
+            await self.framework.async_db.write(
+                self.framework.db_handler.update_agent_config,
+                self.wizard, {"agent_core": {"prompts": {"llmSystem": "Be wiser"}}}
+            )
+            third = await self.framework.get_agent_context(self.wizard)
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        assert first.config is second.config
+        # Requests without a session never share one
+        assert first.session_id != second.session_id
+        assert third.system_prompt == "Be wiser"
+        assert self.framework.get_system_status()["agent_config_cache"]["hits"] == 2
+        assert asyncio.run(self.framework.get_agent_context("missing")) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,78 @@
+"""
+Test suite for the AMS-DB async database façade
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+import time
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.async_db import AsyncDBHandler
+
+
+class TestAsyncDBHandler:
+    """Test cases for running handler calls off the event loop."""
+
+    def setup_method(self):
+        """Set up test database."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = PolarsDBHandler(db_path=self.temp_dir)
+        self.async_db = AsyncDBHandler(self.db)
+
+    def teardown_method(self):
+        """Clean up test database."""
+        self.async_db.close()
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_writes_apply_in_order_and_reads_see_them(self):
+        """Test that queued writes land in submission order."""
+        async def run():
+            for i in range(5):
+                self.async_db.submit_write(self.db.add_conversation_message, "agent", "user", f"message {i}", "s1")
+            await self.async_db.flush_writes()
+            return await self.async_db.read(self.db.get_session_messages, "s1")
+
+        messages = asyncio.run(run())
+        assert messages.get_column("content").to_list() == [f"message {i}" for i in range(5)]
+
+    def test_slow_write_does_not_block_the_loop(self):
+        """Test that the event loop keeps running while a write is in progress."""
+        def slow_write():
+            time.sleep(0.3)
+            return self.db.add_knowledge_document("agent", "Slow", "written slowly")
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            kb_id = await self.async_db.write(slow_write)
+            task.cancel()
+            return kb_id, ticks
+
+        kb_id, ticks = asyncio.run(run())
+        assert ticks >= 10
+        assert self.db.get_knowledge_documents("agent")["kb_id"].to_list() == [kb_id]
+
+    def test_errors_reach_the_caller(self):
+        """Test that exceptions raised in worker threads are re-raised on await."""
+        def failing_write():
+            with self.db.batch():
+                self.db.add_knowledge_document("agent", "Rolled back", "never committed")
+                raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            asyncio.run(self.async_db.write(failing_write))
+        assert self.db.get_knowledge_documents("agent").height == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,69 @@
+"""
+Test suite for the AMS-DB embedders
+"""
+
+import asyncio
+import pytest
+import numpy as np
+
+from ams_db.core.embedders import FallbackEmbedder, LocalHashEmbedder, create_embedder
+
+
+class FailingEmbedder(LocalHashEmbedder):
+    """Embedder standing in for an unreachable model server."""
+
+    async def create(self, input_data):
+        raise ConnectionError("model server is down")
+
+    async def create_batch(self, input_data_list):
+        raise ConnectionError("model server is down")
+
+
+class TestEmbedders:
+    """Test cases for the local and fallback embedders."""
+
+    def test_local_embeddings_are_deterministic(self):
+        """Test vector shape, normalization and repeatability across instances."""
+        texts = ["Polars dataframe library", "polars data frames", "cooking pasta", ""]
+        vectors = LocalHashEmbedder(64).embed(texts)
+
+        assert vectors.shape == (4, 64) and vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0, atol=1e-5)
+        assert not vectors[3].any()
+        assert np.array_equal(vectors, LocalHashEmbedder(64, batch_size=1).embed(texts))
+
+        # Texts sharing n-grams are closer than unrelated ones
+        similarity = vectors @ vectors.T
+        assert similarity[0, 1] > similarity[0, 2]
+
+    def test_embedder_client_interface(self):
+        """Test the async create/create_batch methods used by Graphiti."""
+        embedder = LocalHashEmbedder(32)
+        single = asyncio.run(embedder.create(input_data=["first text", "ignored"]))
+        batch = asyncio.run(embedder.create_batch(["first text", "second text"]))
+
+        assert len(single) == 32
+        assert single == batch[0]
+        assert asyncio.run(embedder.create(input_data="first text")) == single
+        with pytest.raises(TypeError):
+            asyncio.run(embedder.create(input_data=[1, 2, 3]))
+
+    def test_fallback_embedder(self):
+        """Test that the fallback answers when the primary fails."""
+        local = LocalHashEmbedder(32)
+        embedder = FallbackEmbedder(FailingEmbedder(32), local)
+
+        assert asyncio.run(embedder.create(input_data="text")) == asyncio.run(local.create(input_data="text"))
+        assert len(asyncio.run(embedder.create_batch(["a", "b"]))) == 2
+        assert embedder.fallback_count == 2
+
+    def test_create_embedder(self):
+        """Test backend selection."""
+        assert isinstance(create_embedder("local", embedding_dim=16), LocalHashEmbedder)
+        assert isinstance(create_embedder("fallback", embedding_dim=16), FallbackEmbedder)
+        with pytest.raises(ValueError):
+            create_embedder("unknown")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
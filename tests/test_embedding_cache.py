@@ -0,0 +1,104 @@
+"""
+Test suite for the AMS-DB embedding cache
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+import numpy as np
+
+from ams_db.core.embedders import (
+    CachedEmbedder, FallbackEmbedder, LocalHashEmbedder, create_embedder, find_embedding_cache
+)
+from ams_db.core.embedding_cache import EmbeddingCache
+
+
+class CountingEmbedder(LocalHashEmbedder):
+    """Local embedder that counts the texts it actually embeds."""
+
+    def __init__(self, embedding_dim: int):
+        super().__init__(embedding_dim)
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+class TestEmbeddingCache:
+    """Test cases for the content-addressed embedding cache."""
+
+    def setup_method(self):
+        """Set up cache directory."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Clean up cache directory."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_repeated_texts_are_not_recomputed(self):
+        """Test that hits are served from the cache, also after reopening it."""
+        inner = CountingEmbedder(8)
+        cache = EmbeddingCache(self.temp_dir, "model", 8)
+        embedder = CachedEmbedder(inner, cache)
+
+        first = asyncio.run(embedder.create(input_data=["hello world"]))
+        batch = asyncio.run(embedder.create_batch(["hello world", "other text", "other text"]))
+        assert inner.embedded == 2
+        assert batch[0] == pytest.approx(first)
+        assert cache.stats()["hits"] == 1
+        cache.close()
+
+        reopened = EmbeddingCache(self.temp_dir, "model", 8)
+        embedder = CachedEmbedder(inner, reopened)
+        assert asyncio.run(embedder.create(input_data="other text")) == pytest.approx(batch[1])
+        assert inner.embedded == 2
+        assert reopened.stats()["hits"] == 1 and len(reopened) == 2
+        reopened.close()
+
+    def test_keys_include_model_and_dimension(self):
+        """Test that other models and dimensions do not share entries."""
+        cache = EmbeddingCache(self.temp_dir, "model", 4)
+        cache.put("text", np.ones(4))
+        assert EmbeddingCache(self.temp_dir, "other-model", 4).get("text") is None
+        assert EmbeddingCache(self.temp_dir, "model", 8).get("text") is None
+        assert cache.get("text").tolist() == [1.0] * 4
+
+    def test_wrong_dimension_is_rejected(self):
+        """Test that vectors of another length are refused rather than truncated or padded."""
+        cache = EmbeddingCache(self.temp_dir, "model", 4)
+        for vector in (np.ones(8), np.ones(2)):
+            with pytest.raises(ValueError):
+                cache.put("text", vector)
+        assert cache.get("text") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted, also after reopening."""
+        cache = EmbeddingCache(self.temp_dir, "model", 2, max_entries=2)
+        cache.put("a", [1, 0])
+        cache.put("b", [0, 1])
+        cache.get("a")
+        cache.put("c", [1, 1])
+        assert cache.get("b") is None
+        assert cache.get("a").tolist() == [1, 0]
+        assert cache.stats()["evictions"] == 1
+        cache.close()
+
+        reopened = EmbeddingCache(self.temp_dir, "model", 2, max_entries=2)
+        assert reopened.get("b") is None
+        assert reopened.get("c").tolist() == [1, 1]
+        assert reopened.get("a").tolist() == [1, 0]
+        reopened.close()
+
+    def test_create_embedder_caches_main_embedder(self):
+        """Test that the fallback embedder is left out of the cache."""
+        embedder = create_embedder("fallback", embedding_dim=8, cache_dir=self.temp_dir)
+        assert isinstance(embedder, FallbackEmbedder)
+        assert find_embedding_cache(embedder).model == "nomic-embed-text"
+        assert find_embedding_cache(create_embedder("local", embedding_dim=8)) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+"""
+Test suite for the AMS-DB framework registry
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+
+from ams_db.core import PolarsDBHandler, close_all, get_framework
+
+
+class TestFrameworkRegistry:
+    """Test cases for sharing framework instances."""
+
+    def setup_method(self):
+        """Set up a database directory (Neo4j is connected to lazily, so none is needed)."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Close shared frameworks and clean up."""
+        asyncio.run(close_all())
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_frameworks_are_shared_per_settings(self):
+        """Test that equal settings return one instance sharing the caller's handler."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        framework = get_framework(db_handler=db, embedder_backend="local")
+
+        assert framework.db_handler is db
+        assert get_framework(db_path=self.temp_dir, embedder_backend="local") is framework
+        assert get_framework(db_handler=db, embedder_backend="local", llm_model="other") is not framework
+
+        # The LLM and embedding clients share one HTTP client
+        assert framework.llm_client.client is framework.openai_client
+
+    def test_one_handler_per_path(self):
+        """Test that frameworks on one path share a handler, and a second handler gets its own framework."""
+        framework = get_framework(db_path=self.temp_dir, embedder_backend="local")
+        other = get_framework(db_path=self.temp_dir + "/", embedder_backend="local", llm_model="other")
+
+        assert other is not framework
+        assert other.db_handler is framework.db_handler
+        assert other.async_db._lock is framework.async_db._lock
+
+        second_handler = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        bound = get_framework(db_handler=second_handler, embedder_backend="local")
+        assert bound is not framework and bound.db_handler is second_handler
+
+    def test_close(self):
+        """Test that closing leaves a passed-in handler open and drops the instance."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        framework = get_framework(db_handler=db, embedder_backend="local")
+        asyncio.run(close_all())
+
+        assert framework.closed
+        db.add_knowledge_document("agent", "Still open", "the handler is usable")
+        assert get_framework(db_handler=db, embedder_backend="local") is not framework
+        db.close()
+
+    def test_close_unregisters_cache_listeners(self):
+        """Test that a closed framework's semantic cache is no longer called by a shared handler."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        for _ in range(2):
+            framework = get_framework(db_handler=db, embedder_backend="local", semantic_cache_threshold=0.9)
+            assert len(db._config_listeners) == len(db._knowledge_listeners) == 1
+            asyncio.run(close_all())
+
+        assert db._config_listeners == [] and db._knowledge_listeners == []
+        db.add_knowledge_document("agent", "After close", "no listener runs")
+        assert framework.semantic_cache.invalidations == 0
+        db.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
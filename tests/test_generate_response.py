@@ -0,0 +1,158 @@
+"""
+Test suite for the AMS-DB response pipeline
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from ams_db.core import GraphitiRAGFramework
+from ams_db.core.graphiti_pipe import agent_group_id
+
+
+class FakeGraphiti:
+    """Counts searches and returns fixed facts."""
+
+    def __init__(self):
+        self.searches = 0
+        self.group_ids = None
+
+    async def search(self, query, group_ids=None, num_results=10):
+        self.searches += 1
+        self.group_ids = group_ids
+        return [SimpleNamespace(fact=f"fact {i}") for i in range(num_results)]
+
+    async def close(self):
+        pass
+
+
+class FakeLLM:
+    """Records the messages it was asked to answer."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def generate_response(self, messages, max_tokens=None):
+        self.messages.append(messages)
+        return {"content": "A detailed answer from the fake model."}
+
+
+class FakeStreamingClient:
+    """Streams a fixed answer word by word, or fails before the first chunk."""
+
+    def __init__(self, words, fail=False):
+        self.words = words
+        self.fail = fail
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.requests.append(request)
+        if self.fail:
+            raise ConnectionError("model unavailable")
+        return self._stream()
+
+    async def _stream(self):
+        for word in self.words:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+    async def close(self):
+        pass
+
+
+class TestGenerateResponse:
+    """Test cases for one retrieval pass and stage timings per response."""
+
+    def setup_method(self):
+        """Set up a framework with fake graph and LLM clients."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.framework = GraphitiRAGFramework(db_path=self.temp_dir, embedder_backend="local")
+        self.framework.graphiti = FakeGraphiti()
+        self.framework.llm_client = FakeLLM()
+        self.agent_id = self.framework.db_handler.add_agent_config({"agent_core": {}}, "Wizard")
+
+    def teardown_method(self):
+        """Close the framework and clean up."""
+        asyncio.run(self.framework.close())
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_single_search_and_config_read(self):
+        """Test that a response searches the graph once and the config is read only on a cache miss."""
+        db = self.framework.db_handler
+        config_reads = []
+        load_agent_config = db.load_agent_config
+        db.load_agent_config = lambda agent_id: config_reads.append(agent_id) or load_agent_config(agent_id)
+
+        response = asyncio.run(self.framework.generate_response(self.agent_id, "Tell me about castles"))
+
+        assert response == "A detailed answer from the fake model."
+        assert self.framework.graphiti.searches == 1
+        assert self.framework.graphiti.group_ids == [agent_group_id(self.agent_id)]
+        assert config_reads == [self.agent_id]
+        assert self.framework.current_agent_id is None
+
+        asyncio.run(self.framework.generate_response(self.agent_id, "And dragons?", check_semantic_cache=False))
+        assert config_reads == [self.agent_id]
+
+        system_prompt = self.framework.llm_client.messages[0][0].content
+        assert "- fact 2" in system_prompt and "- fact 3" not in system_prompt
+
+    def test_agent_group_ids(self):
+        """Test that group IDs are valid for Graphiti, distinct per agent, and include shared groups."""
+        assert agent_group_id("wizard_1") == "agent_wizard_1"
+        assert agent_group_id("my agent").startswith("agent_my_agent-")
+        assert agent_group_id("my agent") != agent_group_id("my_agent")
+        assert agent_group_id("my agent") != agent_group_id("my.agent")
+
+        self.framework.shared_group_ids = ["world"]
+        assert self.framework.graph_group_ids("wizard_1") == ["agent_wizard_1", "world"]
+
+    def test_stage_timings(self):
+        """Test that each stage is timed and totals reach the system status."""
+        asyncio.run(self.framework.generate_response(self.agent_id, "Tell me about castles"))
+
+        timings = self.framework.last_response_timings
+        assert {"config", "retrieval", "prompt_build", "llm"} <= set(timings)
+        assert all(ms >= 0 for ms in timings.values())
+
+        asyncio.run(self.framework.generate_response(self.agent_id, "And dragons?"))
+        latency = self.framework.get_system_status()["response_latency_ms"]
+        assert latency["retrieval"]["count"] == 2
+
+    def _stream(self, **kwargs):
+        async def run():
+            return [chunk async for chunk in self.framework.stream_response(self.agent_id, "Tell me about castles", **kwargs)]
+        return asyncio.run(run())
+
+    def test_stream_response(self):
+        """Test that chunks are yielded as generated and the turn is stored once complete."""
+        self.framework.openai_client = FakeStreamingClient(["Castles ", "have ", "towers."])
+
+        chunks = self._stream(session_id="stream-session")
+
+        assert chunks == ["Castles ", "have ", "towers."]
+        request = self.framework.openai_client.requests[0]
+        assert request["stream"] is True and "- fact 2" in request["messages"][0]["content"]
+        messages = self.framework.db_handler.get_session_messages("stream-session")
+        assert messages["content"].to_list() == ["Tell me about castles", "Castles have towers."]
+        assert {"config", "retrieval", "llm_first_chunk", "llm_stream", "persistence"} <= set(
+            self.framework.last_response_timings
+        )
+
+        assert self._stream(session_id="other", persist=False) == ["Castles ", "have ", "towers."]
+        assert self.framework.db_handler.get_session_messages("other").height == 0
+
+    def test_stream_response_fallback(self):
+        """Test that a model failing before its first chunk streams the personality fallback."""
+        self.framework.openai_client = FakeStreamingClient([], fail=True)
+
+        chunks = self._stream(session_id="fallback-session")
+
+        assert len(chunks) == 1 and "Tell me about castles" in chunks[0]
+        assert self.framework.db_handler.get_session_messages("fallback-session").height == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
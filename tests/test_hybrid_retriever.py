@@ -0,0 +1,94 @@
+"""
+Test suite for the AMS-DB hybrid retriever
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.async_db import AsyncDBHandler
+from ams_db.core.embedders import LocalHashEmbedder
+from ams_db.core.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+class FakeGraphiti:
+    """Returns fixed facts after an optional delay."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def search(self, query, group_ids=None, num_results=10):
+        await asyncio.sleep(self.delay)
+        return [SimpleNamespace(uuid="edge-1", fact="Castles are built from stone")]
+
+
+class TestReciprocalRankFusion:
+    """Test cases for merging rankings."""
+
+    def test_items_ranked_by_several_sources_win(self):
+        """Test that agreement between sources outranks a single first place."""
+        fused = reciprocal_rank_fusion({"a": ["x", "y"], "b": ["z", "y"], "c": ["y"]}, k=60)
+        assert fused[0][0] == "y"
+        assert fused[0][1] == pytest.approx(2 / 62 + 1 / 61)
+
+        weighted = reciprocal_rank_fusion({"a": ["x"], "b": ["z"]}, weights={"b": 2.0})
+        assert [item_id for item_id, _ in weighted] == ["z", "x"]
+
+
+class TestHybridRetriever:
+    """Test cases for concurrent retrieval under latency budgets."""
+
+    def setup_method(self):
+        """Set up a knowledge base with embedded documents."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = PolarsDBHandler(db_path=self.temp_dir, embedding_dim=64)
+        self.embedder = LocalHashEmbedder(64)
+        documents = [
+            ("Castle building", "How to build a stone castle with towers"),
+            ("Farming", "Growing wheat and carrots near water"),
+            ("Mining", "Finding diamonds deep underground"),
+        ]
+        vectors = self.embedder.embed([f"{title}\n{content}" for title, content in documents])
+        self.kb_ids = [
+            self.db.add_knowledge_document("agent", title, content, embedding=vector)
+            for (title, content), vector in zip(documents, vectors)
+        ]
+        self.async_db = AsyncDBHandler(self.db)
+
+    def teardown_method(self):
+        """Clean up database directory."""
+        self.async_db.close()
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_sources_are_fused(self):
+        """Test that documents and facts from all sources share one ranking."""
+        retriever = HybridRetriever(self.async_db, self.embedder, FakeGraphiti())
+        retrieved = asyncio.run(retriever.retrieve("agent", "stone castle", limit=2))
+
+        assert retrieved["status"] == {"lexical": "ok", "vector": "ok", "graph": "ok"}
+        top = retrieved["results"][0]
+        assert top["type"] == "document" and top["id"] == self.kb_ids[0]
+        assert set(top["sources"]) == {"lexical", "vector"}
+        assert "fact" in [result["type"] for result in retrieved["results"]]
+        assert "embedding" not in retrieved["by_source"]["lexical"][0]
+
+    def test_slow_source_is_skipped(self):
+        """Test that a source over its budget is dropped without delaying the rest."""
+        retriever = HybridRetriever(self.async_db, self.embedder, FakeGraphiti(delay=5.0), budgets={"graph": 0.1})
+
+        started = time.perf_counter()
+        retrieved = asyncio.run(retriever.retrieve("agent", "stone castle"))
+
+        assert time.perf_counter() - started < 2.0
+        assert retrieved["status"]["graph"] == "timeout"
+        assert retrieved["results"][0]["id"] == self.kb_ids[0]
+        assert retriever.stats()["timeouts"]["graph"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,88 @@
+"""
+Test suite for AMS-DB hash indexes
+"""
+
+import pytest
+import tempfile
+
+import polars as pl
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.indexes import HashIndex
+
+
+class TestHashIndex:
+    """Test cases for HashIndex and its use in PolarsDBHandler."""
+
+    def setup_method(self):
+        """Set up test database."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = PolarsDBHandler(db_path=self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up test database."""
+        import shutil
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lookup_and_append(self):
+        """Test lookups on unique and duplicate keys, including after appends."""
+        table = pl.DataFrame({"key": ["a", "b", "a"], "value": [1, 2, 3]})
+        index = HashIndex("key")
+        assert index.lookup(table, "a") == [0, 2]
+        assert index.lookup(table, "b") == [1]
+        assert index.lookup(table, "missing") == []
+
+        rows = pl.DataFrame({"key": ["b", "c"], "value": [4, 5]})
+        extended = pl.concat([table, rows])
+        index.append(table, extended, rows)
+        assert index.lookup(extended, "b") == [1, 3]
+        assert index.lookup(extended, "c") == [4]
+        assert index.build_count == 1
+
+    def test_composite_key(self):
+        """Test an index over several columns."""
+        table = pl.DataFrame({"agent": ["x", "x", "y"], "session": ["s1", "s2", "s1"]})
+        index = HashIndex(["agent", "session"])
+        assert index.lookup(table, ("x", "s2")) == [1]
+        assert index.lookup(table, ("y", "s1")) == [2]
+
+    def test_stale_index_is_rebuilt(self):
+        """Test that replacing the table (e.g. a delete) triggers a rebuild."""
+        table = pl.DataFrame({"key": ["a", "b", "c"]})
+        index = HashIndex("key")
+        index.lookup(table, "a")
+
+        filtered = table.filter(pl.col("key") != "a")
+        assert index.lookup(filtered, "c") == [1]
+        assert index.build_count == 2
+
+    def test_handler_keeps_indexes_current(self):
+        """Test that inserts, updates and deletes go through the handler's indexes."""
+        agent_id = self.db.add_agent_config({"agent_id": "indexed"}, "Indexed")
+        for i in range(3):
+            self.db.add_conversation_message(agent_id, "user", f"msg {i}", "s1")
+        assert self.db.get_conversation_history(agent_id, "s1").height == 3
+
+        self.db.add_conversation_message(agent_id, "user", "new", "s2")
+        self.db.add_conversation_message("other", "user", "shared", "s2")
+        assert self.db.get_session_messages("s2")["content"].to_list() == ["new", "shared"]
+        assert self.db.get_conversation_history(agent_id).height == 4
+
+        session_index = self.db._indexes["conversations"]["session_id"]
+        assert session_index.build_count == 1
+
+        self.db.update_agent_config(agent_id, {"agent_id": agent_id, "v": 2})
+        assert self.db.get_agent_config(agent_id) == {"agent_id": agent_id, "v": 2}
+
+        kb_id = self.db.add_knowledge_document(agent_id, "Doc", "content")
+        self.db.update_embedding_status(kb_id, "completed")
+        assert self.db.get_knowledge_documents(agent_id)["embedding_status"].to_list() == ["completed"]
+
+        self.db.clear_conversation_history(agent_id, "s1")
+        assert self.db.get_conversation_history(agent_id, "s1").height == 0
+        assert self.db.get_session_messages("s2").height == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
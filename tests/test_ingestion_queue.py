@@ -0,0 +1,192 @@
+"""
+Test suite for the AMS-DB graph ingestion queue
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+
+from ams_db.core import GraphitiRAGFramework
+from ams_db.core.graphiti_pipe import agent_group_id
+from ams_db.core.ingestion_queue import IngestionQueue
+
+
+class FakeGraphiti:
+    """Records bulk ingestion calls, each held until ``gate`` (if set) opens."""
+
+    def __init__(self):
+        self.bulk_calls = []
+        self.group_ids = []
+        self.gate = None
+
+    async def add_episode_bulk(self, bulk_episodes, group_id=None):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.bulk_calls.append([episode.name for episode in bulk_episodes])
+        self.group_ids.append(group_id)
+
+    async def close(self):
+        pass
+
+
+class TestIngestionQueue:
+    """Test cases for batching, ordering, retries and durability."""
+
+    def setup_method(self):
+        """Set up the journal directory and a recording ingest function."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.calls = []
+        self.statuses = []
+        self.failures_left = 0
+        self.running = 0
+        self.max_running = 0
+
+    def teardown_method(self):
+        """Clean up the journal directory."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def _ingest(self, agent_id, episodes):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures_left:
+                self.failures_left -= 1
+                raise ConnectionError("graph unavailable")
+            self.calls.append((agent_id, [episode["name"] for episode in episodes]))
+        finally:
+            self.running -= 1
+
+    def _queue(self, **kwargs) -> IngestionQueue:
+        kwargs.setdefault("retry_base_delay", 0.01)
+        return IngestionQueue(self.temp_dir, self._ingest,
+                              on_status=lambda episodes, status: self.statuses.append((len(episodes), status)),
+                              **kwargs)
+
+    def test_batches_keep_agent_order(self):
+        """Test that episodes are batched per agent, in order, with bounded concurrency."""
+        async def run():
+            queue = self._queue(batch_size=2, max_concurrency=2)
+            for agent_id in ("a", "b", "c"):
+                for i in range(3):
+                    queue.enqueue(agent_id, f"{agent_id}{i}", "body", "test")
+            assert await queue.drain(timeout=5)
+            await queue.close()
+            return queue
+
+        queue = asyncio.run(run())
+        for agent_id in ("a", "b", "c"):
+            assert [names for agent, names in self.calls if agent == agent_id] == [
+                [f"{agent_id}0", f"{agent_id}1"], [f"{agent_id}2"]
+            ]
+        assert self.max_running <= 2
+        assert queue.stats()["processed"] == 9 and len(queue) == 0
+        assert self.statuses.count((1, "queued")) == 9
+
+    def test_retry_with_backoff(self):
+        """Test that failed batches are retried, then marked failed."""
+        async def run(failures, max_attempts):
+            self.failures_left = failures
+            queue = self._queue(max_attempts=max_attempts)
+            queue.enqueue("a", "episode", "body", "test")
+            await queue.drain(timeout=5)
+            await queue.close()
+            return queue.stats()
+
+        stats = asyncio.run(run(failures=2, max_attempts=3))
+        assert (stats["processed"], stats["retries"]) == (1, 2)
+
+        stats = asyncio.run(run(failures=5, max_attempts=2))
+        assert (stats["processed"], stats["failed"]) == (0, 1)
+        assert self.statuses[-1] == (1, "failed")
+
+    def test_queue_survives_restart(self):
+        """Test that episodes queued without a running worker are ingested after reopening."""
+        queue = self._queue()
+        queue.enqueue("a", "first", "body", "test")
+        queue.enqueue("a", "second", "body", "test")
+        asyncio.run(queue.close())
+
+        async def resume():
+            reopened = self._queue()
+            assert len(reopened) == 2
+            assert await reopened.drain(timeout=5)
+            await reopened.close()
+
+        asyncio.run(resume())
+        assert self.calls == [("a", ["first", "second"])]
+        assert len(self._queue()) == 0
+
+    def test_enqueue_from_threads(self):
+        """Test that episodes queued from other threads while batches finish are all ingested once."""
+        async def run():
+            queue = self._queue(batch_size=50)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[
+                loop.run_in_executor(None, lambda agent_id=agent_id: [
+                    queue.enqueue(agent_id, f"{agent_id}{i}", "body", "test") for i in range(300)
+                ])
+                for agent_id in ("a", "b", "c", "d")
+            ])
+            assert await queue.drain(timeout=10)
+            await queue.close()
+            return queue
+
+        queue = asyncio.run(run())
+        assert queue.stats()["processed"] == 1200
+        for agent_id in ("a", "b", "c", "d"):
+            names = [name for agent, batch in self.calls if agent == agent_id for name in batch]
+            assert names == [f"{agent_id}{i}" for i in range(300)]
+        assert len(self._queue()) == 0
+
+    def test_close_drains(self):
+        """Test that close() finishes queued episodes within its timeout."""
+        async def run():
+            queue = self._queue()
+            queue.enqueue("a", "episode", "body", "test")
+            await queue.close(drain_timeout=5)
+            return queue
+
+        queue = asyncio.run(run())
+        assert self.calls == [("a", ["episode"])]
+        assert len(queue) == 0
+
+    def test_drain_closed_queue(self):
+        """Test that draining a closed queue whose worker never started returns at once."""
+        queue = self._queue()
+        queue.enqueue("a", "episode", "body", "test")
+        asyncio.run(queue.close())
+
+        assert asyncio.run(queue.drain(timeout=5)) is False
+        assert len(self._queue()) == 1
+
+    def test_knowledge_status_follows_queue(self):
+        """Test that a knowledge document's embedding_status tracks its ingestion."""
+        async def run():
+            framework = GraphitiRAGFramework(db_path=self.temp_dir, embedder_backend="local")
+            framework.graphiti = FakeGraphiti()
+            framework.graphiti.gate = asyncio.Event()
+            agent_id = framework.db_handler.add_agent_config({"agent_core": {}}, "Wizard")
+            await framework.load_agent(agent_id)
+
+            await framework.add_knowledge_with_embedding("Castles", "Stone castles have towers")
+            await framework.async_db.flush_writes()
+            statuses = [framework.db_handler.get_knowledge_documents(agent_id)["embedding_status"][0]]
+            framework.graphiti.gate.set()
+            await framework.wait_for_ingestion(timeout=5)
+            await framework.async_db.flush_writes()
+            statuses.append(framework.db_handler.get_knowledge_documents(agent_id)["embedding_status"][0])
+
+            graphiti = framework.graphiti
+            await framework.close()
+            return agent_id, statuses, graphiti
+
+        agent_id, statuses, graphiti = asyncio.run(run())
+        assert statuses[0] in ("queued", "processing") and statuses[1] == "processed"
+        assert graphiti.bulk_calls == [["Castles"]]
+        assert graphiti.group_ids == [agent_group_id(agent_id)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
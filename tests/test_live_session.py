@@ -0,0 +1,109 @@
+"""
+Test suite for AMS-DB live chat sessions
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from ams_db.core import GraphitiRAGFramework
+from ams_db.core.live_session import LiveSession
+
+
+class FakeGraphiti:
+    """Counts searches and returns one fact."""
+
+    def __init__(self):
+        self.searches = 0
+
+    async def search(self, query, group_ids=None, num_results=10):
+        self.searches += 1
+        return [SimpleNamespace(fact="castles have towers")]
+
+    async def close(self):
+        pass
+
+
+class FakeStreamingClient:
+    """Streams a numbered answer in two chunks and records the prompts."""
+
+    def __init__(self):
+        self.system_prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **request):
+        self.system_prompts.append(messages[0]["content"])
+        return self._stream(len(self.system_prompts))
+
+    async def _stream(self, number):
+        for text in (f"Answer {number}", " from the tower."):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    async def close(self):
+        pass
+
+
+class TestLiveSession:
+    """Test cases for connection-bound chat sessions."""
+
+    def setup_method(self):
+        """Set up a framework with fake clients and an agent with an earlier session."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.framework = GraphitiRAGFramework(db_path=self.temp_dir, embedder_backend="local")
+        self.framework.graphiti = FakeGraphiti()
+        self.framework.openai_client = FakeStreamingClient()
+        self.db = self.framework.db_handler
+        self.agent_id = self.db.add_agent_config({"prompt_config": {"primeDirective": "Guard"}}, "Guard")
+        self.db.add_conversation_message(self.agent_id, "user", "Who goes there?", "s1")
+
+    def teardown_method(self):
+        """Close the framework and clean up."""
+        asyncio.run(self.framework.close())
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_messages_reuse_loaded_state(self):
+        """Test that the window is kept in memory and each message only retrieves and generates."""
+        async def run():
+            session = await LiveSession.open(self.framework, self.agent_id, "s1")
+            history_reads = []
+            get_session_messages = self.db.get_session_messages
+            self.db.get_session_messages = lambda *args: history_reads.append(args) or get_session_messages(*args)
+
+            replies = []
+            for message in ("Open the gate", "Why not?"):
+                replies.append([chunk async for chunk in session.send(message)])
+            return session, history_reads, replies
+
+        session, history_reads, replies = asyncio.run(run())
+        assert replies == [["Answer 1", " from the tower."], ["Answer 2", " from the tower."]]
+        assert history_reads == []
+        assert self.framework.graphiti.searches == 2
+
+        prompts = self.framework.openai_client.system_prompts
+        assert "human: Who goes there?" in prompts[0]
+        assert "human: Open the gate" in prompts[1] and f"{self.agent_id}: Answer 1 from the tower." in prompts[1]
+        assert self.db.get_session_messages("s1")["content"].to_list()[-2:] == ["Why not?", "Answer 2 from the tower."]
+        assert session.messages_sent == 2
+
+    def test_config_change_refreshes_context(self):
+        """Test that an agent updated mid-connection is picked up without reloading otherwise."""
+        async def run():
+            session = await LiveSession.open(self.framework, self.agent_id, "s1")
+            first = await session._current_context()
+            assert await session._current_context() is first
+            self.db.update_agent_config(self.agent_id, {"prompt_config": {"primeDirective": "Sleep"}})
+            return first, await session._current_context()
+
+        first, refreshed = asyncio.run(run())
+        assert first.personality == "Guard"
+        assert refreshed.personality == "Sleep" and refreshed.session_id == "s1"
+
+    def test_unknown_agent(self):
+        """Test that no session opens for an unknown agent."""
+        assert asyncio.run(LiveSession.open(self.framework, "missing")) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
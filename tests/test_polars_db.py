@@ -5,9 +5,13 @@ Test suite for AMS-DB Polars Database Handler
 import pytest
 import json
 import tempfile
+from datetime import datetime
 from pathlib import Path
 
-from ams_db.core import PolarsDBHandler
+import polars as pl
+
+from ams_db.core import ConversationModes, PolarsDBHandler
+from ams_db.core.polars_db import json_field
 
 
 class TestPolarsDBHandler:
@@ -102,6 +106,33 @@ class TestPolarsDBHandler:
         all_agents = self.db.list_agents(active_only=False)
         assert all_agents.height == 0
     
+    def test_agent_config_cache(self):
+        """Test that parsed configs are cached, returned as editable copies and refreshed on writes."""
+        agent_id = self.db.add_agent_config({"agent_id": "cached", "tools": ["search"]})
+        
+        first = self.db.get_agent_config(agent_id)
+        assert first["tools"] == ["search"]
+        first["tools"].append("edited")
+        first["name"] = "edited"
+        assert self.db.get_agent_config(agent_id) == {"agent_id": "cached", "tools": ["search"]}
+        with pytest.raises(TypeError):
+            self.db.load_agent_config(agent_id)["tools"] = []
+        
+        self.db.update_agent_config(agent_id, {"agent_id": "cached", "tools": []})
+        assert self.db.get_agent_config(agent_id)["tools"] == []
+        
+        with pytest.raises(RuntimeError):
+            with self.db.batch():
+                self.db.update_agent_config(agent_id, {"agent_id": "cached", "tools": ["rolled back"]})
+                raise RuntimeError("boom")
+        assert self.db.get_agent_config(agent_id)["tools"] == []
+        
+        self.db.delete_agent(agent_id, soft_delete=False)
+        assert self.db.get_agent_config(agent_id) is None
+        
+        stats = self.db.get_database_stats()["agent_config_cache"]
+        assert stats["hits"] == 2 and stats["misses"] == 3
+    
     def test_conversation_operations(self):
         """Test conversation management."""
         agent_id = "conv_test"
@@ -224,6 +255,344 @@ class TestPolarsDBHandler:
         assert stats["agent_count"] >= 1
         assert stats["conversation_count"] >= 1
         assert stats["knowledge_document_count"] >= 1
+    
+    def test_selective_flush(self):
+        """Test that only changed tables are written on flush."""
+        self.db.add_conversation_message("flush_test", "user", "hello")
+        kb_id = self.db.add_knowledge_document("flush_test", "doc", "content")
+        self.db.save_tables()
+        
+        assert self.db.flush_counts["conversations"] == 1
+        assert self.db.flush_counts["knowledge_base"] == 1
+        assert self.db.flush_counts["agent_matrix"] == 0
+        assert self.db.get_dirty_tables() == []
+        
+        # Status changes are logged rather than rewriting the knowledge base
+        self.db.update_embedding_status(kb_id, "processed")
+        assert self.db.flush_counts["knowledge_base"] == 1
+        assert self.db.get_knowledge_documents("flush_test")["embedding_status"][0] == "processed"
+        
+        # Only the changed table is written at the next flush
+        self.db.save_tables()
+        assert self.db.flush_counts["knowledge_base"] == 2
+        assert self.db.flush_counts["conversations"] == 1
+        
+        # Nothing changed, nothing written
+        self.db.save_tables()
+        assert sum(self.db.flush_counts.values()) == 3
+    
+    def test_flush_is_atomic(self):
+        """Test that flushes leave no temp files behind."""
+        self.db.add_agent_config({"agent_id": "atomic_test"})
+        self.db.save_tables()
+        
+        files = sorted(p.name for p in Path(self.temp_dir).iterdir())
+        assert "agent_matrix.parquet" in files
+        assert not any(name.endswith(".tmp") for name in files)
+    
+    def test_hard_delete_survives_reopen(self):
+        """Test that hard-deleted rows are not resurrected by log replay."""
+        self.db.add_agent_config({"agent_id": "gone"})
+        self.db.delete_agent("gone", soft_delete=False)
+        
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.get_agent_config("gone") is None
+    
+    def test_batch_commits_once(self):
+        """Test that a batch writes its changes in a single commit."""
+        db = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        
+        with db.batch():
+            db.add_conversation_message("batch_test", "user", "question", "s1")
+            db.add_conversation_message("batch_test", "assistant", "answer", "s1")
+            kb_id = db.add_knowledge_document("batch_test", "doc", "content")
+            db.update_embedding_status(kb_id, "processed")
+            assert sum(db.flush_counts.values()) == 0
+        
+        assert db.flush_counts["conversations"] == 1
+        assert db.flush_counts["knowledge_base"] == 1
+        assert PolarsDBHandler(db_path=self.temp_dir).conversations.height == 2
+    
+    def test_batch_logs_once(self):
+        """Test that a batch appends its inserts to the log in one group."""
+        with self.db.transaction():
+            for i in range(5):
+                self.db.add_conversation_message("batch_test", "user", f"msg {i}", "s1")
+            assert self.db.wal.pending_records == 0
+        
+        assert self.db.wal.pending_records == 5
+        assert self.db.wal.sync_count == 1
+    
+    def test_batch_rollback(self):
+        """Test that an exception inside a batch discards its changes."""
+        self.db.add_agent_config({"agent_id": "keep"})
+        
+        with pytest.raises(RuntimeError):
+            with self.db.batch():
+                self.db.add_agent_config({"agent_id": "discard"})
+                self.db.delete_agent("keep", soft_delete=False)
+                raise RuntimeError("boom")
+        
+        assert self.db.get_agent_config("keep") is not None
+        assert self.db.get_agent_config("discard") is None
+        assert self.db.wal.pending_records == 1
+        
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.list_agents()["agent_id"].to_list() == ["keep"]
+    
+    def test_nested_batch_rollback(self):
+        """Test that a failed inner batch only rolls back its own changes."""
+        with self.db.batch():
+            self.db.add_conversation_message("nested", "user", "outer", "s1")
+            try:
+                with self.db.batch():
+                    self.db.add_conversation_message("nested", "user", "inner", "s1")
+                    raise ValueError("inner failure")
+            except ValueError:
+                pass
+        
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.conversations["content"].to_list() == ["outer"]
+    
+    def test_bulk_conversation_messages(self):
+        """Test bulk message insert from a list of records."""
+        message_ids = self.db.add_conversation_messages_bulk([
+            {"agent_id": "bulk", "role": "user", "content": "q", "session_id": "s1",
+             "metadata": {"source": "import"}},
+            {"agent_id": "bulk", "role": "assistant", "content": "a"},
+        ])
+        
+        assert len(message_ids) == 2 and len(set(message_ids)) == 2
+        assert self.db.flush_counts["conversations"] == 1
+        
+        rows = self.db.conversations.to_dicts()
+        assert rows[0]["message_id"] == message_ids[0]
+        assert rows[0]["conversation_id"] == "bulk_s1"
+        assert json.loads(rows[0]["metadata"]) == {"source": "import"}
+        assert rows[1]["session_id"] == "default"
+        assert rows[1]["message_type"] == "text"
+        assert rows[1]["metadata"] == "{}"
+        
+        # Single and bulk inserts mix freely
+        self.db.add_conversation_message("bulk", "user", "single", "s1")
+        assert self.db.get_conversation_history("bulk", "s1").height == 2
+    
+    def test_bulk_knowledge_from_dataframe_and_arrow(self):
+        """Test bulk knowledge insert from Polars and Arrow inputs."""
+        import polars as pl
+        pytest.importorskip("pyarrow")
+        
+        frame = pl.DataFrame({
+            "agent_id": ["kb", "kb"],
+            "title": ["One", "Two"],
+            "content": ["first document", "second document"],
+            "tags": [["a"], None],
+        })
+        kb_ids = self.db.add_knowledge_documents_bulk(frame)
+        kb_ids += self.db.add_knowledge_documents_bulk(frame.to_arrow())
+        
+        docs = self.db.knowledge_base
+        assert docs.height == 4
+        assert docs["kb_id"].to_list() == kb_ids
+        assert docs["embedding_status"].unique().to_list() == ["pending"]
+        assert docs["tags"].to_list()[:2] == [["a"], []]
+    
+    def test_bulk_research_results(self):
+        """Test bulk research insert encodes result dicts as JSON."""
+        self.db.add_research_results_bulk([
+            {"agent_id": "r", "query": "test query", "results": {"findings": 1}},
+        ])
+        result = self.db.search_research_collection("r", "test").to_dicts()[0]
+        assert json.loads(result["results"]) == {"findings": 1}
+        assert result["status"] == "completed"
+    
+    def test_bulk_validation(self):
+        """Test that bulk inserts are validated against the table schema."""
+        with pytest.raises(ValueError, match="Missing required"):
+            self.db.add_conversation_messages_bulk([{"agent_id": "a", "role": "user"}])
+        with pytest.raises(ValueError, match="Unknown columns"):
+            self.db.add_conversation_messages_bulk(
+                [{"agent_id": "a", "role": "user", "content": "c", "mood": "happy"}]
+            )
+        with pytest.raises(ValueError, match="Null values"):
+            self.db.add_conversation_messages_bulk(
+                [{"agent_id": "a", "role": "user", "content": None}]
+            )
+        with pytest.raises(ValueError, match="schema"):
+            self.db.add_conversation_messages_bulk(
+                [{"agent_id": "a", "role": "user", "content": "c", "timestamp": "yesterday"}]
+            )
+        with pytest.raises(TypeError):
+            self.db.add_conversation_messages_bulk("not records")
+        
+        assert self.db.add_conversation_messages_bulk([]) == []
+        assert self.db.conversations.height == 0
+    
+    def test_lazy_queries_do_not_load_tables(self):
+        """Test that a lazy handler answers queries by scanning parquet files."""
+        agent_id = self.db.add_agent_config({"agent_id": "lazy"}, "Lazy Agent")
+        self.db.add_conversation_message(agent_id, "user", "Hello", "s1")
+        self.db.add_knowledge_document(agent_id, "Doc", "Polars scans")
+        self.db.close()
+        
+        lazy_db = PolarsDBHandler(db_path=self.temp_dir, lazy=True)
+        assert lazy_db.get_agent_config(agent_id) == {"agent_id": "lazy"}
+        assert lazy_db.list_agents().height == 1
+        assert lazy_db.get_conversation_history(agent_id).height == 1
+        assert lazy_db.search_knowledge_base(agent_id, "scans").height == 1
+        assert lazy_db.get_database_stats()["conversation_count"] == 1
+        assert all(table is None for table in lazy_db._tables.values())
+        
+        # Attribute access still returns the full table
+        assert lazy_db.conversations.height == 1
+    
+    def test_lazy_sees_logged_inserts(self):
+        """Test that a lazy handler includes rows only present in the write-ahead log."""
+        self.db.add_conversation_message("agent", "user", "On disk", "s1")
+        self.db.checkpoint()
+        self.db.add_conversation_message("agent", "user", "In log", "s1")
+        
+        lazy_db = PolarsDBHandler(db_path=self.temp_dir, lazy=True)
+        history = lazy_db.get_conversation_history("agent")
+        assert sorted(history["content"].to_list()) == ["In log", "On disk"]
+        assert lazy_db._tables["conversations"] is None
+        
+        lazy_db.add_conversation_message("agent", "user", "New", "s1")
+        assert lazy_db.conversations.height == 3
+    
+    def test_conversations_are_partitioned(self):
+        """Test that appends only rewrite the partition they belong to."""
+        self.db.add_conversation_message("agent/a", "user", "Hello", "s1")
+        self.db.add_conversation_message("agent_b", "user", "Hi", "s1")
+        self.db.checkpoint()
+        
+        root = Path(self.temp_dir) / "conversations"
+        today = datetime.now().date().isoformat()
+        file_a = root / "agent_id=agent%2Fa" / f"date={today}" / "part-0.parquet"
+        file_b = root / "agent_id=agent_b" / f"date={today}" / "part-0.parquet"
+        assert file_a.exists() and file_b.exists()
+        inode_b = file_b.stat().st_ino
+        
+        self.db.add_conversation_message("agent/a", "assistant", "Hey", "s1")
+        self.db.checkpoint()
+        assert file_b.stat().st_ino == inode_b
+        assert pl.read_parquet(file_a).height == 2
+        
+        reopened = PolarsDBHandler(db_path=self.temp_dir, lazy=True)
+        assert reopened.get_conversation_history("agent/a").height == 2
+        assert reopened._conversation_files(["agent_b"]) == [file_b]
+    
+    def test_hard_delete_drops_partitions(self):
+        """Test that deleting an agent's history removes its directories."""
+        self.db.add_conversation_message("agent_a", "user", "Hello", "s1")
+        self.db.add_conversation_message("agent_a", "user", "Other", "s2")
+        self.db.add_conversation_message("agent_b", "user", "Hi", "s1")
+        self.db.checkpoint()
+        root = Path(self.temp_dir) / "conversations"
+        
+        self.db.clear_conversation_history("agent_a", "s1")
+        assert self.db.get_conversation_history("agent_a")["content"].to_list() == ["Other"]
+        
+        self.db.clear_conversation_history("agent_a")
+        assert not (root / "agent_id=agent_a").exists()
+        assert (root / "agent_id=agent_b").exists()
+        
+        agent_id = self.db.add_agent_config({"agent_id": "agent_b"}, "B")
+        self.db.delete_agent(agent_id, soft_delete=False)
+        assert not (root / "agent_id=agent_b").exists()
+        assert PolarsDBHandler(db_path=self.temp_dir).conversations.height == 0
+    
+    def test_legacy_conversations_are_migrated(self):
+        """Test the one-shot migration from a single conversations.parquet file."""
+        self.db.add_conversation_message("agent", "user", "Hello", "s1")
+        legacy_file = Path(self.temp_dir) / "conversations.parquet"
+        self.db.conversations.write_parquet(legacy_file)
+        
+        db = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        assert not legacy_file.exists()
+        assert db.get_conversation_history("agent").height == 1
+        assert db.migrate_conversation_storage() == 0
+    
+    def test_migration_keeps_existing_partitions(self):
+        """Test that a stale legacy file is merged into, not written over, live partitions."""
+        db = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        db.add_conversation_message("agent", "user", "Hello", "s1")
+        legacy_file = Path(self.temp_dir) / "conversations.parquet"
+        db.conversations.write_parquet(legacy_file)
+        db.add_conversation_message("agent", "assistant", "Hi there", "s1")
+        
+        reopened = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        assert not legacy_file.exists()
+        assert reopened.get_conversation_history("agent")["content"].sort().to_list() == ["Hello", "Hi there"]
+    
+    def test_export_does_not_touch_table_files(self):
+        """Test that default exports go to the exports directory."""
+        db = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        db.add_conversation_message("agent", "user", "Hello", "s1")
+        
+        path = Path(db.export_data("conversations", "parquet"))
+        assert path == Path(self.temp_dir) / "exports" / "conversations.parquet"
+        assert not (Path(self.temp_dir) / "conversations.parquet").exists()
+        
+        db.add_conversation_message("agent", "assistant", "Hi there", "s1")
+        assert PolarsDBHandler(db_path=self.temp_dir).conversations.height == 2
+    
+    def test_low_cardinality_columns_are_categorical(self):
+        """Test that repeated string columns are dictionary encoded."""
+        self.db.add_conversation_message("agent", "user", "Hello", "s1")
+        self.db.add_knowledge_document("agent", "Doc", "content")
+        
+        conversations = self.db.conversations
+        for column in ("agent_id", "role", "message_type", "session_id"):
+            assert conversations[column].dtype == pl.Categorical
+        assert self.db.knowledge_base["embedding_status"].dtype == pl.Categorical
+        assert self.db.get_conversation_history("agent")["role"].to_list() == ["user"]
+        
+        stats = self.db.get_database_stats()
+        assert stats["memory_mb"] > 0
+        assert stats["schema_migration"] is None
+    
+    def test_string_columns_are_migrated(self):
+        """Test that files written with plain String columns are upgraded on open."""
+        kb_file = Path(self.temp_dir) / "knowledge_base.parquet"
+        self.db.add_knowledge_document("agent", "Doc", "content")
+        self.db.checkpoint()
+        self.db.knowledge_base.cast({pl.Categorical: pl.String}).write_parquet(kb_file)
+        (Path(self.temp_dir) / "schema.json").unlink()
+        
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        assert pl.read_parquet_schema(kb_file)["embedding_status"] == pl.Categorical
+        assert db.knowledge_base["embedding_status"].to_list() == ["pending"]
+        migration = db.get_database_stats()["schema_migration"]
+        assert migration["files"] == 1
+        assert migration["size_before_mb"] > 0
+    
+    def test_json_fields_are_read_in_polars(self):
+        """Test filtering on metadata fields and exporting prompts without per-row parsing."""
+        modes = ConversationModes(self.db)
+        agent_id = self.db.add_agent_config(
+            {"agent_id": "poet", "agent_core": {"prompts": {"llmSystem": "You write poems."}}}, "Poet"
+        )
+        session_id = modes.start_human_chat(agent_id, "Poetry")
+        modes.send_human_message(session_id, agent_id, "Write a haiku")
+        
+        chats = self.db.conversations.filter(json_field("metadata", "conversation_mode") == "HUMAN_CHAT")
+        assert chats.height == 3
+        
+        sessions = modes.list_sessions(mode="HUMAN_CHAT", agent_id=agent_id)
+        assert [s["session_name"] for s in sessions] == ["Poetry"]
+        assert sessions[0]["participants"] == ["human", agent_id]
+        assert sessions[0]["message_count"] == 3
+        assert modes.list_sessions(mode="AGENT_TO_AGENT") == []
+        
+        history = modes.get_conversation_history(session_id, format="chat")
+        assert history["mode"] == "HUMAN_CHAT"
+        assert [m["sender"] for m in history["messages"]] == ["human", agent_id]
+        
+        output_path = Path(self.temp_dir) / "prompts.jsonl"
+        assert self.db.export_prompt_sets_jsonl(str(output_path))
+        example = json.loads(output_path.read_text().splitlines()[0])
+        assert example["messages"][0]["content"] == "You write poems."
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""
+Test suite for the AMS-DB LLM response cache
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+
+from ams_db.core.response_cache import ResponseCache, ResponseCacheMiss
+
+MESSAGES = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hello"}]
+
+
+class TestResponseCache:
+    """Test cases for the response cache modes."""
+
+    def setup_method(self):
+        """Set up cache directory and a counting fake LLM."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.calls = 0
+
+    def teardown_method(self):
+        """Clean up cache directory."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def _llm(self):
+        self.calls += 1
+        return {"content": f"response {self.calls}"}
+
+    def _fetch(self, cache: ResponseCache, key: str):
+        return asyncio.run(cache.fetch(key, self._llm))
+
+    def test_key_covers_request(self):
+        """Test that every request parameter changes the key."""
+        key = ResponseCache.make_key("model", 0.7, 500, MESSAGES)
+        assert key == ResponseCache.make_key("model", 0.7, 500, [dict(m) for m in MESSAGES])
+        assert key != ResponseCache.make_key("other", 0.7, 500, MESSAGES)
+        assert key != ResponseCache.make_key("model", 0.0, 500, MESSAGES)
+        assert key != ResponseCache.make_key("model", 0.7, 100, MESSAGES)
+        assert key != ResponseCache.make_key("model", 0.7, 500, MESSAGES[1:])
+
+    def test_record_then_replay(self):
+        """Test recording traffic and replaying it in a new process without calls."""
+        key = ResponseCache.make_key("model", 0.7, 500, MESSAGES)
+        recorder = ResponseCache(self.temp_dir, "record-only")
+        assert self._fetch(recorder, key) == {"content": "response 1"}
+        assert self._fetch(recorder, key) == {"content": "response 2"}
+
+        replay = ResponseCache(self.temp_dir, "replay-only")
+        assert self._fetch(replay, key) == {"content": "response 2"}
+        assert self.calls == 2
+        with pytest.raises(ResponseCacheMiss):
+            self._fetch(replay, "unknown")
+
+    def test_read_through(self):
+        """Test that repeats are answered from the cache and "off" never stores."""
+        cache = ResponseCache(self.temp_dir, "read-through")
+        assert self._fetch(cache, "a") == self._fetch(cache, "a")
+        assert self.calls == 1
+        assert cache.stats()["hits"] == 1
+
+        off = ResponseCache(self.temp_dir, "off")
+        self._fetch(off, "a")
+        assert self.calls == 2 and off.stats()["entries"] == 0
+
+        with pytest.raises(ValueError):
+            ResponseCache(self.temp_dir, "sometimes")
+
+    def test_ttl_and_size_cap(self):
+        """Test expiry and eviction of the oldest entries."""
+        cache = ResponseCache(self.temp_dir, "read-through", max_entries=2)
+        for key in ("a", "b", "c"):
+            self._fetch(cache, key)
+        assert cache.get("a") is None and cache.get("c") is not None
+
+        reopened = ResponseCache(self.temp_dir, "read-through", max_entries=2)
+        assert reopened.stats()["entries"] == 2
+
+        expired = ResponseCache(self.temp_dir, "read-through", ttl_seconds=-1)
+        assert expired.get("c") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
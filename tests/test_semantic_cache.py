@@ -0,0 +1,90 @@
+"""
+Test suite for the AMS-DB semantic response cache
+"""
+
+import asyncio
+import pytest
+import shutil
+import tempfile
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.embedders import LocalHashEmbedder
+from ams_db.core.semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """Test cases for reusing answers to similar questions."""
+
+    def setup_method(self):
+        """Set up a cache with the local embedder."""
+        self.cache = SemanticCache(LocalHashEmbedder(256), threshold=0.8)
+
+    def test_similar_questions_share_answers(self):
+        """Test hits above the threshold, per agent, and the hit rate."""
+        asyncio.run(self.cache.store("wizard", "How do I build a castle?", "Stone by stone."))
+
+        assert asyncio.run(self.cache.lookup("wizard", "how do I build a castle")) == "Stone by stone."
+        assert asyncio.run(self.cache.lookup("wizard", "What is the weather today?")) is None
+        assert asyncio.run(self.cache.lookup("minecraft", "How do I build a castle?")) is None
+
+        stats = self.cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+        assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+    def test_entries_per_agent_are_bounded(self):
+        """Test that the oldest answers are dropped first."""
+        cache = SemanticCache(LocalHashEmbedder(64), threshold=0.99, max_entries_per_agent=2)
+        for question in ("first question", "second question", "third question"):
+            asyncio.run(cache.store("agent", question, question.upper()))
+
+        assert asyncio.run(cache.lookup("agent", "first question")) is None
+        assert asyncio.run(cache.lookup("agent", "third question")) == "THIRD QUESTION"
+
+    def test_config_updates_invalidate_agent(self):
+        """Test the invalidation hook on agent config updates and deletes."""
+        temp_dir = tempfile.mkdtemp()
+        db = PolarsDBHandler(db_path=temp_dir)
+        try:
+            db.add_config_listener(self.cache.invalidate)
+            agent_id = db.add_agent_config({"agent_core": {}}, "Wizard")
+            asyncio.run(self.cache.store(agent_id, "castle tips", "Stone by stone."))
+            asyncio.run(self.cache.store("other", "castle tips", "Blocks."))
+
+            db.update_agent_config(agent_id, {"agent_core": {"changed": True}})
+            assert asyncio.run(self.cache.lookup(agent_id, "castle tips")) is None
+            assert asyncio.run(self.cache.lookup("other", "castle tips")) == "Blocks."
+
+            db.delete_agent("other")
+            assert self.cache.stats()["invalidations"] == 2
+        finally:
+            db.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_knowledge_changes_invalidate_agent(self):
+        """Test the invalidation hook on new knowledge, embeddings and research."""
+        temp_dir = tempfile.mkdtemp()
+        db = PolarsDBHandler(db_path=temp_dir, embedding_dim=4)
+        try:
+            db.add_knowledge_listener(self.cache.invalidate)
+            changes = [
+                lambda: db.add_knowledge_document("wizard", "Castles", "Stone castles have towers"),
+                lambda: db.add_knowledge_documents_bulk([{"agent_id": "wizard", "title": "Moats", "content": "Water"}]),
+                lambda: db.set_knowledge_embeddings(db.get_knowledge_documents("wizard")["kb_id"].to_list()[:1],
+                                                    [[1.0, 0.0, 0.0, 0.0]]),
+                lambda: db.add_research_result("wizard", "castle tips", {"tip": "Use stone"}),
+                lambda: db.add_research_results_bulk([{"agent_id": "wizard", "query": "q", "results": "{}"}]),
+            ]
+            asyncio.run(self.cache.store("other", "castle tips", "Blocks."))
+            for change in changes:
+                asyncio.run(self.cache.store("wizard", "castle tips", "Stone by stone."))
+                change()
+                assert asyncio.run(self.cache.lookup("wizard", "castle tips")) is None
+
+            assert asyncio.run(self.cache.lookup("other", "castle tips")) == "Blocks."
+        finally:
+            db.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,115 @@
+"""
+Test suite for the AMS-DB full-text index
+"""
+
+import pytest
+import tempfile
+from pathlib import Path
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.text_index import AgentTextIndex, parse_query
+
+
+class TestTextIndex:
+    """Test cases for BM25 knowledge base search."""
+
+    def setup_method(self):
+        """Set up test database."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = PolarsDBHandler(db_path=self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up test database."""
+        import shutil
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_bm25_ranking(self):
+        """Test that documents are ranked by relevance rather than recency."""
+        index = AgentTextIndex()
+        index.add("a", "Polars", "polars is a dataframe library written in rust")
+        index.add("b", "Cooking", "how to cook pasta")
+        index.add("c", "Notes", "polars polars polars dataframe")
+
+        results = index.search("polars dataframe")
+        assert [doc_id for doc_id, _ in results] == ["c", "a"]
+        assert index.search("polars dataframe", limit=1)[0][0] == "c"
+        assert index.search("missing") == []
+
+    def test_phrase_queries(self):
+        """Test that quoted phrases must appear as consecutive words."""
+        index = AgentTextIndex()
+        index.add("a", "", "the vector index is fast")
+        index.add("b", "", "index the vector store")
+
+        assert parse_query('"vector index" fast') == (["vector", "index", "fast"], [["vector", "index"]])
+        assert [doc_id for doc_id, _ in index.search('"vector index"')] == ["a"]
+        assert [doc_id for doc_id, _ in index.search('"index vector"')] == []
+
+    def test_search_knowledge_base(self):
+        """Test ranked, literal-safe search through the handler."""
+        self.db.add_knowledge_document("agent", "Regex help", "Use a+b* (carefully) in patterns")
+        self.db.add_knowledge_document("agent", "Databases", "Polars and parquet storage", tags=["db"])
+        self.db.add_knowledge_document("other", "Databases", "Polars for another agent")
+
+        results = self.db.search_knowledge_base("agent", "a+b* (carefully")
+        assert results["title"].to_list() == ["Regex help"]
+        assert results["score"][0] > 0
+
+        results = self.db.search_knowledge_base("agent", "polars", tags=["db"], limit=5)
+        assert results["title"].to_list() == ["Databases"]
+        assert self.db.search_knowledge_base("agent", "polars", content_type="json").height == 0
+        assert self.db.search_knowledge_base("agent", "").height == 2
+
+    def test_index_is_persisted_and_rebuilt(self):
+        """Test that the index is saved with the table and rebuilt when stale."""
+        self.db.add_knowledge_document("agent", "First", "alpha beta")
+        assert self.db.search_knowledge_base("agent", "alpha").height == 1
+        self.db.add_knowledge_document("agent", "Second", "alpha gamma")
+        self.db.checkpoint()
+        assert (Path(self.temp_dir) / "text_index" / "agent.json").exists()
+
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.search_knowledge_base("agent", "alpha").height == 2
+        assert reopened.text_index.rebuild_count == 0
+
+        # Logged but not checkpointed: the saved index is stale and rebuilt
+        reopened.add_knowledge_document("agent", "Third", "alpha delta")
+        crashed = PolarsDBHandler(db_path=self.temp_dir)
+        assert crashed.search_knowledge_base("agent", "delta").height == 1
+        assert crashed.text_index.rebuild_count == 1
+
+    def test_loading_does_not_write(self):
+        """Test that reading saved indexes leaves the index files alone."""
+        self.db.add_knowledge_document("agent", "First", "alpha beta")
+        self.db.add_knowledge_document("other", "Second", "alpha gamma")
+        for agent_id in ("agent", "other"):
+            self.db.search_knowledge_base(agent_id, "alpha")
+        self.db.checkpoint()
+        index_dir = Path(self.temp_dir) / "text_index"
+        mtimes = {path.name: path.stat().st_mtime_ns for path in index_dir.iterdir()}
+
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.search_knowledge_base("other", "alpha").height == 1
+        # Unsaved additions to one agent are not written by a search of another
+        reopened.add_knowledge_document("other", "Third", "alpha delta")
+        assert reopened.search_knowledge_base("agent", "alpha").height == 1
+
+        assert {path.name: path.stat().st_mtime_ns for path in index_dir.iterdir()} == mtimes
+        assert reopened.text_index.rebuild_count == 0
+
+    def test_rollback_invalidates_index(self):
+        """Test that documents from a rolled back batch are not searchable."""
+        self.db.add_knowledge_document("agent", "Kept", "shared words")
+        self.db.search_knowledge_base("agent", "shared")
+
+        with pytest.raises(RuntimeError):
+            with self.db.batch():
+                self.db.add_knowledge_document("agent", "Dropped", "shared words")
+                raise RuntimeError("abort")
+
+        assert self.db.search_knowledge_base("agent", "shared")["title"].to_list() == ["Kept"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
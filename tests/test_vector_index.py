@@ -0,0 +1,164 @@
+"""
+Test suite for the AMS-DB vector index
+"""
+
+import pytest
+import tempfile
+import numpy as np
+from pathlib import Path
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.vector_index import VectorIndex
+
+DIM = 16
+
+
+class TestVectorIndex:
+    """Test cases for semantic knowledge base search."""
+
+    def setup_method(self):
+        """Set up test database."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = PolarsDBHandler(db_path=self.temp_dir, embedding_dim=DIM)
+        self.rng = np.random.default_rng(0)
+
+    def teardown_method(self):
+        """Clean up test database."""
+        import shutil
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_ivf_search_finds_nearest(self):
+        """Test that clustered search returns the exact neighbours of stored vectors."""
+        vectors = self.rng.standard_normal((3000, DIM)).astype(np.float32)
+        ids = [f"doc{i}" for i in range(len(vectors))]
+        agents = ["a" if i % 2 else "b" for i in range(len(vectors))]
+
+        index = VectorIndex(Path(self.temp_dir) / "ivf", DIM, exact_threshold=500)
+        index.build(ids, agents, vectors)
+        assert index.centroids is not None
+
+        results = index.search(vectors[:20], k=3)
+        assert [hits[0][0] for hits in results] == ids[:20]
+        assert all(len(hits) == 3 for hits in results)
+
+        # Agent filter: neighbours of an "a" vector, searched within "b"
+        hits = index.search(vectors[1], k=5, agent_id="b")[0]
+        assert hits and all(int(doc_id[3:]) % 2 == 0 for doc_id, _ in hits)
+        assert index.search(vectors[1], agent_id="missing") == [[]]
+
+    def test_add_replace_and_persist(self):
+        """Test incremental adds, re-embedding and reloading from disk."""
+        vectors = self.rng.standard_normal((4, DIM)).astype(np.float32)
+        index = VectorIndex(Path(self.temp_dir) / "ivf", DIM)
+        index.build(["x", "y"], ["a", "a"], vectors[:2])
+        index.add(["z"], ["a"], vectors[2:3])
+        index.add(["x"], ["a"], vectors[3:4])
+        assert len(index) == 3
+        assert index.search(vectors[3], k=1)[0][0][0] == "x"
+        # The replaced vector of "x" is no longer returned
+        assert sorted(doc_id for doc_id, _ in index.search(vectors[0], k=5)[0]) == ["x", "y", "z"]
+
+        index.save()
+        loaded = VectorIndex.load(Path(self.temp_dir) / "ivf", DIM)
+        assert len(loaded) == 3
+        assert loaded.search(vectors[2], k=1)[0][0][0] == "z"
+        assert VectorIndex.load(Path(self.temp_dir) / "ivf", DIM * 2) is None
+
+    def test_tail_saves_append(self):
+        """Test that saving after an add writes only the new tail rows."""
+        index_dir = Path(self.temp_dir) / "ivf"
+        vectors = self.rng.standard_normal((4, DIM)).astype(np.float32)
+        index = VectorIndex(index_dir, DIM)
+        index.build(["x", "y"], ["a", "a"], vectors[:2])
+        index.add(["z"], ["a"], vectors[2:3])
+        index.save()
+
+        main_file = index_dir / "main_vectors.npy"
+        main_mtime = main_file.stat().st_mtime_ns
+        tail_size = (index_dir / VectorIndex.TAIL_VECTORS).stat().st_size
+
+        index.add(["x"], ["b"], vectors[3:4])
+        index.save()
+        assert main_file.stat().st_mtime_ns == main_mtime
+        assert (index_dir / VectorIndex.TAIL_VECTORS).stat().st_size == tail_size + DIM * 4
+
+        # A torn append past what meta.json records is ignored
+        with open(index_dir / VectorIndex.TAIL_VECTORS, "ab") as f:
+            f.write(b"\0" * 10)
+        with open(index_dir / VectorIndex.TAIL_IDS, "a") as f:
+            f.write('"partial')
+
+        loaded = VectorIndex.load(index_dir, DIM)
+        assert len(loaded) == 3
+        assert loaded.search(vectors[3], k=1, agent_id="b")[0][0][0] == "x"
+        assert sorted(doc_id for doc_id, _ in loaded.search(vectors[0], k=5, agent_id="a")[0]) == ["y", "z"]
+
+        loaded.add(["w"], ["a"], vectors[0:1])
+        loaded.save()
+        assert len(VectorIndex.load(index_dir, DIM)) == 4
+
+    def test_search_knowledge_by_vector(self):
+        """Test storing embeddings and searching them through the handler."""
+        vectors = self.rng.standard_normal((3, DIM)).astype(np.float32)
+        first = self.db.add_knowledge_document("agent", "First", "one", embedding=vectors[0].tolist())
+        second = self.db.add_knowledge_document("agent", "Second", "two")
+        self.db.add_knowledge_documents_bulk([
+            {"agent_id": "other", "title": "Third", "content": "three", "embedding": vectors[2].tolist()}
+        ])
+        self.db.set_knowledge_embeddings([second], vectors[1:2])
+
+        results = self.db.search_knowledge_by_vector(vectors[1], agent_id="agent", limit=5)
+        assert results["kb_id"].to_list() == [second, first]
+        assert results["similarity"][0] == pytest.approx(1.0, abs=1e-5)
+        assert "embedding" not in results.columns
+
+        batch = self.db.search_knowledge_by_vectors(vectors, limit=1)
+        assert [result["title"][0] for result in batch] == ["First", "Second", "Third"]
+
+        with pytest.raises(ValueError):
+            self.db.set_knowledge_embeddings(["unknown"], vectors[:1])
+        with pytest.raises(ValueError):
+            self.db.search_knowledge_by_vector(vectors[0][:4])
+
+    def test_index_is_rebuilt_when_stale(self):
+        """Test that embeddings logged but not in the saved index are found after a crash."""
+        vectors = self.rng.standard_normal((2, DIM)).astype(np.float32)
+        self.db.add_knowledge_document("agent", "Saved", "a", embedding=vectors[0].tolist())
+        self.db.checkpoint()
+
+        # Logged only: the saved index misses this vector
+        self.db.add_knowledge_document("agent", "Logged", "b", embedding=vectors[1].tolist())
+        crashed = PolarsDBHandler(db_path=self.temp_dir, embedding_dim=DIM, lazy=True)
+        assert crashed.search_knowledge_by_vector(vectors[1], limit=1)["title"].to_list() == ["Logged"]
+
+    def test_reembedding_is_logged(self):
+        """Test that re-embedding a document is logged, not flushed, and found after a crash."""
+        vectors = self.rng.standard_normal((2, DIM)).astype(np.float32)
+        kb_id = self.db.add_knowledge_document("agent", "Doc", "a", embedding=vectors[0].tolist())
+        self.db.checkpoint()
+        flushes = self.db.flush_counts["knowledge_base"]
+
+        self.db.set_knowledge_embeddings([kb_id], vectors[1:2])
+        assert self.db.flush_counts["knowledge_base"] == flushes
+
+        # No close(): the saved index still holds the old vector
+        crashed = PolarsDBHandler(db_path=self.temp_dir, embedding_dim=DIM)
+        assert crashed.search_knowledge_by_vector(vectors[1], limit=1)["similarity"][0] == pytest.approx(1.0, abs=1e-5)
+
+    def test_rollback_drops_embeddings(self):
+        """Test that embeddings added in a rolled back batch are not searchable."""
+        vectors = self.rng.standard_normal((2, DIM)).astype(np.float32)
+        self.db.add_knowledge_document("agent", "Kept", "a", embedding=vectors[0].tolist())
+
+        with pytest.raises(RuntimeError):
+            with self.db.batch():
+                self.db.add_knowledge_document("agent", "Dropped", "b", embedding=vectors[1].tolist())
+                raise RuntimeError("abort")
+
+        results = self.db.search_knowledge_by_vector(vectors[1], limit=5)
+        assert results["title"].to_list() == ["Kept"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,127 @@
+"""
+Test suite for the AMS-DB write-ahead log
+"""
+
+import pytest
+import tempfile
+from pathlib import Path
+
+from ams_db.core import PolarsDBHandler
+from ams_db.core.write_ahead_log import WriteAheadLog
+
+
+class TestWriteAheadLog:
+    """Test cases for WAL-backed inserts in PolarsDBHandler."""
+
+    def setup_method(self):
+        """Set up test database."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Clean up test database."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_inserts_do_not_rewrite_parquet(self):
+        """Test that inserts go to the log instead of the parquet files."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        db.add_conversation_message("agent", "user", "Hello", "s1")
+
+        assert not (Path(self.temp_dir) / "conversations").exists()
+        assert db.wal.pending_records == 1
+
+    def test_replay_after_unclean_shutdown(self):
+        """Test that logged inserts are recovered when the database reopens."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        db.add_agent_config({"agent_id": "wal_agent"}, "WAL Agent")
+        db.add_conversation_message("wal_agent", "user", "Hello", "s1")
+        db.add_knowledge_document("wal_agent", "Doc", "Some content", tags=["a"])
+        db.add_research_result("wal_agent", "query", {"k": 1})
+        db.add_template("tmpl", "prompt", "content")
+        # No close(): simulate a crash
+
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.get_agent_config("wal_agent") == {"agent_id": "wal_agent"}
+        assert reopened.conversations.height == 1
+        assert reopened.knowledge_base.height == 1
+        assert reopened.knowledge_base["tags"].to_list() == [["a"]]
+        assert reopened.research_collection.height == 1
+        assert reopened.templates.height == 1
+        assert reopened.conversations["timestamp"].dtype == db.conversations["timestamp"].dtype
+
+    def test_checkpoint_folds_log_into_parquet(self):
+        """Test that a checkpoint writes parquet files and empties the log."""
+        db = PolarsDBHandler(db_path=self.temp_dir, checkpoint_every=3)
+        for i in range(3):
+            db.add_conversation_message("agent", "user", f"msg {i}", "s1")
+
+        assert list((Path(self.temp_dir) / "conversations").rglob("*.parquet"))
+        assert db.wal.pending_records == 0
+        assert (Path(self.temp_dir) / "wal.log").stat().st_size == 0
+
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.conversations.height == 3
+
+    def test_replay_is_idempotent(self):
+        """Test that rows already in parquet are not duplicated by replay."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        db.add_conversation_message("agent", "user", "Hello", "s1")
+
+        # Write parquet but leave the log intact, as if we crashed mid-checkpoint
+        db.conversations.write_parquet(Path(self.temp_dir) / "conversations.parquet")
+
+        reopened = PolarsDBHandler(db_path=self.temp_dir)
+        assert reopened.conversations.height == 1
+
+    def test_column_updates_are_logged(self):
+        """Test that status changes are logged and re-applied on reopen."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        kb_id = db.add_knowledge_document("agent", "Doc", "content")
+        db.checkpoint()
+        db.update_embedding_status(kb_id, "queued")
+        db.update_embedding_status([kb_id], "ingested")
+
+        assert db.flush_counts["knowledge_base"] == 1
+        assert db.wal.pending_records == 2
+        # No close(): simulate a crash
+
+        for lazy in (False, True):
+            reopened = PolarsDBHandler(db_path=self.temp_dir, lazy=lazy)
+            assert reopened.get_knowledge_documents("agent")["embedding_status"].to_list() == ["ingested"]
+
+    def test_close_checkpoints(self):
+        """Test that close() flushes pending inserts to parquet."""
+        db = PolarsDBHandler(db_path=self.temp_dir)
+        db.add_knowledge_document("agent", "Doc", "content")
+        db.close()
+
+        assert (Path(self.temp_dir) / "knowledge_base.parquet").exists()
+        reopened = PolarsDBHandler(db_path=self.temp_dir, wal_enabled=False)
+        assert reopened.knowledge_base.height == 1
+
+    def test_torn_tail_is_skipped(self):
+        """Test that a partially written final record is ignored."""
+        log_path = Path(self.temp_dir) / "wal.log"
+        wal = WriteAheadLog(log_path)
+        wal.append("conversations", {"message_id": "m1"})
+        wal.close()
+
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write('{"table": "conversations", "row": {"mess')
+
+        records = WriteAheadLog(log_path).read_records()
+        assert records == [("conversations", {"message_id": "m1"})]
+
+    def test_fsync_is_grouped(self):
+        """Test that appends are fsync'd in groups rather than one by one."""
+        wal = WriteAheadLog(Path(self.temp_dir) / "wal.log", sync_every=10,
+                            sync_interval=3600)
+        for i in range(25):
+            wal.append("conversations", {"message_id": str(i)})
+
+        assert wal.sync_count == 2
+        wal.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])